@@ -0,0 +1,279 @@
+"""
+Benchmark - End-to-end timing of the search pipeline.
+
+Runs SearchService.search_in_videos for every query photo against every video
+(the bundled CCTVS/*.mp4 clips and uploads/*.jpg photos by default),
+optionally on synthetic tiled or looped copies of the clips for scale, and
+reports per-stage timings (decode, motion, detect, quality, embed, score,
+snapshot, write), frames/sec, faces/sec, search latency percentiles and peak
+RSS as JSON.
+
+Usage:
+    python benchmark.py --repeat 3 --output bench.json
+    python benchmark.py --tile 2 --loop 4            # 2x2 tiled, 4x longer clips
+    python benchmark.py --compare bench.json         # exit 1 on a >20% regression
+
+Searches are cold by default (no stored face index, no cached query
+embedding) so every run decodes, detects and embeds; use --warm to measure
+repeat searches instead. Stages run inside --parallel pool workers are not
+included in the stage breakdown.
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.config.settings import Settings
+
+logger = logging.getLogger("benchmark")
+
+# Summary metrics compared against a baseline, and whether higher is better
+COMPARED_METRICS = {
+    "latency_p50_seconds": False,
+    "latency_p95_seconds": False,
+    "frames_per_second": True,
+    "faces_per_second": True,
+    "peak_rss_mb": False,
+}
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process and its finished children."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def make_synthetic_video(video_path: Path, out_dir: Path, tile: int = 1, loop: int = 1) -> Path:
+    """Write a tile x tile mosaic of a clip, repeated `loop` times, as a new video."""
+    cap = cv2.VideoCapture(str(video_path))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(np.tile(frame, (tile, tile, 1)) if tile > 1 else frame)
+    cap.release()
+    if not frames:
+        raise ValueError(f"Cannot read video: {video_path}")
+
+    out_path = out_dir / f"{video_path.stem}_t{tile}x{loop}.mp4"
+    height, width = frames[0].shape[:2]
+    out = cv2.VideoWriter(str(out_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    try:
+        for _ in range(loop):
+            for frame in frames:
+                out.write(frame)
+    finally:
+        out.release()
+    return out_path
+
+
+def video_info(video_path: Path) -> Dict[str, Any]:
+    cap = cv2.VideoCapture(str(video_path))
+    info = {
+        "video": video_path.name,
+        "frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        "fps": round(cap.get(cv2.CAP_PROP_FPS) or 0, 2),
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    }
+    cap.release()
+    return info
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "mean": 0.0, "max": 0.0}
+    p50, p95 = np.percentile(values, [50, 95])
+    return {
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "mean": round(float(np.mean(values)), 3),
+        "max": round(float(np.max(values)), 3)
+    }
+
+
+def run_benchmark(
+    videos: List[Path],
+    queries: List[Path],
+    repeat: int = 1,
+    warm: bool = False,
+    parallel: bool = False
+) -> Dict[str, Any]:
+    """Run every (query, video) search `repeat` times and collect timings."""
+    from src.backend.search_service import SearchService
+    from src.backend.result_store import ResultStore
+
+    # Searches must not grow the archive index while being timed
+    Settings.USE_ANN_ARCHIVE = False
+
+    load_start = time.perf_counter()
+    service = SearchService(enable_workers=parallel)
+    model_load_seconds = time.perf_counter() - load_start
+    if not warm:
+        service.face_index = None
+    service.stage_timer.reset()
+    cleanup = ResultStore(Settings.RESULTS_DIR)
+
+    runs = []
+    for round_no in range(repeat):
+        for query in queries:
+            for video in videos:
+                if not warm:
+                    service.query_cache.clear()
+                search_id = f"bench_{round_no}_{query.stem}_{video.stem}"
+                start = time.perf_counter()
+                results = service.search_in_videos(str(query), [video], search_id)
+                seconds = time.perf_counter() - start
+                stats = results.get("stats", {})
+                runs.append({
+                    "round": round_no,
+                    "query": query.name,
+                    "video": video.name,
+                    "status": results.get("status"),
+                    "seconds": round(seconds, 3),
+                    "frames": stats.get("total_frames_processed", 0),
+                    "faces": stats.get("faces_scored", 0),
+                    "matches": stats.get("matches_found", 0)
+                })
+                logger.info(
+                    f"{query.name} x {video.name}: {seconds:.2f}s, "
+                    f"{runs[-1]['frames']} frames, {runs[-1]['matches']} matches"
+                )
+                service.result_writer.flush()
+                cleanup.delete(search_id)
+                service.candidate_store.delete(search_id)
+
+    ok_runs = [run for run in runs if run["status"] == "completed"]
+    total_seconds = sum(run["seconds"] for run in ok_runs)
+    latency = percentiles([run["seconds"] for run in ok_runs])
+
+    return {
+        "created": datetime.now().isoformat(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "torch_threads": __import__("torch").get_num_threads()
+        },
+        "pipeline": {
+            "index_tag": service.index_tag,
+            "embedder": "histogram" if service.face_model is None else f"resnet18_{service.face_model.name}",
+            "embed_input_size": service.embed_input_size,
+            "similarity_threshold": service.similarity_threshold,
+            "warm": warm,
+            "parallel": service.parallel_indexer is not None
+        },
+        "videos": [video_info(video) for video in videos],
+        "queries": [query.name for query in queries],
+        "runs": runs,
+        "summary": {
+            "searches": len(runs),
+            "failed": len(runs) - len(ok_runs),
+            "total_seconds": round(total_seconds, 3),
+            "model_load_seconds": round(model_load_seconds, 3),
+            "latency_p50_seconds": latency["p50"],
+            "latency_p95_seconds": latency["p95"],
+            "latency_mean_seconds": latency["mean"],
+            "latency_max_seconds": latency["max"],
+            "frames_per_second": round(sum(run["frames"] for run in ok_runs) / total_seconds, 1) if total_seconds else 0.0,
+            "faces_per_second": round(sum(run["faces"] for run in ok_runs) / total_seconds, 1) if total_seconds else 0.0,
+            "peak_rss_mb": peak_rss_mb()
+        },
+        "stages": service.stage_timer.snapshot()
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Print metric changes against a baseline report. Returns the regressed metrics."""
+    regressions = []
+    print(f"{'metric':<24}{'baseline':>12}{'current':>12}{'change':>10}")
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        old = baseline.get("summary", {}).get(metric)
+        new = report["summary"].get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > max_regression else ""
+        if flag:
+            regressions.append(metric)
+        print(f"{metric:<24}{old:>12}{new:>12}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def expand(patterns: List[str]) -> List[Path]:
+    return sorted({Path(path) for pattern in patterns for path in glob.glob(pattern)})
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the DRISHTI search pipeline")
+    parser.add_argument("--videos", nargs="+", default=[str(Settings.VIDEO_DIR / "*.mp4")], help="Video files or globs")
+    parser.add_argument("--queries", nargs="+", default=[str(Settings.BASE_DIR / "uploads" / "*.jpg")], help="Query photos or globs")
+    parser.add_argument("--repeat", type=int, default=1, help="Rounds over every query x video pair")
+    parser.add_argument("--tile", type=int, default=1, help="Benchmark on an N x N mosaic of each clip")
+    parser.add_argument("--loop", type=int, default=1, help="Benchmark on each clip repeated N times")
+    parser.add_argument("--warm", action="store_true", help="Keep face indexes and query cache between runs")
+    parser.add_argument("--parallel", action="store_true", help="Use the SEARCH_WORKERS process pool")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    for name in ("src.backend", "src.config"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    videos = expand(args.videos)
+    queries = expand(args.queries)
+    if not videos or not queries:
+        logger.error(f"Nothing to benchmark: {len(videos)} video(s), {len(queries)} query photo(s)")
+        return 2
+
+    with tempfile.TemporaryDirectory(prefix="drishti_bench_") as tmp_dir:
+        if args.tile > 1 or args.loop > 1:
+            logger.info(f"Building synthetic videos (tile {args.tile}, loop {args.loop})")
+            videos = [make_synthetic_video(video, Path(tmp_dir), args.tile, args.loop) for video in videos]
+        report = run_benchmark(videos, queries, args.repeat, args.warm, args.parallel)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+        logger.info(f"Report written to {args.output}")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
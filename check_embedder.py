@@ -0,0 +1,229 @@
+"""
+Embedder Check - Accuracy and speed of the optimized embedder modes.
+
+Collects face crops from the bundled clips (CCTVS/*.mp4 by default) with the
+production detector, then compares every inference mode (fp32, jit, int8,
+onnx) and input size against the float32 eager ResNet18 at 224px:
+
+- cosine similarity between each crop's optimized and reference embedding
+- match agreement: how often a crop pair's match decision at
+  SIMILARITY_THRESHOLD stays the same, and the largest pair score change
+- top-1 agreement: how often a crop's nearest other crop stays the same
+  (informational; near-duplicate crops of one track swap places easily)
+- milliseconds per face and speedup over the reference
+
+With --build, the int8 model (calibrated on half of the crops; the other
+half is used for the check) and the ONNX export are written first, to
+FACE_MODEL_INT8 and FACE_MODEL_ONNX, where EMBED_MODE=int8/onnx load them.
+
+Usage:
+    python check_embedder.py --build
+    python check_embedder.py --sizes 224 160 112 --output embed_check.json
+
+Exits 1 if any checked variant falls below --min-cosine or --min-agreement.
+"""
+
+import argparse
+import copy
+import glob
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.config.settings import Settings
+from src.backend.similarity import cosine_scores
+
+logger = logging.getLogger("check_embedder")
+
+
+def collect_crops(service, videos: List[Path], max_crops: int, frame_skip: int = 5) -> List[np.ndarray]:
+    """Face crops exactly as the search pipeline would embed them."""
+    crops = []
+    for video in videos:
+        cap = cv2.VideoCapture(str(video))
+        frame_idx = 0
+        while len(crops) < max_crops:
+            ret = cap.grab()
+            if not ret:
+                break
+            if frame_idx % frame_skip == 0:
+                _, frame = cap.retrieve()
+                crops.extend(face['face'] for face in service.detect_faces_in_frame(frame))
+            frame_idx += 1
+        cap.release()
+    return crops[:max_crops]
+
+
+def embed_timed(embedder, crops: List[np.ndarray], batch_size: int) -> Tuple[np.ndarray, float]:
+    """Embeddings of all crops and milliseconds per face (after one warm-up batch)."""
+    embedder.embed(crops[:batch_size])
+    start = time.perf_counter()
+    embeddings = np.vstack([embedder.embed(crops[i:i + batch_size]) for i in range(0, len(crops), batch_size)])
+    return embeddings, (time.perf_counter() - start) * 1000 / len(crops)
+
+
+def nearest_other(embeddings: np.ndarray) -> np.ndarray:
+    scores = embeddings @ embeddings.T
+    np.fill_diagonal(scores, -np.inf)
+    return scores.argmax(axis=1)
+
+
+def compare(reference: np.ndarray, embeddings: np.ndarray, threshold: float) -> Dict[str, float]:
+    cosine = np.sum(reference * embeddings, axis=1)
+    pairs = np.triu_indices(len(reference), k=1)
+    reference_scores = cosine_scores(reference, reference)[pairs]
+    scores = cosine_scores(embeddings, embeddings)[pairs]
+    return {
+        "cosine_mean": round(float(cosine.mean()), 5),
+        "cosine_min": round(float(cosine.min()), 5),
+        "match_agreement": round(float(np.mean((reference_scores >= threshold) == (scores >= threshold))), 4),
+        "score_error_max": round(float(np.abs(reference_scores - scores).max()), 4),
+        "top1_agreement": round(float(np.mean(nearest_other(reference) == nearest_other(embeddings))), 4)
+    }
+
+
+def build_variant(mode: str, model, size: int):
+    """Embedder for one mode and input size, or None if its model file is missing."""
+    from src.backend.face_embedders import TorchFaceEmbedder, OnnxFaceEmbedder, create_face_embedder
+
+    if mode == "int8":
+        if not Settings.FACE_MODEL_INT8.exists():
+            return None
+        import torch
+        return TorchFaceEmbedder(torch.jit.load(str(Settings.FACE_MODEL_INT8)), size, name="int8")
+    if mode == "onnx":
+        return OnnxFaceEmbedder(Settings.FACE_MODEL_ONNX, size) if Settings.FACE_MODEL_ONNX.exists() else None
+    return create_face_embedder(copy.deepcopy(model), mode, size, Settings.EMBED_CHANNELS_LAST)
+
+
+def build_models(model, calibration: List[np.ndarray], batch_size: int) -> None:
+    """Write the calibrated int8 model and the ONNX export."""
+    from src.backend.face_embedders import preprocess_faces, quantize_int8, export_onnx
+
+    size = Settings.EMBED_INPUT_SIZE
+    batches = [preprocess_faces(calibration[i:i + batch_size], size) for i in range(0, len(calibration), batch_size)]
+    Settings.FACE_MODEL_INT8.parent.mkdir(parents=True, exist_ok=True)
+    quantize_int8(model, batches, size).save(str(Settings.FACE_MODEL_INT8))
+    logger.info(f"Int8 model calibrated on {len(calibration)} crops, saved to {Settings.FACE_MODEL_INT8}")
+
+    try:
+        export_onnx(model, Settings.FACE_MODEL_ONNX, size)
+        logger.info(f"ONNX export saved to {Settings.FACE_MODEL_ONNX}")
+    except Exception as e:
+        logger.warning(f"ONNX export skipped ({e}); install the onnx package to build it")
+
+
+def run_check(
+    videos: List[Path],
+    modes: List[str],
+    sizes: List[int],
+    max_crops: int,
+    build: bool
+) -> Optional[Dict[str, Any]]:
+    from src.backend.search_service import SearchService
+    from src.backend.model_loader import build_resnet18_embedder
+    from src.backend.face_embedders import TorchFaceEmbedder
+
+    try:
+        model = build_resnet18_embedder(Settings.FACE_MODEL_WEIGHTS, Settings.MODEL_DOWNLOAD)
+    except Exception as e:
+        logger.error(f"Float32 reference unavailable: {e}")
+        return None
+
+    service = SearchService(enable_workers=False)
+    crops = collect_crops(service, videos, max_crops)
+    if len(crops) < 4:
+        logger.error(f"Only {len(crops)} face crop(s) found in {len(videos)} video(s)")
+        return None
+    calibration, evaluation = crops[0::2], crops[1::2]
+    logger.info(f"{len(crops)} face crops: {len(calibration)} for calibration, {len(evaluation)} for the check")
+
+    batch_size = service.embed_batch_size
+    if build:
+        build_models(model, calibration, batch_size)
+
+    reference, reference_ms = embed_timed(TorchFaceEmbedder(model, 224), evaluation, batch_size)
+    variants = []
+    for mode in modes:
+        for size in sizes:
+            embedder = build_variant(mode, model, size)
+            if embedder is None:
+                logger.warning(f"No {mode} model file; run with --build first")
+                continue
+            embeddings, ms_per_face = embed_timed(embedder, evaluation, batch_size)
+            variants.append({
+                "mode": mode,
+                "input_size": size,
+                "channels_last": getattr(embedder, "channels_last", False),
+                "ms_per_face": round(ms_per_face, 2),
+                "speedup": round(reference_ms / ms_per_face, 2),
+                **compare(reference, embeddings, service.similarity_threshold)
+            })
+
+    import torch
+    return {
+        "reference": {"mode": "fp32", "input_size": 224, "ms_per_face": round(reference_ms, 2)},
+        "crops": {"calibration": len(calibration), "evaluation": len(evaluation)},
+        "similarity_threshold": service.similarity_threshold,
+        "torch_threads": torch.get_num_threads(),
+        "variants": variants
+    }
+
+
+def main() -> int:
+    from src.backend.face_embedders import EMBED_MODES
+
+    parser = argparse.ArgumentParser(description="Check optimized face embedder modes against float32")
+    parser.add_argument("--videos", nargs="+", default=[str(Settings.VIDEO_DIR / "*.mp4")], help="Video files or globs")
+    parser.add_argument("--modes", nargs="+", default=list(EMBED_MODES), choices=EMBED_MODES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[Settings.EMBED_INPUT_SIZE], help="Input sizes to check")
+    parser.add_argument("--max-crops", type=int, default=400, help="Face crops collected from the videos")
+    parser.add_argument("--build", action="store_true", help="Build the int8 and ONNX models first")
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="Minimum mean cosine to the reference")
+    parser.add_argument("--min-agreement", type=float, default=0.99, help="Minimum match decision agreement")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    for name in ("src.backend", "src.config"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    videos = sorted({Path(path) for pattern in args.videos for path in glob.glob(pattern)})
+    report = run_check(videos, args.modes, args.sizes, args.max_crops, args.build)
+    if report is None:
+        return 2
+
+    failed = []
+    print(f"{'mode':<6}{'size':>6}{'ms/face':>10}{'speedup':>9}{'cos mean':>10}{'cos min':>9}{'match':>8}{'max err':>9}{'top1':>7}")
+    print(f"{'ref':<6}{224:>6}{report['reference']['ms_per_face']:>10}")
+    for variant in report["variants"]:
+        ok = variant["cosine_mean"] >= args.min_cosine and variant["match_agreement"] >= args.min_agreement
+        variant["passed"] = ok
+        if not ok:
+            failed.append(f"{variant['mode']}@{variant['input_size']}")
+        print(
+            f"{variant['mode']:<6}{variant['input_size']:>6}{variant['ms_per_face']:>10}{variant['speedup']:>8}x"
+            f"{variant['cosine_mean']:>10}{variant['cosine_min']:>9}{variant['match_agreement']:>8}"
+            f"{variant['score_error_max']:>9}{variant['top1_agreement']:>7}"
+            f"{'' if ok else '  FAIL'}"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        logger.info(f"Report written to {args.output}")
+    if failed:
+        logger.warning(f"Below accuracy thresholds: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
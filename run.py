@@ -1,21 +1,82 @@
+import gc
+import importlib
 import os
+import signal
 import sys
 import uvicorn
 
 # Get port from environment or default to 8000
 PORT = int(os.getenv('PORT', 8000))
 HOST = os.getenv('HOST', '0.0.0.0')
+WORKERS = int(os.getenv('WEB_WORKERS', 1))
+
+
+def serve_preforked(workers):
+    """
+    Load the app and its models once, then fork `workers` server processes.
+
+    uvicorn's own --workers spawns fresh interpreters that each load the
+    models again; forked workers share the parent's model weights
+    copy-on-write instead. Search jobs, results, the watchlist and live
+    ingestion are per worker; the face and archive indexes on disk are shared.
+    """
+    from src.config.settings import Settings
+    if Settings.LIVE_INGEST_AUTOSTART:
+        # Every worker would open every camera and raise its own alerts
+        sys.exit("LIVE_INGEST_AUTOSTART requires a single server process; unset it or set WEB_WORKERS=1")
+
+    # The parent must hold the loaded models before forking
+    os.environ['MODEL_LOADING'] = 'eager'
+    appmod = importlib.import_module('src.backend.app')
+
+    config = uvicorn.Config(appmod.app, host=HOST, port=PORT)
+    sock = config.bind_socket()
+
+    # No thread may be running across fork(); freeze so GC doesn't touch (and copy) shared pages
+    appmod.log_listener.stop()
+    gc.freeze()
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            appmod.log_listener.start()
+            uvicorn.Server(config).run(sockets=[sock])
+            appmod.log_listener.stop()
+            os._exit(0)
+        children.append(pid)
+    appmod.log_listener.start()
+    appmod.logger.info(f"Started {workers} forked server workers: {children}")
+
+    def forward(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    # Ctrl+C already reaches the whole process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for child in children:
+        os.waitpid(child, 0)
+    appmod.log_listener.stop()
+
 
 if __name__ == '__main__':
     # Create necessary directories
     os.makedirs('data/uploads', exist_ok=True)
     os.makedirs('data/results', exist_ok=True)
     os.makedirs('CCTVS', exist_ok=True)
-    
+
+    if WORKERS > 1 and hasattr(os, 'fork'):
+        serve_preforked(WORKERS)
+        sys.exit(0)
+
     # Run the app
     uvicorn.run(
         'src.backend.app:app',
         host=HOST,
         port=PORT,
         reload=False  # Disable reload in production
-    )
\ No newline at end of file
+    )
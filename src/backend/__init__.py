@@ -1,6 +1,15 @@
 """DRISTI Backend Module"""
 
-from .app import app
 from .search_service import SearchService
 
 __all__ = ["app", "SearchService"]
+
+
+def __getattr__(name):
+    # Import the FastAPI app lazily so search worker processes, which import
+    # this package, do not build a second app and SearchService.
+    if name == "app":
+        from .app import app
+        globals()["app"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,473 @@
+"""
+ANN Index - Inverted-file (IVF) approximate nearest-neighbour index over
+archived face embeddings.
+
+Vectors are assigned to the nearest of `nlist` k-means centroids and appended
+to that list's file on disk. A query scores the centroids, memory-maps only the
+`nprobe` closest lists and ranks their vectors, so query cost depends on list
+size rather than archive size. Vectors added before the index is trained sit
+in a pending buffer that is scanned exhaustively.
+
+Each source (e.g. a video file) is stored under a stable key with a version.
+Adding a new version tombstones the old one's id range: its vectors stay on
+disk but are skipped by queries, until the tombstoned share of the index
+passes `compact_fraction` and compact() rewrites it without them.
+
+Vectors are stored as float32, float16 or int8 (with a per-vector scale file),
+see columnar.py; indexes written before the dtype option read as float32.
+
+Forked server workers share one index on disk: writes hold an exclusive file
+lock and reload meta.json/sources.json under it before assigning ids, and
+queries hold a shared lock.
+"""
+
+import json
+import logging
+import shutil
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from src.backend.similarity import cosine_scores, top_k
+from src.backend.columnar import (
+    EMBEDDING_DTYPES, encode_embeddings, decode_embeddings, append_column, memmap_column, file_lock
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-vector record columns: name -> dtype (row i describes global id i)
+RECORD_COLUMNS = {
+    "source_id": np.int32,
+    "frame_index": np.int64,
+    "timestamp": np.float64,
+    "track_id": np.int64,
+}
+
+# Vector file suffix per storage dtype
+VECTOR_SUFFIXES = {"float32": "f32", "float16": "f16", "int8": "i8"}
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """K-means on the unit sphere (cosine similarity). Returns (k, D) unit centroids."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), 65536):
+            assign[start:start + 65536] = np.argmax(vectors[start:start + 65536] @ centroids.T, axis=1)
+
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=k)
+
+        # Re-seed empty clusters with random vectors
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+
+        centroids = sums / (np.linalg.norm(sums, axis=1, keepdims=True) + 1e-8)
+
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Appendable, memory-mapped IVF index of L2-normalized embeddings."""
+
+    def __init__(
+        self,
+        index_dir: Path,
+        nlist: int = 1024,
+        train_size: int = 50000,
+        dtype: str = "float32",
+        compact_fraction: float = 0.3
+    ):
+        """
+        Args:
+            dtype: Vector storage for a new index (float32 | float16 | int8);
+                an existing index keeps the dtype it was created with
+            compact_fraction: Compact once this fraction of the stored vectors
+                is tombstoned (0 disables)
+        """
+        if dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unknown embedding dtype '{dtype}', expected one of {EMBEDDING_DTYPES}")
+        self.index_dir = Path(index_dir)
+        self.lists_dir = self.index_dir / "lists"
+        self.lists_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Beside the index directory so clear() can delete the directory while holding it
+        self.lock_file = self.index_dir.with_name(self.index_dir.name + ".lock")
+        self.compact_fraction = compact_fraction
+
+        self._defaults = {
+            "dim": None, "nlist": nlist, "count": 0, "trained": False, "train_size": train_size, "dtype": dtype
+        }
+        self.meta: Dict[str, Any] = {}
+        self.sources: List[Dict[str, Any]] = []
+        self.centroids: Optional[np.ndarray] = None
+        with file_lock(self.lock_file, shared=True):
+            self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        """(Re)read the on-disk state; another worker process may have changed it."""
+        self.meta = dict(self._defaults)
+        self.sources = []
+        self.centroids = None
+        meta_file = self.index_dir / "meta.json"
+        if meta_file.exists():
+            with open(meta_file) as f:
+                meta = json.load(f)
+            meta.setdefault("dtype", "float32")
+            self.meta.update(meta)
+        sources_file = self.index_dir / "sources.json"
+        if sources_file.exists():
+            with open(sources_file) as f:
+                self.sources = json.load(f)
+        centroids_file = self.index_dir / "centroids.npy"
+        if self.meta["trained"] and centroids_file.exists():
+            self.centroids = np.load(centroids_file, mmap_mode="r")
+
+    def _save_meta(self, index_dir: Optional[Path] = None) -> None:
+        index_dir = index_dir or self.index_dir
+        with open(index_dir / "meta.json", "w") as f:
+            json.dump(self.meta, f)
+        with open(index_dir / "sources.json", "w") as f:
+            json.dump(self.sources, f)
+
+    def _list_stem(self, list_no: int) -> Path:
+        return self.lists_dir / f"{list_no:05d}"
+
+    def _vector_files(self, stem: Path):
+        """(vectors, scales, ids) files of a list or of the pending buffer."""
+        return (
+            stem.with_suffix("." + VECTOR_SUFFIXES[self.meta["dtype"]]),
+            stem.with_suffix(".scl"),
+            stem.with_suffix(".ids")
+        )
+
+    def _append_vectors(self, stem: Path, embeddings: np.ndarray, ids: np.ndarray) -> None:
+        vec_file, scale_file, ids_file = self._vector_files(stem)
+        codes, scales = encode_embeddings(embeddings, self.meta["dtype"])
+        append_column(vec_file, codes)
+        if scales is not None:
+            append_column(scale_file, scales)
+        append_column(ids_file, ids)
+
+    def _memmap_vectors(self, stem: Path):
+        """(codes, scales or None, ids) of a list or the pending buffer, cut to the same length."""
+        vec_file, scale_file, ids_file = self._vector_files(stem)
+        dtype = self.meta["dtype"]
+        ids = memmap_column(ids_file, np.int64)
+        codes = memmap_column(vec_file, dtype, (self.meta["dim"],), len(ids))
+        scales = memmap_column(scale_file, np.float32, (), len(codes)) if dtype == "int8" else None
+        rows = len(codes) if scales is None else len(scales)
+        return codes[:rows], None if scales is None else scales[:rows], ids[:rows]
+
+    @property
+    def size(self) -> int:
+        """Vectors stored, including tombstoned ones (the next free id)."""
+        return int(self.meta["count"])
+
+    @property
+    def live_size(self) -> int:
+        """Vectors that queries can return."""
+        return sum(source["count"] for source in self.sources if not source.get("removed"))
+
+    @property
+    def dead_size(self) -> int:
+        """Tombstoned vectors still stored (and scanned) until the next compaction."""
+        return self.size - self.live_size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock, file_lock(self.lock_file, shared=True):
+            self._load()
+            return {
+                "vectors": self.size,
+                "live": self.live_size,
+                "dead": self.dead_size,
+                "sources": sum(1 for source in self.sources if not source.get("removed")),
+                "trained": bool(self.meta["trained"])
+            }
+
+    def has_source(self, key: str, version: Optional[str] = None) -> bool:
+        """Whether a live source with this key (and version, if given) is stored."""
+        return any(
+            source["key"] == key and not source.get("removed") and (version is None or source.get("version") == version)
+            for source in self.sources
+        )
+
+    def _remove_source(self, key: str, name: str) -> int:
+        """
+        Tombstone the live versions of a source. Returns vectors removed.
+
+        Sources from indexes written before versioning are keyed by a
+        version hash alone, so they are matched by name instead.
+        """
+        removed = 0
+        for source in self.sources:
+            if source.get("removed"):
+                continue
+            if source["key"] == key or ("version" not in source and source["name"] == name):
+                source["removed"] = True
+                removed += source["count"]
+        return removed
+
+    def clear(self) -> None:
+        """Delete every stored vector and source."""
+        with self._lock, file_lock(self.lock_file):
+            shutil.rmtree(self.index_dir, ignore_errors=True)
+            self.lists_dir.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    # ------------------------------------------------------------------
+    # Insertion
+    # ------------------------------------------------------------------
+
+    def add(
+        self,
+        key: str,
+        name: str,
+        embeddings: np.ndarray,
+        records: Dict[str, np.ndarray],
+        scales: Optional[np.ndarray] = None,
+        version: Optional[str] = None
+    ) -> int:
+        """
+        Append one source's (e.g. one video's) embeddings.
+
+        Args:
+            key: Stable source key (e.g. resolved video path)
+            name: Human-readable source name (camera)
+            embeddings: (N, D) L2-normalized vectors, or int8 codes with `scales`
+            records: Per-vector columns (frame_index, timestamp, track_id)
+            scales: Per-vector scales of int8 codes (see columnar.encode_embeddings)
+            version: Content/settings version of the source; an already stored
+                version is skipped, a new one replaces the older versions
+
+        Returns:
+            Number of vectors added.
+        """
+        with self._lock, file_lock(self.lock_file):
+            self._load()
+            if self.has_source(key, version):
+                return 0
+            removed = self._remove_source(key, name)
+            if removed:
+                logger.info(f"Archive source {name} changed: {removed} old vectors tombstoned")
+            if not len(embeddings):
+                if removed:
+                    self._save_meta()
+                    self._compact_if_needed()
+                return 0
+
+            embeddings = decode_embeddings(embeddings, scales)
+            if self.meta["dim"] is None:
+                self.meta["dim"] = int(embeddings.shape[1])
+            elif embeddings.shape[1] != self.meta["dim"]:
+                raise ValueError(f"Embedding size {embeddings.shape[1]} does not match index size {self.meta['dim']}")
+
+            source_id = len(self.sources)
+            ids = np.arange(self.size, self.size + len(embeddings), dtype=np.int64)
+
+            record_values = dict(records, source_id=np.full(len(embeddings), source_id))
+            for column, dtype in RECORD_COLUMNS.items():
+                append_column(self.index_dir / f"{column}.bin", np.asarray(record_values[column], dtype=dtype))
+
+            if self.meta["trained"]:
+                self._add_to_lists(embeddings, ids)
+            else:
+                self._append_vectors(self.index_dir / "pending", embeddings, ids)
+
+            self.sources.append({
+                "key": key, "version": version, "name": name, "start": int(ids[0]), "count": len(ids)
+            })
+            self.meta["count"] = self.size + len(ids)
+            self._save_meta()
+
+            if not self.meta["trained"] and self.size >= self.meta["train_size"]:
+                self._train_from_pending()
+            if removed:
+                self._compact_if_needed()
+
+            return len(ids)
+
+    def _add_to_lists(self, embeddings: np.ndarray, ids: np.ndarray) -> None:
+        assign = np.argmax(embeddings @ np.asarray(self.centroids).T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.flatnonzero(np.diff(assign[order])) + 1
+        for group in np.split(order, bounds):
+            self._append_vectors(self._list_stem(int(assign[group[0]])), embeddings[group], ids[group])
+
+    def _train_from_pending(self) -> None:
+        """Train centroids on the pending buffer and move it into the lists."""
+        codes, scales, pending_ids = self._memmap_vectors(self.index_dir / "pending")
+        pending = decode_embeddings(codes, scales)
+        pending_ids = np.array(pending_ids)
+
+        nlist = min(self.meta["nlist"], max(1, len(pending) // 39))
+        logger.info(f"Training IVF index: {len(pending)} vectors -> {nlist} lists")
+        self.centroids = spherical_kmeans(pending, nlist)
+        np.save(self.index_dir / "centroids.npy", self.centroids)
+
+        self._add_to_lists(pending, pending_ids)
+        for path in self._vector_files(self.index_dir / "pending"):
+            path.unlink(missing_ok=True)
+
+        self.meta["nlist"] = nlist
+        self.meta["trained"] = True
+        self._save_meta()
+
+    # ------------------------------------------------------------------
+    # Compaction
+    # ------------------------------------------------------------------
+
+    def compact(self) -> int:
+        """Rewrite the index without tombstoned vectors. Returns vectors dropped."""
+        with self._lock, file_lock(self.lock_file):
+            self._load()
+            return self._compact()
+
+    def _compact_if_needed(self) -> None:
+        if self.compact_fraction > 0 and self.dead_size >= self.compact_fraction * self.size:
+            self._compact()
+
+    def _compact(self) -> int:
+        """
+        Copy the live vectors into a new directory and swap it in.
+
+        Live sources keep their order and get contiguous ids, and vectors stay
+        in their lists (the centroids are kept), so queries return the same
+        results. Held under both locks.
+        """
+        dead = self.dead_size
+        if not dead:
+            return 0
+
+        # Old id -> new id (-1 for tombstoned vectors), old source id -> new source id
+        new_ids = np.full(self.size, -1, dtype=np.int64)
+        source_ids = np.full(len(self.sources), -1, dtype=np.int32)
+        sources, start = [], 0
+        for old_source_id, source in enumerate(self.sources):
+            if source.get("removed"):
+                continue
+            new_ids[source["start"]:source["start"] + source["count"]] = np.arange(start, start + source["count"])
+            source_ids[old_source_id] = len(sources)
+            sources.append(dict(source, start=start))
+            start += source["count"]
+        kept_ids = np.flatnonzero(new_ids >= 0)
+
+        new_dir = self.index_dir.with_name(self.index_dir.name + ".compact")
+        shutil.rmtree(new_dir, ignore_errors=True)
+        (new_dir / "lists").mkdir(parents=True)
+
+        for column, dtype in RECORD_COLUMNS.items():
+            values = np.asarray(memmap_column(self.index_dir / f"{column}.bin", dtype, rows=self.size))[kept_ids]
+            if column == "source_id":
+                values = source_ids[values]
+            append_column(new_dir / f"{column}.bin", values.astype(dtype))
+
+        stems = [self.index_dir / "pending"] + sorted(path.with_suffix("") for path in self.lists_dir.glob("*.ids"))
+        for stem in stems:
+            codes, scales, ids = self._memmap_vectors(stem)
+            ids = new_ids[np.asarray(ids)]
+            keep = ids >= 0
+            if not keep.any():
+                continue
+            vec_file, scale_file, ids_file = self._vector_files(new_dir / stem.relative_to(self.index_dir))
+            append_column(vec_file, np.asarray(codes)[keep])
+            if scales is not None:
+                append_column(scale_file, np.asarray(scales)[keep])
+            append_column(ids_file, ids[keep])
+
+        if (self.index_dir / "centroids.npy").exists():
+            shutil.copyfile(self.index_dir / "centroids.npy", new_dir / "centroids.npy")
+        self.sources = sources
+        self.meta["count"] = len(kept_ids)
+        self._save_meta(new_dir)
+
+        old_dir = self.index_dir.with_name(self.index_dir.name + ".old")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        self.index_dir.replace(old_dir)
+        new_dir.replace(self.index_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        self._load()
+
+        logger.info(f"Compacted archive index: dropped {dead} tombstoned vectors, {self.size} remain")
+        return dead
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int = 100,
+        threshold: float = 0.0,
+        nprobe: int = 16
+    ) -> List[Dict[str, Any]]:
+        """
+        Approximate top-k most similar archived faces.
+
+        Args:
+            query: (D,) L2-normalized query embedding
+            top_k: Maximum number of results
+            threshold: Minimum similarity on the [0, 1] scale used for matches
+            nprobe: Number of closest lists to scan
+
+        Returns:
+            Results sorted by similarity, each with id, similarity, source and record fields.
+        """
+        with self._lock, file_lock(self.lock_file, shared=True):
+            self._load()
+            return self._search(np.asarray(query, dtype=np.float32), top_k, threshold, nprobe)
+
+    def _search(self, query: np.ndarray, k: int, threshold: float, nprobe: int) -> List[Dict[str, Any]]:
+        dim = self.meta["dim"]
+        if dim is None or self.size == 0:
+            return []
+
+        candidate_scores, candidate_ids = [], []
+
+        def scan(vectors: np.ndarray, scales: Optional[np.ndarray], ids: np.ndarray) -> None:
+            if len(vectors):
+                candidate_scores.append(cosine_scores(query, vectors, scales))
+                candidate_ids.append(np.asarray(ids))
+
+        if self.meta["trained"]:
+            centroid_scores = np.asarray(self.centroids) @ query
+            nprobe = min(nprobe, len(centroid_scores))
+            for list_no in np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]:
+                scan(*self._memmap_vectors(self._list_stem(int(list_no))))
+
+        scan(*self._memmap_vectors(self.index_dir / "pending"))
+
+        if not candidate_scores:
+            return []
+
+        scores = np.concatenate(candidate_scores)
+        ids = np.concatenate(candidate_ids)
+        columns = {column: memmap_column(self.index_dir / f"{column}.bin", dtype) for column, dtype in RECORD_COLUMNS.items()}
+
+        # Skip vectors of tombstoned sources
+        removed = np.array([bool(source.get("removed")) for source in self.sources])
+        if removed.any():
+            live = ~removed[np.asarray(columns["source_id"])[ids]]
+            scores, ids = scores[live], ids[live]
+        keep = top_k(scores, k, threshold)
+
+        results = []
+        for i in keep:
+            vector_id = int(ids[i])
+            result = {"id": vector_id, "similarity": float(scores[i])}
+            for column, values in columns.items():
+                result[column] = values[vector_id].item()
+            result["source"] = self.sources[result.pop("source_id")]["name"]
+            results.append(result)
+        return results
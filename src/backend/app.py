@@ -3,46 +3,63 @@ DRISTI - Lost Person Detection System
 Main FastAPI application for face recognition in CCTV footage.
 """
 
-from fastapi import FastAPI, UploadFile, File, Query
+from fastapi import FastAPI, UploadFile, File, Query, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 import os
-import shutil
 from datetime import datetime
 from pathlib import Path
+import hmac
 import json
 import logging
-from typing import List, Dict, Any
+import re
+from typing import List, Dict, Any, Optional
 import sys
 import asyncio
+import queue
+from logging.handlers import QueueHandler, QueueListener
 
 # Add parent to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.backend.search_service import SearchService
+from src.backend.search_jobs import SearchJobManager, AdmissionError, PRIORITIES
+from src.backend.live_ingest import LiveIngestService, load_camera_config
+from src.backend.result_store import ResultStore, paginate_results
+from src.backend.query_cache import save_upload
+from src.backend.motion_gate import load_roi_config, parse_roi_config
+from src.backend.metrics import REGISTRY
+from src.backend.stage_timer import trace_spans
 from src.config.settings import Settings
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(Settings.LOG_DIR / 'drishti.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging: callers only enqueue records, a listener thread does the file/console I/O
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+log_handlers = [logging.FileHandler(Settings.LOG_DIR / 'drishti.log'), logging.StreamHandler()]
+for handler in log_handlers:
+    handler.setFormatter(log_formatter)
+log_queue: "queue.Queue" = queue.Queue(-1)
+log_listener = QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+log_listener.start()
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
 logger = logging.getLogger(__name__)
 
 # Initialize directories
 Settings.create_directories()
 
 # ============================================================================
-# IN-MEMORY CACHE FOR SEARCH RESULTS
+# SEARCH RESULT STORE
 # ============================================================================
-# On Render (ephemeral filesystem), keep results in memory instead of disk
-# This ensures results persist for the request lifecycle and API calls
-search_results_cache: Dict[str, Dict[str, Any]] = {}
+# Recent results are served from memory (Render's filesystem is ephemeral);
+# least-recently-used and expired entries fall back to RESULTS_DIR/{id}.json
+result_store = ResultStore(
+    Settings.RESULTS_DIR,
+    max_entries=Settings.RESULT_STORE_MAX_ENTRIES,
+    max_bytes=int(Settings.RESULT_STORE_MAX_MB * 1024 * 1024),
+    ttl_seconds=Settings.RESULT_STORE_TTL
+)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -60,8 +77,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize search service
-search_service = SearchService()
+# Initialize search service (models load in the background unless MODEL_LOADING=eager,
+# so the server answers /api/health immediately and /api/ready once they are loaded)
+search_service = SearchService(lazy_models=Settings.MODEL_LOADING != "eager")
+
+# Background search jobs (fixed worker threads, bounded priority queue, per-client limit)
+search_jobs = SearchJobManager(
+    workers=Settings.SEARCH_JOB_WORKERS,
+    max_queue=Settings.SEARCH_QUEUE_SIZE,
+    client_limit=Settings.SEARCH_CLIENT_LIMIT,
+    aging_seconds=Settings.SEARCH_AGING_SECONDS
+)
+
+# Always-on RTSP ingestion matched against the live watchlist
+live_ingest = LiveIngestService(search_service)
+
+# Point-in-time gauges, read when /api/metrics is scraped
+REGISTRY.gauge_callback(
+    "drishti_queue_depth", "Items waiting in internal queues",
+    lambda: [
+        ({"queue": "search_jobs"}, search_jobs.stats()["queue_depth"]),
+        ({"queue": "result_writer"}, search_service.result_writer.stats()["queue_depth"]),
+        ({"queue": "live_frames"}, live_ingest.frames.qsize()),
+        ({"queue": "ring_clips"}, live_ingest.recorder.stats()["clip_queue_depth"]),
+        ({"queue": "log_records"}, log_queue.qsize())
+    ]
+)
+REGISTRY.gauge_callback(
+    "drishti_models_ready", "Whether the detector and embedder are loaded",
+    lambda: [({}, search_service.ready)]
+)
+REGISTRY.gauge_callback(
+    "drishti_search_jobs", "Search jobs by state",
+    lambda: [({"state": state}, search_jobs.stats()[state]) for state in ("running", "queued")]
+)
+REGISTRY.gauge_callback(
+    "drishti_result_store", "In-memory search result store",
+    lambda: [({"value": key}, value) for key, value in result_store.stats().items()]
+)
+REGISTRY.gauge_callback(
+    "drishti_query_cache", "Query photo embedding cache",
+    lambda: [({"value": key}, value) for key, value in search_service.query_cache.stats().items()]
+)
+REGISTRY.gauge_callback(
+    "drishti_archive_vectors", "Archive index vectors by state (dead = tombstoned, awaiting compaction)",
+    lambda: [({"state": state}, search_service.archive_index.stats()[state]) for state in ("live", "dead")]
+)
+REGISTRY.gauge_callback(
+    "drishti_stream", "Pooled RTSP stream health",
+    lambda: [
+        ({"stream": stream["url"], "value": key}, stream[key])
+        for stream in search_service.stream_pool.metrics()
+        for key in ("connected", "measured_fps", "read_latency_ms", "frame_age_ms", "frames_dropped", "connects")
+    ]
+)
+REGISTRY.gauge_callback(
+    "drishti_live_camera", "Live camera reader health",
+    lambda: [
+        ({"camera": camera["camera"], "value": key}, camera[key])
+        for camera in live_ingest.status()["cameras"]
+        for key in ("connected", "frames_sampled", "frames_dropped", "last_frame_age_seconds")
+    ]
+)
 
 
 # ============================================================================
@@ -78,23 +155,109 @@ async def health_check():
     }
 
 
+@app.get("/api/ready")
+async def readiness_check():
+    """
+    Readiness probe: 200 once the detector and embedder are loaded, 503 while
+    they are still loading (or failed). /api/health stays a liveness probe.
+    """
+    models = search_service.model_info()
+    return JSONResponse(
+        status_code=200 if search_service.ready else 503,
+        content={
+            "success": search_service.ready,
+            "status": models["status"],
+            "models": models,
+            "search_queue": search_jobs.stats(),
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """
+    Prometheus text exposition: per-stage latency histograms, frame/face/match
+    counters, search job timings, queue depths, stream health and model load times.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # ============================================================================
 # SEARCH ENDPOINTS
 # ============================================================================
 
+# Person ids end up in snapshot file names
+PERSON_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+def client_address(request: Request) -> Optional[str]:
+    """
+    Address of the calling client for per-client limits.
+
+    Behind TRUSTED_PROXY_HOPS reverse proxies the peer is the last proxy; each
+    proxy appends the address it received from to X-Forwarded-For, so the
+    client is that many entries from the end (entries further left can be forged).
+    """
+    peer = request.client.host if request.client else None
+    if Settings.TRUSTED_PROXY_HOPS <= 0:
+        return peer
+    forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+    if len(forwarded) < Settings.TRUSTED_PROXY_HOPS:
+        return forwarded[0] if forwarded else peer
+    return forwarded[-Settings.TRUSTED_PROXY_HOPS]
+
+
+def priority_error(request: Request, priority: str) -> Optional[JSONResponse]:
+    """Error response if the priority lane is unknown or not allowed for this caller, else None."""
+    if priority not in PRIORITIES:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "message": f"priority must be one of: {', '.join(PRIORITIES)}"}
+        )
+    if priority == PRIORITIES[0]:
+        token = request.headers.get("x-priority-token", "")
+        if not Settings.SEARCH_PRIORITY_TOKEN or not hmac.compare_digest(token, Settings.SEARCH_PRIORITY_TOKEN):
+            return JSONResponse(
+                status_code=403,
+                content={"success": False, "message": "priority=high requires a valid X-Priority-Token header"}
+            )
+    return None
+
+
+def rejected_search(search_id: str, error: AdmissionError) -> JSONResponse:
+    """429 response for a search turned away by admission control."""
+    logger.warning(f"Rejecting search {search_id}: {error.reason}")
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(error.retry_after)},
+        content={
+            "success": False,
+            "reason": error.reason,
+            "retry_after": error.retry_after,
+            "message": error.message
+        }
+    )
+
+
 @app.post("/api/search")
 async def search_lost_person(
+    request: Request,
     file: UploadFile = File(...),
-    use_cctv: bool = Query(False, description="Use connected CCTV cameras")
+    use_cctv: bool = Query(False, description="Use connected CCTV cameras"),
+    similarity_threshold: Optional[float] = Query(None, ge=0, le=1, description="Match threshold (default: server setting)"),
+    trace: bool = Query(False, description="Attach per-stage trace spans to the results"),
+    priority: str = Query("normal", description="Queue lane: high (e.g. live incident), normal or low (e.g. archive sweep)")
 ):
     """
-    Upload a photo of a lost person and search in CCTV videos.
-    Runs synchronously using asyncio.to_thread() to avoid Render timeout issues.
+    Upload a photo of a lost person and queue a search in CCTV videos.
+    Returns immediately with a search_id and queue position; the search runs on
+    the background job queue. Returns 429 with Retry-After when the queue or the
+    client's limit of active searches is full.
     
-    Returns:
-        - Results with matched faces
-        - Confidence percentages
-        - Timestamps and camera info
+    Follow progress via:
+        - GET /api/search-status/{search_id} (polling, includes matches so far)
+        - GET /api/search-stream/{search_id} (Server-Sent Events)
+        - GET /api/search-results/{search_id} (final results)
     """
     try:
         # Validate file
@@ -104,10 +267,12 @@ async def search_lost_person(
                 content={"success": False, "message": "No file provided"}
             )
         
+        error = priority_error(request, priority)
+        if error is not None:
+            return error
+        
         # Save uploaded file
-        upload_path = Settings.UPLOAD_DIR / f"lost_person_{datetime.now().timestamp()}.jpg"
-        with open(upload_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        upload_path = save_upload(file.file, Settings.UPLOAD_DIR)
         
         # Create unique search ID
         search_id = f"search_{datetime.now().timestamp()}"
@@ -125,28 +290,39 @@ async def search_lost_person(
                 }
             )
         
-        # Run search synchronously using asyncio.to_thread() to prevent timeout
-        # This executes the CPU-heavy task in a thread pool without blocking the event loop
-        logger.info(f"Starting face search for {len(videos)} video file(s)...")
-        results = await asyncio.to_thread(
-            search_service.search_in_videos,
-            str(upload_path),
-            videos,
-            search_id
-        )
+        def run_search(job):
+            with trace_spans(trace or Settings.TRACE_SEARCHES, Settings.TRACE_MAX_SPANS):
+                results = search_service.search_in_videos(
+                    str(upload_path),
+                    videos,
+                    search_id,
+                    progress_callback=job.handle_event,
+                    similarity_threshold=similarity_threshold
+                )
+            # Store results in memory (Render-compatible, no disk dependency)
+            result_store.put(search_id, results)
+            logger.info(f"Results stored for search_id: {search_id}")
+            return results
+        
+        try:
+            search_jobs.submit(search_id, run_search, priority, client_address(request))
+        except AdmissionError as e:
+            return rejected_search(search_id, e)
         
-        # Store results in memory cache (Render-compatible, no disk dependency)
-        search_results_cache[search_id] = results
-        logger.info(f"Results cached in memory for search_id: {search_id}")
+        logger.info(f"Queued face search {search_id} for {len(videos)} video file(s)")
         
-        # Return results directly (status 200)
         return JSONResponse(
-            status_code=200,
+            status_code=202,
             content={
                 "success": True,
                 "search_id": search_id,
-                "results": results,
-                "message": "Search completed successfully"
+                "status": "queued",
+                "priority": priority,
+                "queue": search_jobs.queue_info(search_id),
+                "status_url": f"/api/search-status/{search_id}",
+                "stream_url": f"/api/search-stream/{search_id}",
+                "results_url": f"/api/search-results/{search_id}",
+                "message": "Search queued"
             }
         )
         
@@ -158,17 +334,221 @@ async def search_lost_person(
         )
 
 
+@app.post("/api/search-multi")
+async def search_multiple_persons(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    persons: Optional[str] = Form(None, description="Comma-separated person id for each file, in order"),
+    pooling: str = Query("mean", description="Combine a person's photos: mean or max"),
+    similarity_threshold: Optional[float] = Query(None, ge=0, le=1, description="Match threshold (default: server setting)"),
+    trace: bool = Query(False, description="Attach per-stage trace spans to the results"),
+    priority: str = Query("normal", description="Queue lane: high (e.g. live incident), normal or low (e.g. archive sweep)")
+):
+    """
+    Upload photos of several lost persons (optionally several photos per person)
+    and search all CCTV videos for all of them in a single pass.
+    Returns immediately with a search_id; results are grouped per person.
+    Queued and rejected (429) like /api/search.
+    """
+    try:
+        if not files or not all(f.filename for f in files):
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "message": "No file provided"}
+            )
+        
+        if pooling not in ("mean", "max"):
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "message": "pooling must be 'mean' or 'max'"}
+            )
+        
+        error = priority_error(request, priority)
+        if error is not None:
+            return error
+        
+        # Each file is its own person unless ids are given
+        if persons:
+            person_ids = [p.strip() for p in persons.split(",")]
+            if len(person_ids) != len(files) or not all(PERSON_ID_PATTERN.fullmatch(p) for p in person_ids):
+                return JSONResponse(
+                    status_code=400,
+                    content={
+                        "success": False,
+                        "message": "persons must list one id per file, using only letters, digits, '_' and '-'"
+                    }
+                )
+        else:
+            person_ids = [f"person_{i + 1}" for i in range(len(files))]
+        
+        # Save uploaded files, grouped per person
+        queries: Dict[str, List[str]] = {}
+        for person_id, file in zip(person_ids, files):
+            upload_path = save_upload(file.file, Settings.UPLOAD_DIR)
+            queries.setdefault(person_id, []).append(str(upload_path))
+        
+        # Create unique search ID
+        search_id = f"search_{datetime.now().timestamp()}"
+        
+        videos = list(Settings.VIDEO_DIR.glob("*.mp4"))
+        
+        if not videos:
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "success": False,
+                    "message": "No CCTV video files found in the system",
+                    "search_id": search_id
+                }
+            )
+        
+        def run_search(job):
+            with trace_spans(trace or Settings.TRACE_SEARCHES, Settings.TRACE_MAX_SPANS):
+                results = search_service.search_gallery(
+                    queries,
+                    videos,
+                    search_id,
+                    progress_callback=job.handle_event,
+                    pooling=pooling,
+                    similarity_threshold=similarity_threshold
+                )
+            result_store.put(search_id, results)
+            logger.info(f"Results stored for search_id: {search_id}")
+            return results
+        
+        try:
+            search_jobs.submit(search_id, run_search, priority, client_address(request))
+        except AdmissionError as e:
+            return rejected_search(search_id, e)
+        
+        logger.info(f"Queued gallery search {search_id}: {len(queries)} person(s), {len(videos)} video file(s)")
+        
+        return JSONResponse(
+            status_code=202,
+            content={
+                "success": True,
+                "search_id": search_id,
+                "status": "queued",
+                "priority": priority,
+                "queue": search_jobs.queue_info(search_id),
+                "persons": list(queries.keys()),
+                "status_url": f"/api/search-status/{search_id}",
+                "stream_url": f"/api/search-stream/{search_id}",
+                "results_url": f"/api/search-results/{search_id}",
+                "message": "Search queued"
+            }
+        )
+        
+    except Exception as e:
+        logger.error(f"Error in multi-person search endpoint: {str(e)}", exc_info=True)
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "message": f"Search error: {str(e)}"}
+        )
+
+
+@app.get("/api/search-status/{search_id}")
+async def get_search_status(search_id: str):
+    """
+    Poll a search job: status, queue position while queued, progress (videos
+    done, frames processed, ETA) and the matches found so far. Includes final
+    results once finished.
+    """
+    job = search_jobs.get(search_id)
+    
+    if job is None:
+        results = result_store.get(search_id)
+        if results is not None:
+            return {
+                "success": True,
+                "search_id": search_id,
+                "status": results.get("status", "completed"),
+                "results": results
+            }
+        return JSONResponse(
+            status_code=404,
+            content={"success": False, "message": "Search not found", "search_id": search_id}
+        )
+    
+    status = job.to_dict()
+    if job.status == "queued":
+        status["queue"] = search_jobs.queue_info(search_id)
+    if job.finished:
+        status["results"] = job.results
+    return {"success": True, **status}
+
+
+@app.get("/api/search-stream/{search_id}")
+async def stream_search(search_id: str):
+    """
+    Stream a search job as Server-Sent Events.
+    
+    Events:
+        - queue: queue position and estimated wait while queued, when they change
+        - progress: progress dict whenever it changes
+        - match: each new match as it is found
+        - done: final status once the search finishes
+    """
+    job = search_jobs.get(search_id)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"success": False, "message": "Search not found", "search_id": search_id}
+        )
+    
+    async def event_stream():
+        sent_matches = 0
+        last_progress = None
+        last_queue = None
+        while True:
+            finished = job.finished
+            
+            queue_info = search_jobs.queue_info(search_id) if job.status == "queued" else None
+            if queue_info is not None and queue_info != last_queue:
+                last_queue = queue_info
+                yield f"event: queue\ndata: {json.dumps(queue_info)}\n\n"
+            
+            for match in job.matches_since(sent_matches):
+                sent_matches += 1
+                yield f"event: match\ndata: {json.dumps(match)}\n\n"
+            
+            # Only emit when counts change (the ETA alone drifts every tick)
+            progress = job.progress()
+            counts = {k: v for k, v in progress.items() if k != "eta_seconds"}
+            if counts != last_progress:
+                last_progress = counts
+                yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+            
+            if finished:
+                yield f"event: done\ndata: {json.dumps(job.to_dict(include_matches=False))}\n\n"
+                return
+            
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/api/search-results/{search_id}")
-async def get_search_results(search_id: str):
+async def get_search_results(
+    search_id: str,
+    offset: int = Query(0, ge=0, description="First match to return"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Matches per page (default: all)"),
+    person_id: Optional[str] = Query(None, description="Page one person's matches of a multi-person search")
+):
     """
-    Retrieve search results from in-memory cache.
-    Render-compatible: uses memory cache instead of disk reads.
+    Retrieve search results from the result store (memory first, then disk).
+    With offset/limit, returns one page of matches plus pagination info.
     """
     try:
-        # Check memory cache first (primary source)
-        if search_id in search_results_cache:
-            results = search_results_cache[search_id]
-            logger.info(f"Found results in memory cache for search_id: {search_id}")
+        results = result_store.get(search_id)
+        if results is not None:
+            logger.info(f"Found results for search_id: {search_id}")
+            if offset or limit is not None or person_id is not None:
+                results = paginate_results(results, offset, limit, person_id)
             return JSONResponse(
                 status_code=200,
                 content={
@@ -178,25 +558,17 @@ async def get_search_results(search_id: str):
                 }
             )
         
-        # Fallback: Try to read from disk (for recovered sessions, if disk available)
-        results_file = Settings.RESULTS_DIR / f"{search_id}.json"
-        if results_file.exists():
-            try:
-                with open(results_file, "r") as f:
-                    results = json.load(f)
-                # Cache it in memory for future requests
-                search_results_cache[search_id] = results
-                logger.info(f"Loaded results from disk for search_id: {search_id}")
-                return JSONResponse(
-                    status_code=200,
-                    content={
-                        "success": True,
-                        "search_id": search_id,
-                        "results": results
-                    }
-                )
-            except Exception as e:
-                logger.warning(f"Failed to read results file: {e}")
+        # Search still queued or running: report progress and partial matches
+        job = search_jobs.get(search_id)
+        if job is not None and not job.finished:
+            return JSONResponse(
+                status_code=202,
+                content={
+                    "success": True,
+                    "message": "Search is still processing",
+                    **job.to_dict()
+                }
+            )
         
         # Results not found in memory or disk
         return JSONResponse(
@@ -220,6 +592,61 @@ async def get_search_results(search_id: str):
         )
 
 
+@app.get("/api/search-results/{search_id}/rerank")
+async def rerank_search_results(
+    search_id: str,
+    similarity_threshold: Optional[float] = Query(None, ge=0, le=1, description="New match threshold"),
+    cameras: Optional[str] = Query(None, description="Comma-separated cameras to keep (default: all)"),
+    person_id: Optional[str] = Query(None, description="Only this person's matches (multi-person searches)"),
+    sort_by: str = Query("confidence", description="confidence or time"),
+    group_by: Optional[str] = Query(None, description="camera or person"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Maximum matches returned")
+):
+    """
+    Re-threshold, filter and re-sort a finished search from its stored
+    candidates, without rescanning any footage.
+    """
+    if sort_by not in ("confidence", "time") or group_by not in (None, "camera", "person"):
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "message": "sort_by must be confidence|time and group_by camera|person"}
+        )
+    
+    camera_list = [c.strip() for c in cameras.split(",") if c.strip()] if cameras else None
+    results = search_service.rerank_search(
+        search_id, similarity_threshold, camera_list, person_id, sort_by, group_by, limit
+    )
+    if results["status"] == "error":
+        return JSONResponse(status_code=404, content={"success": False, "message": results["error"], "search_id": search_id})
+    
+    return {"success": True, "results": results}
+
+
+@app.delete("/api/search-results/{search_id}")
+async def delete_search_results(search_id: str):
+    """Delete one search's results and snapshots (memory and disk)."""
+    job = search_jobs.get(search_id)
+    if job is not None and not job.finished:
+        return JSONResponse(
+            status_code=409,
+            content={"success": False, "message": "Search is still processing", "search_id": search_id}
+        )
+    
+    known = search_id in result_store or job is not None
+    deleted = await asyncio.to_thread(result_store.delete, search_id)
+    search_service.candidate_store.delete(search_id)
+    search_jobs.remove(search_id)
+    
+    if not known and not deleted:
+        return JSONResponse(
+            status_code=404,
+            content={"success": False, "message": "Search not found", "search_id": search_id}
+        )
+    
+    logger.info(f"Deleted search {search_id} ({len(deleted)} file(s))")
+    return {"success": True, "search_id": search_id, "deleted": deleted}
+
+
 @app.post("/api/clear-results")
 async def clear_results():
     """
@@ -229,7 +656,9 @@ async def clear_results():
     """
     try:
         # Clear in-memory cache
-        search_results_cache.clear()
+        result_store.clear()
+        search_service.candidate_store.clear()
+        search_jobs.clear_finished()
 
         # Remove image files from results directory (jpg/png/jpeg/png)
         deleted_files = []
@@ -290,6 +719,70 @@ async def get_snapshot(filename: str):
         )
 
 
+# ============================================================================
+# FACE INDEX ENDPOINTS
+# ============================================================================
+
+@app.post("/api/index/build")
+async def build_face_index():
+    """
+    Offline indexing stage: decode and embed every CCTV video once so later
+    searches only scan the stored embeddings. Already-current videos are skipped.
+    """
+    try:
+        videos = list(Settings.VIDEO_DIR.glob("*.mp4"))
+        stats = await asyncio.to_thread(search_service.index_videos, videos)
+        return {"success": True, "stats": stats}
+    except Exception as e:
+        logger.error(f"Error building face index: {e}", exc_info=True)
+        return JSONResponse(status_code=500, content={"success": False, "message": str(e)})
+
+
+@app.post("/api/index/clear")
+async def clear_face_index():
+    """Delete all stored face indexes and the archive index (they are rebuilt on the next search)."""
+    try:
+        deleted = 0
+        if search_service.face_index is not None:
+            deleted = await asyncio.to_thread(search_service.face_index.clear)
+        await asyncio.to_thread(search_service.clear_archive)
+        logger.info(f"Cleared {deleted} face index entries and the archive index")
+        return {"success": True, "deleted": deleted}
+    except Exception as e:
+        logger.error(f"Error clearing face index: {e}", exc_info=True)
+        return JSONResponse(status_code=500, content={"success": False, "message": str(e)})
+
+
+@app.post("/api/archive/search")
+async def search_archive(
+    file: UploadFile = File(...),
+    top_k: int = Query(100, ge=1, le=1000, description="Maximum candidates to return"),
+    threshold: Optional[float] = Query(None, ge=0, le=1, description="Minimum similarity (default: search threshold)")
+):
+    """
+    Search every archived face (all footage indexed so far) with the
+    approximate nearest-neighbour index. Does not decode any video.
+    """
+    try:
+        if not file.filename:
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "message": "No file provided"}
+            )
+        
+        upload_path = save_upload(file.file, Settings.UPLOAD_DIR)
+        
+        results = await asyncio.to_thread(search_service.search_archive, str(upload_path), top_k, threshold)
+        if results["status"] == "error":
+            return JSONResponse(status_code=400, content={"success": False, "message": results["error"]})
+        
+        return {"success": True, **results}
+        
+    except Exception as e:
+        logger.error(f"Error searching archive: {e}", exc_info=True)
+        return JSONResponse(status_code=500, content={"success": False, "message": str(e)})
+
+
 # ============================================================================
 # CAMERA MANAGEMENT ENDPOINTS
 # ============================================================================
@@ -318,7 +811,7 @@ async def get_cameras():
 async def get_cctv_config():
     """Get saved CCTV camera configuration"""
     try:
-        config_file = Path("cctv_config.json")
+        config_file = Settings.CCTV_CONFIG_FILE
         
         if config_file.exists():
             with open(config_file, "r") as f:
@@ -343,7 +836,7 @@ async def get_cctv_config():
 async def save_cctv_config(cameras: Dict[str, Any]):
     """Save CCTV camera configuration"""
     try:
-        config_file = Path("cctv_config.json")
+        config_file = Settings.CCTV_CONFIG_FILE
         
         with open(config_file, "w") as f:
             json.dump(cameras, f, indent=2)
@@ -362,6 +855,214 @@ async def save_cctv_config(cameras: Dict[str, Any]):
         )
 
 
+@app.get("/api/cctv/roi")
+async def get_camera_rois():
+    """Get per-camera detection regions (normalized polygons)"""
+    return {"success": True, "rois": load_roi_config(Settings.CAMERA_ROI_FILE)}
+
+
+@app.post("/api/cctv/roi")
+async def save_camera_rois(rois: Dict[str, Any]):
+    """
+    Save per-camera detection regions.
+    
+    Body: {camera_id or video name: [[[x, y], ...], ...]} with x/y in [0, 1].
+    Videos whose ROI changed are re-indexed on their next search.
+    """
+    try:
+        rois = parse_roi_config(rois)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "message": str(e)}
+        )
+    
+    try:
+        with open(Settings.CAMERA_ROI_FILE, "w") as f:
+            json.dump(rois, f, indent=2)
+        
+        logger.info(f"Camera ROIs saved: {len(rois)} camera(s)")
+        
+        return {
+            "success": True,
+            "message": f"Regions saved for {len(rois)} camera(s)",
+            "rois": rois
+        }
+    except Exception as e:
+        logger.error(f"Error saving camera ROIs: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={"success": False, "message": str(e)}
+        )
+
+
+@app.post("/api/cctv/test")
+async def test_cctv_connection(rtsp_url: str = Form(...)):
+    """Test an RTSP URL: reuses a warm pooled stream if one exists, else probes with a temporary stream that is closed afterwards."""
+    result = await asyncio.to_thread(search_service.test_rtsp_connection, rtsp_url)
+    return {"success": result["connected"], **result}
+
+
+@app.get("/api/cctv/streams")
+async def get_stream_metrics():
+    """Health of pooled RTSP streams: FPS, latency, dropped frames, reconnects, uptime."""
+    streams = search_service.stream_pool.metrics()
+    return {"success": True, "streams": streams, "total": len(streams)}
+
+
+# ============================================================================
+# LIVE INGESTION ENDPOINTS
+# ============================================================================
+
+@app.post("/api/live/start")
+async def start_live_ingest(camera_ids: Optional[List[str]] = Query(None, description="Cameras to start (default: all configured)")):
+    """Start continuous ingestion for cameras in cctv_config.json."""
+    try:
+        cameras = load_camera_config(Settings.CCTV_CONFIG_FILE)
+        if camera_ids:
+            cameras = [c for c in cameras if c["id"] in camera_ids]
+        
+        if not cameras:
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "message": "No cameras with an RTSP URL are configured"}
+            )
+        
+        result = live_ingest.start(cameras)
+        return {"success": True, **result}
+        
+    except Exception as e:
+        logger.error(f"Error starting live ingestion: {e}", exc_info=True)
+        return JSONResponse(status_code=500, content={"success": False, "message": str(e)})
+
+
+@app.post("/api/live/stop")
+async def stop_live_ingest():
+    """Stop all camera readers and matchers."""
+    await asyncio.to_thread(live_ingest.stop)
+    return {"success": True, "message": "Live ingestion stopped"}
+
+
+@app.get("/api/live/status")
+async def get_live_status():
+    """Per-camera reader state, queue depth and alert counts."""
+    return {"success": True, **live_ingest.status()}
+
+
+@app.get("/api/live/watchlist")
+async def get_watchlist():
+    """List persons currently matched against live footage."""
+    persons = live_ingest.watchlist.to_list()
+    return {"success": True, "persons": persons, "total": len(persons)}
+
+
+@app.post("/api/live/watchlist")
+async def add_to_watchlist(
+    file: UploadFile = File(...),
+    person_id: Optional[str] = Form(None),
+    label: Optional[str] = Form(None)
+):
+    """Register a lost person's photo; live footage is matched against it immediately."""
+    try:
+        if not file.filename:
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "message": "No file provided"}
+            )
+        
+        person_id = person_id or f"person_{datetime.now().timestamp()}"
+        upload_path = save_upload(file.file, Settings.UPLOAD_DIR)
+        
+        embedding, error = await asyncio.to_thread(search_service._embed_query_photo, str(upload_path))
+        if embedding is None:
+            return JSONResponse(status_code=400, content={"success": False, "message": error})
+        
+        live_ingest.watchlist.add(person_id, embedding, label)
+        logger.info(f"Added {person_id} to live watchlist")
+        return {"success": True, "person_id": person_id, "watchlist_size": len(live_ingest.watchlist)}
+        
+    except Exception as e:
+        logger.error(f"Error adding to watchlist: {e}", exc_info=True)
+        return JSONResponse(status_code=500, content={"success": False, "message": str(e)})
+
+
+@app.delete("/api/live/watchlist/{person_id}")
+async def remove_from_watchlist(person_id: str):
+    """Stop matching a person (e.g. case closed)."""
+    if not live_ingest.watchlist.remove(person_id):
+        return JSONResponse(
+            status_code=404,
+            content={"success": False, "message": "Person not on watchlist"}
+        )
+    return {"success": True, "message": f"Removed {person_id} from watchlist"}
+
+
+@app.get("/api/live/alerts")
+async def get_live_alerts(since: int = Query(0, ge=0, description="Return alerts after this alert_id")):
+    """Recent watchlist alerts, oldest first."""
+    alerts = live_ingest.alerts_since(since)
+    return {"success": True, "alerts": alerts, "total": len(alerts)}
+
+
+@app.get("/api/live/alerts/stream")
+async def stream_live_alerts(since: int = Query(0, ge=0)):
+    """Push watchlist alerts as Server-Sent Events (event: alert)."""
+    async def event_stream():
+        last_id = since
+        while True:
+            for alert in live_ingest.alerts_since(last_id):
+                last_id = alert["alert_id"]
+                yield f"event: alert\ndata: {json.dumps(alert)}\n\n"
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/live/clips")
+async def save_live_clip(
+    camera_id: str = Form(...),
+    seconds_before: Optional[float] = Form(None),
+    seconds_after: Optional[float] = Form(None)
+):
+    """
+    Save buffered footage from a live camera: N seconds before now plus M seconds after.
+    The window is clamped to the buffer length (RING_BUFFER_SECONDS); the response has the applied one.
+    """
+    clip = live_ingest.recorder.request_clip(camera_id, seconds_before, seconds_after)
+    if clip["status"] == "error":
+        return JSONResponse(status_code=400, content={"success": False, "message": clip["error"]})
+    return JSONResponse(
+        status_code=202,
+        content={
+            "success": True,
+            "clip": clip["clip"],
+            "status": clip["status"],
+            "seconds_before": clip["seconds_before"],
+            "seconds_after": clip["seconds_after"]
+        }
+    )
+
+
+@app.get("/api/live/clips")
+async def list_live_clips():
+    """Requested clips and their write status."""
+    clips = live_ingest.recorder.list_clips()
+    return {"success": True, "clips": clips, "total": len(clips)}
+
+
+@app.get("/api/live/clips/{filename}")
+async def get_live_clip(filename: str):
+    """Download a saved clip."""
+    clip_path = Settings.CLIPS_DIR / Path(filename).name
+    if not clip_path.exists():
+        return JSONResponse(status_code=404, content={"success": False, "message": "Clip not found"})
+    return FileResponse(clip_path, media_type="video/mp4")
+
+
 # ============================================================================
 # STATIC FILES
 # ============================================================================
@@ -394,12 +1095,20 @@ async def startup_event():
     logger.info(f"Results directory: {Settings.RESULTS_DIR}")
     logger.info(f"Videos directory: {Settings.VIDEO_DIR}")
     logger.info("=" * 70)
+    
+    if Settings.LIVE_INGEST_AUTOSTART:
+        cameras = load_camera_config(Settings.CCTV_CONFIG_FILE)
+        if cameras:
+            live_ingest.start(cameras)
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    live_ingest.stop()
+    search_service.stream_pool.close_all()
     logger.info("DRISTI system shutting down")
+    log_listener.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+"""
+Candidates - Compact per-search candidate lists for re-thresholding.
+
+A search keeps, per person and video, the best-scoring sample of each face
+track above a low floor (capped at top-K), not just the matches above the
+search threshold. Re-filtering that list under a new threshold or camera
+subset reproduces what a rescan would return, without touching any footage.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Column -> dtype of a candidate list (one row per face track and video);
+# an optional float16 "embedding" column is added when configured
+CANDIDATE_COLUMNS = {
+    "score": np.float32,
+    "camera": np.str_,
+    "frame_index": np.int64,
+    "frame_number": np.int64,
+    "timestamp": np.float64,
+    "track_id": np.int64,
+    "first_seen": np.float64,
+    "last_seen": np.float64,
+    "bbox": np.int32,
+    "quality": np.float32,
+    "snapshot": np.str_,
+}
+
+Candidates = Dict[str, np.ndarray]
+
+
+def concat_candidates(parts: List[Candidates]) -> Candidates:
+    """Join per-video candidate lists into one, highest score first."""
+    if not parts:
+        return empty_candidates()
+    joined = {column: np.concatenate([part[column] for part in parts]) for column in parts[0]}
+    joined["snapshot"] = joined["snapshot"].astype(np.str_)
+    order = np.argsort(-joined["score"], kind="stable")
+    return {column: values[order] for column, values in joined.items()}
+
+
+def empty_candidates() -> Candidates:
+    candidates = {column: np.zeros(0, dtype=dtype) for column, dtype in CANDIDATE_COLUMNS.items()}
+    candidates["bbox"] = np.zeros((0, 4), dtype=np.int32)
+    return candidates
+
+
+class CandidateStore:
+    """LRU of candidate lists per search, persisted as RESULTS_DIR/{search_id}_candidates.npz."""
+
+    def __init__(self, results_dir: Path, max_entries: int = 200):
+        self.results_dir = Path(results_dir)
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Dict[str, Candidates]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _file(self, search_id: str) -> Path:
+        return self.results_dir / f"{Path(search_id).name}_candidates.npz"
+
+    def save(self, search_id: str, candidates: Dict[str, Candidates]) -> None:
+        with self._lock:
+            self._entries[search_id] = candidates
+            self._entries.move_to_end(search_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        try:
+            arrays = {"persons": np.asarray(list(candidates), dtype=np.str_)}
+            for i, person_candidates in enumerate(candidates.values()):
+                for column, values in person_candidates.items():
+                    arrays[f"{i}_{column}"] = values
+            self.results_dir.mkdir(parents=True, exist_ok=True)
+            np.savez(self._file(search_id), **arrays)
+        except Exception as e:
+            logger.warning(f"Could not save candidates for {search_id}: {e}")
+
+    def load(self, search_id: str) -> Optional[Dict[str, Candidates]]:
+        with self._lock:
+            candidates = self._entries.get(search_id)
+            if candidates is not None:
+                self._entries.move_to_end(search_id)
+                return candidates
+
+        candidates_file = self._file(search_id)
+        if not candidates_file.exists():
+            return None
+        try:
+            with np.load(candidates_file) as data:
+                candidates = {}
+                for i, person_id in enumerate(data["persons"]):
+                    candidates[str(person_id)] = {
+                        column[len(f"{i}_"):]: data[column]
+                        for column in data.files
+                        if column.startswith(f"{i}_")
+                    }
+        except Exception as e:
+            logger.warning(f"Could not load candidates for {search_id}: {e}")
+            return None
+
+        with self._lock:
+            self._entries[search_id] = candidates
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return candidates
+
+    def delete(self, search_id: str) -> None:
+        with self._lock:
+            self._entries.pop(search_id, None)
+        self._file(search_id).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,166 @@
+"""
+Columnar - Compact, memory-mapped, appendable storage of face records.
+
+Embeddings are stored as float16 (half of float32) or scalar-quantized int8
+(a quarter, plus one float32 scale per row); frame, bbox, time and track
+fields are plain typed columns. Every column is a raw array file that grows
+by appending and is read back with np.memmap, so only the pages a query
+touches are loaded and the OS page cache serves repeated queries.
+similarity.cosine_scores scores encoded rows block by block without a full
+float32 copy.
+"""
+
+import json
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no fork, so a single process owns the stores
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+# Column name -> (dtype string, per-row shape)
+Schema = Dict[str, Tuple[str, Tuple[int, ...]]]
+
+
+def encode_embeddings(vectors: np.ndarray, dtype: str = "float16") -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Encode float32 embeddings for storage.
+
+    int8 uses symmetric per-row scales: row ~= codes * scale, with the row's
+    largest magnitude mapped to 127.
+
+    Returns:
+        (codes, per-row float32 scales or None)
+    """
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unknown embedding dtype '{dtype}', expected one of {EMBEDDING_DTYPES}")
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype != "int8":
+        return vectors.astype(dtype), None
+
+    scales = np.abs(vectors).max(axis=-1) / 127.0 if vectors.size else np.zeros(len(vectors), dtype=np.float32)
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.rint(vectors / scales[..., None]).astype(np.int8)
+    return codes, scales
+
+
+def decode_embeddings(codes: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """Float32 copy of stored embeddings (use on row subsets; scoring decodes in blocks)."""
+    vectors = np.asarray(codes, dtype=np.float32)
+    if scales is not None:
+        vectors = vectors * np.asarray(scales, dtype=np.float32)[..., None]
+    return vectors
+
+
+def append_column(path: Path, array: np.ndarray) -> None:
+    """Append raw array bytes to a file."""
+    with open(path, "ab") as f:
+        f.write(np.ascontiguousarray(array).tobytes())
+
+
+def memmap_column(path: Path, dtype, row_shape: Tuple[int, ...] = (), rows: Optional[int] = None) -> np.ndarray:
+    """
+    Memory-map a raw array file (empty array if missing or empty).
+
+    Args:
+        rows: Map only this many rows (default: every complete row in the file)
+    """
+    row_shape = tuple(row_shape)
+    itemsize = np.dtype(dtype).itemsize * int(np.prod(row_shape, dtype=np.int64))
+    available = path.stat().st_size // itemsize if itemsize and path.exists() else 0
+    rows = available if rows is None else min(rows, available)
+    if rows == 0:
+        return np.zeros((0,) + row_shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,) + row_shape)
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False):
+    """
+    Hold an advisory lock on `path` across processes (forked WEB_WORKERS).
+
+    Writers take it exclusive, readers of files that writers rewrite take
+    it shared. A no-op where fcntl is unavailable.
+    """
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class ColumnStore:
+    """
+    Directory of equal-length columns (`<name>.bin`) described by `columns.json`.
+
+    Appends write each column's rows to the end of its file. The row count is
+    that of the shortest column, so a torn append is never visible.
+    """
+
+    def __init__(self, path: Path, schema: Optional[Schema] = None):
+        self.path = Path(path)
+        schema_file = self.path / "columns.json"
+        if schema_file.exists():
+            with open(schema_file) as f:
+                self.schema: Schema = {
+                    name: (dtype, tuple(shape)) for name, (dtype, shape) in json.load(f).items()
+                }
+        elif schema is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.schema = {name: (np.dtype(dtype).str, tuple(shape)) for name, (dtype, shape) in schema.items()}
+            with open(schema_file, "w") as f:
+                json.dump(self.schema, f)
+        else:
+            raise FileNotFoundError(f"No column store at {self.path}")
+
+    @staticmethod
+    def schema_of(columns: Dict[str, np.ndarray]) -> Schema:
+        """Schema matching a dict of arrays (dtype and per-row shape of each)."""
+        return {name: (np.asarray(array).dtype.str, np.asarray(array).shape[1:]) for name, array in columns.items()}
+
+    def _file(self, name: str) -> Path:
+        return self.path / f"{name}.bin"
+
+    def __len__(self) -> int:
+        lengths = [len(memmap_column(self._file(name), dtype, shape)) for name, (dtype, shape) in self.schema.items()]
+        return min(lengths) if lengths else 0
+
+    def append(self, columns: Dict[str, np.ndarray]) -> int:
+        """Append rows to every column. Returns the number of rows appended."""
+        if set(columns) != set(self.schema):
+            raise ValueError(f"Expected columns {sorted(self.schema)}, got {sorted(columns)}")
+        arrays = {name: np.asarray(columns[name], dtype=dtype) for name, (dtype, _) in self.schema.items()}
+        rows = {len(array) for array in arrays.values()}
+        if len(rows) != 1:
+            raise ValueError(f"Columns have different lengths: { {name: len(a) for name, a in arrays.items()} }")
+        for name, array in arrays.items():
+            if array.shape[1:] != self.schema[name][1]:
+                raise ValueError(f"Column {name} has rows of shape {array.shape[1:]}, expected {self.schema[name][1]}")
+            append_column(self._file(name), array)
+        return rows.pop()
+
+    def column(self, name: str, rows: Optional[int] = None) -> np.ndarray:
+        dtype, shape = self.schema[name]
+        return memmap_column(self._file(name), dtype, shape, len(self) if rows is None else rows)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Memory-mapped view of every column, cut to the same row count."""
+        rows = len(self)
+        return {name: self.column(name, rows) for name in self.schema}
+
+    def nbytes(self) -> int:
+        return sum(self._file(name).stat().st_size for name in self.schema if self._file(name).exists())
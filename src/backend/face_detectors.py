@@ -0,0 +1,192 @@
+"""
+Face Detectors - Swappable face detection backends.
+Detection runs on a downscaled copy of the frame; boxes are mapped back to
+full resolution so crops keep all available detail. A backend with a fixed
+smallest window (Haar) is never downscaled so far that faces of
+min_face_size fall below it.
+"""
+
+import logging
+import math
+from pathlib import Path
+from typing import List, Tuple, Optional
+
+import cv2
+import numpy as np
+
+from src.config.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+# (x, y, w, h, confidence) in full-resolution pixel coordinates
+Detection = Tuple[int, int, int, int, float]
+
+
+class FaceDetector:
+    """Base class: handles downscaling; subclasses implement _detect_scaled."""
+
+    name = "base"
+
+    # Smallest face the backend can find, in detection pixels (0 = no limit)
+    min_window = 0
+
+    def __init__(self, max_width: int = 640, min_face_size: int = 30, min_confidence: float = 0.0):
+        """
+        Args:
+            min_confidence: Detections below this are dropped before embedding
+        """
+        self.max_width = max_width
+        self.min_face_size = min_face_size
+        self.min_confidence = min_confidence
+
+    def detect(self, frame: np.ndarray) -> List[Detection]:
+        """Detect faces and return boxes with confidence scores in [0, 1]."""
+        h, w = frame.shape[:2]
+        scale = 1.0
+        if self.max_width and w > self.max_width:
+            scale = min(1.0, max(self.max_width / w, self.min_window / self.min_face_size))
+        if scale < 1.0:
+            frame = cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+
+        detections = []
+        for x, y, fw, fh, score in self._detect_scaled(frame, scale):
+            detections.append((
+                int(round(x / scale)),
+                int(round(y / scale)),
+                int(round(fw / scale)),
+                int(round(fh / scale)),
+                float(score)
+            ))
+        return detections
+
+    def _detect_scaled(self, frame: np.ndarray, scale: float) -> List[Detection]:
+        raise NotImplementedError
+
+
+class HaarFaceDetector(FaceDetector):
+    """OpenCV Haar cascade. Confidence is derived from the final-stage weight."""
+
+    name = "haar"
+
+    # Size of the cascade's detection window
+    min_window = 24
+
+    # Stage weight at which confidence reaches 1 - 1/e (~0.63)
+    WEIGHT_SCALE = 2.0
+
+    def __init__(self, max_width: int = 640, min_face_size: int = 30, min_confidence: float = 0.0):
+        super().__init__(max_width, min_face_size, min_confidence)
+        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        self.face_cascade = cv2.CascadeClassifier(cascade_path)
+
+    def _detect_scaled(self, frame: np.ndarray, scale: float) -> List[Detection]:
+        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        min_size = max(self.min_window, round(self.min_face_size * scale))
+        faces, _, weights = self.face_cascade.detectMultiScale3(
+            gray_frame,
+            scaleFactor=1.1,
+            minNeighbors=5,
+            minSize=(min_size, min_size),
+            outputRejectLevels=True
+        )
+        weights = np.ravel(weights)
+        return [
+            (x, y, fw, fh, 1 - math.exp(-max(0.0, weights[i]) / self.WEIGHT_SCALE))
+            for i, (x, y, fw, fh) in enumerate(faces)
+        ]
+
+
+class YuNetFaceDetector(FaceDetector):
+    """OpenCV YuNet CNN detector (cv2.FaceDetectorYN) loaded from a local ONNX file."""
+
+    name = "yunet"
+
+    def __init__(self, model_path: Path, max_width: int = 640, min_face_size: int = 30, min_confidence: float = 0.5):
+        super().__init__(max_width, min_face_size, min_confidence)
+        self.detector = cv2.FaceDetectorYN.create(str(model_path), "", (320, 320), min_confidence, 0.3, 5000)
+
+    def _detect_scaled(self, frame: np.ndarray, scale: float) -> List[Detection]:
+        h, w = frame.shape[:2]
+        self.detector.setInputSize((w, h))
+        _, faces = self.detector.detect(frame)
+        if faces is None:
+            return []
+        min_size = self.min_face_size * scale
+        return [
+            (face[0], face[1], face[2], face[3], face[14])
+            for face in faces
+            if face[2] >= min_size and face[3] >= min_size
+        ]
+
+
+class SsdFaceDetector(FaceDetector):
+    """OpenCV DNN ResNet-10 SSD face detector (Caffe prototxt + weights)."""
+
+    name = "ssd"
+
+    def __init__(
+        self,
+        prototxt_path: Path,
+        model_path: Path,
+        max_width: int = 640,
+        min_face_size: int = 30,
+        min_confidence: float = 0.5
+    ):
+        super().__init__(max_width, min_face_size, min_confidence)
+        self.net = cv2.dnn.readNetFromCaffe(str(prototxt_path), str(model_path))
+
+    def _detect_scaled(self, frame: np.ndarray, scale: float) -> List[Detection]:
+        h, w = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame, 1.0, (300, 300), (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+
+        min_size = self.min_face_size * scale
+        results = []
+        for det in detections:
+            x1, y1, x2, y2 = det[3] * w, det[4] * h, det[5] * w, det[6] * h
+            x1, y1 = max(0.0, x1), max(0.0, y1)
+            fw, fh = min(w, x2) - x1, min(h, y2) - y1
+            if fw >= min_size and fh >= min_size:
+                results.append((x1, y1, fw, fh, det[2]))
+        return results
+
+
+def create_face_detector(backend: Optional[str] = None) -> FaceDetector:
+    """
+    Build the configured face detector.
+
+    Falls back to the Haar cascade if a DNN backend's model files are missing
+    or fail to load.
+    """
+    backend = (backend or Settings.FACE_DETECTOR).lower()
+    max_width = Settings.DETECTION_MAX_WIDTH
+
+    try:
+        if backend == "yunet":
+            if Settings.YUNET_MODEL_PATH.exists():
+                detector = YuNetFaceDetector(
+                    Settings.YUNET_MODEL_PATH,
+                    max_width,
+                    min_confidence=Settings.DETECTION_CONFIDENCE
+                )
+                logger.info(f"YuNet face detector loaded from {Settings.YUNET_MODEL_PATH}")
+                return detector
+            logger.warning(f"YuNet model not found at {Settings.YUNET_MODEL_PATH}. Using Haar cascade.")
+        elif backend == "ssd":
+            if Settings.SSD_PROTOTXT_PATH.exists() and Settings.SSD_MODEL_PATH.exists():
+                detector = SsdFaceDetector(
+                    Settings.SSD_PROTOTXT_PATH,
+                    Settings.SSD_MODEL_PATH,
+                    max_width,
+                    min_confidence=Settings.DETECTION_CONFIDENCE
+                )
+                logger.info(f"SSD face detector loaded from {Settings.SSD_MODEL_PATH}")
+                return detector
+            logger.warning(f"SSD model files not found in {Settings.MODELS_DIR}. Using Haar cascade.")
+        elif backend != "haar":
+            logger.warning(f"Unknown face detector '{backend}'. Using Haar cascade.")
+    except Exception as e:
+        logger.warning(f"Could not load {backend} face detector: {e}. Using Haar cascade.")
+
+    return HaarFaceDetector(Settings.HAAR_MAX_WIDTH, min_confidence=Settings.HAAR_MIN_CONFIDENCE)
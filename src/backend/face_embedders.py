@@ -0,0 +1,203 @@
+"""
+Face Embedders - CPU inference backends for the ResNet18 face embedder.
+
+The same ResNet18 features can be computed by:
+
+- fp32: eager PyTorch (or the frozen TorchScript export), optionally in
+  channels-last memory format
+- jit: traced, frozen and inference-optimized TorchScript (batch norm folded
+  into the convolutions), built when the model loads
+- int8: statically quantized TorchScript (per-channel weights, x86/fbgemm
+  kernels), calibrated on face crops from the bundled clips
+- onnx: an ONNX export run through OpenCV's DNN module
+
+int8 and onnx models are built offline by check_embedder.py, which also
+compares their embeddings against the float32 reference.
+"""
+
+import logging
+import threading
+import warnings
+from pathlib import Path
+from typing import List, Iterable, Optional
+
+import cv2
+import numpy as np
+
+from src.backend.similarity import normalize
+
+logger = logging.getLogger(__name__)
+
+EMBED_MODES = ("fp32", "jit", "int8", "onnx")
+
+# ImageNet mean/std on the 0-255 scale
+_NORM_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32) * 255
+_NORM_SCALE = 1.0 / (np.array([0.229, 0.224, 0.225], dtype=np.float32) * 255)
+
+
+def preprocess_faces(face_images: List[np.ndarray], size: int = 224) -> np.ndarray:
+    """Resize, convert BGR->RGB and ImageNet-normalize crops into an NCHW float32 batch."""
+    batch = np.stack([
+        cv2.resize(face, (size, size), interpolation=cv2.INTER_LINEAR)
+        for face in face_images
+    ])
+    batch = batch[..., ::-1].astype(np.float32)
+    batch -= _NORM_MEAN
+    batch *= _NORM_SCALE
+    return np.ascontiguousarray(batch.transpose(0, 3, 1, 2))
+
+
+class FaceEmbedder:
+    """Base class: handles preprocessing and normalization; subclasses implement _forward."""
+
+    name = "base"
+
+    def __init__(self, input_size: int = 224):
+        self.input_size = input_size
+
+    @property
+    def tag(self) -> str:
+        """Identifies the embedding space; int8 embeddings are not interchangeable with float ones."""
+        tag = f"resnet18_{self.input_size}"
+        return f"{tag}_int8" if self.name == "int8" else tag
+
+    def embed(self, face_images: List[np.ndarray]) -> np.ndarray:
+        """(N, 512) L2-normalized embeddings of BGR face crops."""
+        batch = preprocess_faces(face_images, self.input_size)
+        return normalize(self._forward(batch).reshape(len(face_images), -1))
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class TorchFaceEmbedder(FaceEmbedder):
+    """Eager, TorchScript or quantized PyTorch module."""
+
+    def __init__(self, model, input_size: int = 224, channels_last: bool = False, name: str = "fp32"):
+        super().__init__(input_size)
+        self.model = model
+        self.channels_last = channels_last
+        self.name = name
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        import torch
+
+        tensor = torch.from_numpy(batch)
+        if self.channels_last:
+            tensor = tensor.contiguous(memory_format=torch.channels_last)
+        with torch.inference_mode():
+            return self.model(tensor).numpy()
+
+
+class OnnxFaceEmbedder(FaceEmbedder):
+    """ONNX export run by OpenCV's DNN module."""
+
+    name = "onnx"
+
+    def __init__(self, onnx_path: Path, input_size: int = 224):
+        super().__init__(input_size)
+        self.net = cv2.dnn.readNetFromONNX(str(onnx_path))
+        # cv2.dnn.Net keeps per-call state; searches and live matching share it
+        self._lock = threading.Lock()
+
+    def _forward(self, batch: np.ndarray) -> np.ndarray:
+        with self._lock:
+            self.net.setInput(batch)
+            return self.net.forward()
+
+
+def to_channels_last(model):
+    """Move an eager module's weights to NHWC, which oneDNN convolutions run faster on."""
+    import torch
+    return model.to(memory_format=torch.channels_last)
+
+
+def trace_frozen(model, input_size: int = 224, channels_last: bool = False):
+    """Trace, freeze and inference-optimize an eager module into TorchScript."""
+    import torch
+
+    example = torch.zeros(1, 3, input_size, input_size)
+    if channels_last:
+        example = example.contiguous(memory_format=torch.channels_last)
+    # torch.jit is deprecated in favour of torch.export, but loads and runs fastest on CPU today
+    with torch.no_grad(), warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        return torch.jit.optimize_for_inference(torch.jit.freeze(torch.jit.trace(model, example)))
+
+
+def quantize_int8(model, calibration: Iterable[np.ndarray], input_size: int = 224):
+    """
+    Statically quantize an eager module to int8 and freeze it as TorchScript.
+
+    Dynamic quantization only covers Linear/LSTM layers, and the headless
+    ResNet18 is all convolutions, so activations are calibrated instead.
+
+    Args:
+        model: Eager float32 module (not TorchScript)
+        calibration: Preprocessed NCHW batches of representative face crops
+    """
+    import copy
+    import torch
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    example = torch.zeros(1, 3, input_size, input_size)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        prepared = prepare_fx(copy.deepcopy(model).eval(), get_default_qconfig_mapping("x86"), (example,))
+        with torch.inference_mode():
+            for batch in calibration:
+                prepared(torch.from_numpy(batch))
+        quantized = convert_fx(prepared)
+        with torch.no_grad():
+            return torch.jit.freeze(torch.jit.trace(quantized, example))
+
+
+def export_onnx(model, onnx_path: Path, input_size: int = 224) -> None:
+    """Export an eager module to ONNX with dynamic batch and input size (needs the onnx package)."""
+    import torch
+
+    onnx_path = Path(onnx_path)
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+    example = torch.zeros(1, 3, input_size, input_size)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        torch.onnx.export(
+            model, example, str(onnx_path),
+            dynamo=False,
+            input_names=["input"],
+            output_names=["embedding"],
+            dynamic_axes={"input": {0: "batch", 2: "height", 3: "width"}, "embedding": {0: "batch"}},
+            opset_version=13
+        )
+
+
+def create_face_embedder(
+    model,
+    mode: str = "fp32",
+    input_size: int = 224,
+    channels_last: bool = False
+) -> Optional[FaceEmbedder]:
+    """
+    Wrap a loaded float model for the requested mode.
+
+    Args:
+        model: Eager module or frozen TorchScript from model_loader (None = histogram)
+        mode: "fp32" or "jit"; int8/onnx models are loaded from their own files
+    """
+    if model is None:
+        return None
+
+    import torch
+    if isinstance(model, torch.jit.ScriptModule):
+        # A frozen export already has its weights baked in (contiguous) layout;
+        # it runs as plain fp32 unless jit mode optimizes it
+        if mode == "jit":
+            model = torch.jit.optimize_for_inference(model)
+        return TorchFaceEmbedder(model, input_size, False, "jit" if mode == "jit" else "fp32")
+
+    if channels_last:
+        model = to_channels_last(model)
+    if mode == "jit":
+        model = trace_frozen(model, input_size, channels_last)
+    return TorchFaceEmbedder(model, input_size, channels_last, mode)
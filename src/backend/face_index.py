@@ -0,0 +1,191 @@
+"""
+Face Index - Persistent per-video face embedding index.
+Each video is decoded and embedded once; later searches scan the stored matrix.
+
+Entries are column stores (see columnar.py): float16/int8 embeddings and
+per-face columns in `faces/`, per-track columns in `tracks/`, memory-mapped
+on load. Saves and clears hold a file lock shared by forked server workers.
+"""
+
+import hashlib
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from src.config.settings import Settings
+from src.backend.columnar import ColumnStore, EMBEDDING_DTYPES, encode_embeddings, file_lock
+
+logger = logging.getLogger(__name__)
+
+# Arrays stored for every embedded face sample (one row per embedding)
+INDEX_ARRAYS = ("embeddings", "frame_indices", "frame_numbers", "timestamps", "bboxes", "track_ids", "qualities")
+
+# Arrays stored per face track (indexed by track id)
+TRACK_ARRAYS = ("track_first_frames", "track_last_frames", "track_first_times", "track_last_times")
+
+
+class FaceIndex:
+    """On-disk store of face embeddings, one entry per (video, pipeline settings) combination."""
+
+    def __init__(self, index_dir: Optional[Path] = None, embedding_dtype: Optional[str] = None):
+        self.index_dir = Path(index_dir or Settings.INDEX_DIR)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.lock_file = self.index_dir.with_name(self.index_dir.name + ".lock")
+        self.embedding_dtype = embedding_dtype or Settings.EMBEDDING_STORAGE
+        if self.embedding_dtype not in EMBEDDING_DTYPES:
+            raise ValueError(f"Unknown embedding dtype '{self.embedding_dtype}', expected one of {EMBEDDING_DTYPES}")
+
+    @staticmethod
+    def _path_hash(video_path: Path) -> str:
+        """Stable short hash of the resolved video path."""
+        return hashlib.sha1(str(Path(video_path).resolve()).encode()).hexdigest()[:12]
+
+    @staticmethod
+    def video_key(video_path: Path, tag: str) -> str:
+        """
+        Build the cache key for a video.
+
+        The key covers path, size and mtime so an edited or replaced file
+        invalidates its index, plus a tag describing the detector, embedder,
+        sampling and tracking settings that produced the stored vectors.
+        """
+        stat = Path(video_path).stat()
+        raw = f"{Path(video_path).resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{tag}"
+        return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+    def _index_dir(self, video_path: Path, key: str) -> Path:
+        video_path = Path(video_path)
+        return self.index_dir / f"{video_path.stem}_{self._path_hash(video_path)}_{key}_{self.embedding_dtype}"
+
+    def snapshot_dir(self, video_path: Path, tag: str) -> Optional[Path]:
+        """
+        Snapshot cache of a stored entry (None if the video has no current entry).
+
+        It lives inside the entry, so it is dropped with the entry when the
+        video or the pipeline settings change.
+        """
+        try:
+            entry_dir = self._index_dir(video_path, self.video_key(video_path, tag))
+        except OSError:
+            return None
+        return entry_dir / "snapshots" if (entry_dir / "meta.json").exists() else None
+
+    def encode(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Entry with embeddings in the storage dtype (plus "embedding_scales" for int8).
+
+        Freshly built entries go through this before they are saved and
+        scored, so a first search scores exactly what later searches load.
+        """
+        if "embedding_scales" in entry or entry["embeddings"].dtype == np.dtype(self.embedding_dtype):
+            return entry
+        codes, scales = encode_embeddings(entry["embeddings"], self.embedding_dtype)
+        entry = dict(entry, embeddings=codes)
+        if scales is not None:
+            entry["embedding_scales"] = scales
+        return entry
+
+    def load(self, video_path: Path, tag: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the stored index for a video.
+
+        Returns:
+            Dictionary of index arrays and metadata, or None if missing/stale.
+        """
+        try:
+            key = self.video_key(video_path, tag)
+            entry_dir = self._index_dir(video_path, key)
+            if not entry_dir.exists():
+                return None
+
+            with open(entry_dir / "meta.json") as f:
+                meta = json.load(f)
+            entry = ColumnStore(entry_dir / "faces").columns()
+            entry.update(ColumnStore(entry_dir / "tracks").columns())
+            entry["fps"] = float(meta["fps"])
+            entry["frames_processed"] = int(meta["frames_processed"])
+
+            logger.info(f"Loaded face index for {Path(video_path).name} ({len(entry['embeddings'])} faces)")
+            return entry
+        except Exception as e:
+            logger.warning(f"Could not load face index for {video_path}: {e}")
+            return None
+
+    def save(self, video_path: Path, tag: str, entry: Dict[str, Any]) -> None:
+        """Persist an index entry (encoded, see encode()) and drop stale entries for the same video."""
+        try:
+            video_path = Path(video_path)
+            key = self.video_key(video_path, tag)
+            entry_dir = self._index_dir(video_path, key)
+            entry = self.encode(entry)
+
+            # Write to a temp directory first so a crash never leaves a half-written index
+            with file_lock(self.lock_file):
+                tmp_dir = entry_dir.with_name(entry_dir.name + ".tmp")
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                face_names = INDEX_ARRAYS + (("embedding_scales",) if "embedding_scales" in entry else ())
+                for store, names in (("faces", face_names), ("tracks", TRACK_ARRAYS)):
+                    columns = {name: entry[name] for name in names}
+                    ColumnStore(tmp_dir / store, ColumnStore.schema_of(columns)).append(columns)
+                with open(tmp_dir / "meta.json", "w") as f:
+                    json.dump({"fps": float(entry["fps"]), "frames_processed": int(entry["frames_processed"])}, f)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                tmp_dir.replace(entry_dir)
+
+                for stale in self.index_dir.glob(f"{video_path.stem}_{self._path_hash(video_path)}_*"):
+                    if stale != entry_dir:
+                        self._remove(stale)
+
+            logger.info(f"Saved face index for {video_path.name} ({len(entry['embeddings'])} faces)")
+        except Exception as e:
+            logger.warning(f"Failed to save face index for {video_path}: {e}")
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+
+    def clear(self) -> int:
+        """Remove all stored index entries (and pre-columnar .npz files). Returns number deleted."""
+        deleted = 0
+        with file_lock(self.lock_file):
+            for path in self.index_dir.iterdir():
+                self._remove(path)
+                deleted += 1
+        return deleted
+
+
+def merge_index_entries(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Concatenate index entries for consecutive frame ranges of the same video.
+
+    Track ids are offset so they stay unique; a person visible across a range
+    boundary ends up as two tracks.
+    """
+    merged = {
+        "fps": entries[0]["fps"],
+        "frames_processed": sum(entry["frames_processed"] for entry in entries)
+    }
+
+    for name in TRACK_ARRAYS:
+        merged[name] = np.concatenate([entry[name] for entry in entries])
+
+    track_offsets = np.cumsum([0] + [len(entry["track_first_frames"]) for entry in entries[:-1]])
+    non_empty = [(entry, offset) for entry, offset in zip(entries, track_offsets) if len(entry["embeddings"])]
+
+    if not non_empty:
+        merged.update({name: entries[0][name] for name in INDEX_ARRAYS})
+        return merged
+
+    for name in INDEX_ARRAYS:
+        if name == "track_ids":
+            merged[name] = np.concatenate([entry[name] + offset for entry, offset in non_empty])
+        else:
+            merged[name] = np.concatenate([entry[name] for entry, _ in non_empty])
+    return merged
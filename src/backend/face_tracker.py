@@ -0,0 +1,155 @@
+"""
+Face Tracker - Associates face detections across consecutive sampled frames.
+A person standing in view becomes one track that is embedded only periodically
+(or when a better crop shows up) instead of on every sampled frame.
+"""
+
+import logging
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def bbox_iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    """Intersection-over-union of two (x1, y1, x2, y2) boxes."""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+def _centroid_close(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int], max_shift: float) -> bool:
+    """Whether box centres are within max_shift box-sizes of each other."""
+    size = max(a[2] - a[0], a[3] - a[1], 1)
+    dx = (a[0] + a[2] - b[0] - b[2]) / 2
+    dy = (a[1] + a[3] - b[1] - b[3]) / 2
+    return (dx * dx + dy * dy) ** 0.5 <= max_shift * size
+
+
+class FaceTrack:
+    """One tracked face: its latest box and the span it was seen over."""
+
+    def __init__(self, track_id: int, bbox: Tuple[int, int, int, int], frame_idx: int, timestamp: float):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.first_frame = frame_idx
+        self.last_frame = frame_idx
+        self.first_time = timestamp
+        self.last_time = timestamp
+        self.missed = 0
+        self.samples_since_embed = 0
+        self.best_quality = 0.0
+
+
+class FaceTracker:
+    """
+    Greedy IoU tracker with a centroid-distance fallback.
+
+    A track is (re-)embedded when it starts, every reembed_every sampled frames,
+    or when a crop's quality clearly beats the best one embedded so far.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        iou_threshold: float = 0.3,
+        max_missed: int = 2,
+        reembed_every: int = 10,
+        quality_gain: float = 1.2
+    ):
+        self.enabled = enabled
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.reembed_every = max(1, reembed_every)
+        self.quality_gain = quality_gain
+        self.tracks: List[FaceTrack] = []
+        self._active: List[FaceTrack] = []
+
+    @staticmethod
+    def crop_quality(face_data: Dict[str, Any]) -> float:
+        """Crop area weighted by detection confidence and, when scored, crop quality."""
+        x1, y1, x2, y2 = face_data['bbox']
+        return (x2 - x1) * (y2 - y1) * face_data.get('confidence', 1.0) * face_data.get('quality', 1.0)
+
+    def update(
+        self,
+        detections: List[Dict[str, Any]],
+        frame_idx: int,
+        timestamp: float
+    ) -> List[Tuple[Dict[str, Any], FaceTrack, bool]]:
+        """
+        Associate one sampled frame's detections with tracks.
+
+        Returns:
+            (face_data, track, needs_embedding) for every detection.
+        """
+        assigned: Dict[int, FaceTrack] = {}
+
+        if self.enabled and self._active and detections:
+            # Greedy association, best-overlapping pairs first
+            pairs = []
+            for det_no, face_data in enumerate(detections):
+                for track in self._active:
+                    iou = bbox_iou(track.bbox, face_data['bbox'])
+                    if iou >= self.iou_threshold or _centroid_close(track.bbox, face_data['bbox'], 0.5):
+                        pairs.append((iou, det_no, track))
+            pairs.sort(key=lambda pair: pair[0], reverse=True)
+
+            used_tracks = set()
+            for _, det_no, track in pairs:
+                if det_no in assigned or track.track_id in used_tracks:
+                    continue
+                assigned[det_no] = track
+                used_tracks.add(track.track_id)
+
+        results = []
+        seen = set()
+        for det_no, face_data in enumerate(detections):
+            quality = self.crop_quality(face_data)
+            track = assigned.get(det_no)
+
+            if track is None:
+                track = FaceTrack(len(self.tracks), face_data['bbox'], frame_idx, timestamp)
+                self.tracks.append(track)
+                self._active.append(track)
+                needs_embedding = True
+            else:
+                track.bbox = face_data['bbox']
+                track.last_frame = frame_idx
+                track.last_time = timestamp
+                track.samples_since_embed += 1
+                needs_embedding = (
+                    track.samples_since_embed >= self.reembed_every
+                    or quality > track.best_quality * self.quality_gain
+                )
+
+            if needs_embedding:
+                track.samples_since_embed = 0
+                track.best_quality = max(track.best_quality, quality)
+
+            track.missed = 0
+            seen.add(track.track_id)
+            results.append((face_data, track, needs_embedding))
+
+        # Age out tracks that were not seen in this frame
+        for track in self._active:
+            if track.track_id not in seen:
+                track.missed += 1
+        self._active = [t for t in self._active if t.missed <= self.max_missed and self.enabled]
+
+        return results
+
+    def span_arrays(self) -> Dict[str, np.ndarray]:
+        """Per-track first/last seen frames and times, indexed by track id."""
+        return {
+            "track_first_frames": np.asarray([t.first_frame for t in self.tracks], dtype=np.int64),
+            "track_last_frames": np.asarray([t.last_frame for t in self.tracks], dtype=np.int64),
+            "track_first_times": np.asarray([t.first_time for t in self.tracks], dtype=np.float64),
+            "track_last_times": np.asarray([t.last_time for t in self.tracks], dtype=np.float64)
+        }
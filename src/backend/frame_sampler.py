@@ -0,0 +1,161 @@
+"""
+Frame Sampler - Chooses which video frames get decoded for face detection.
+Skipped frames are only grabbed (no retrieve/colour conversion); keyframe mode
+seeks straight to I-frames found by scanning the compressed stream.
+"""
+
+import logging
+import math
+from pathlib import Path
+from typing import List, Iterator, Tuple, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLING_MODES = ("stride", "fps", "keyframe")
+
+
+def find_keyframes(video_path: Path) -> Optional[List[int]]:
+    """
+    Return the frame indices of keyframes without decoding any frames.
+
+    Opens the file in raw (undecoded packet) mode and checks the key-frame
+    flag of each packet. Returns None if the backend does not support it.
+    """
+    cap = cv2.VideoCapture(str(video_path), cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    try:
+        if not cap.isOpened() or cap.get(cv2.CAP_PROP_FORMAT) != -1:
+            return None
+
+        keyframes = []
+        frame_idx = 0
+        while cap.grab():
+            if cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(frame_idx)
+            frame_idx += 1
+        return keyframes
+    except Exception as e:
+        logger.warning(f"Keyframe scan failed for {video_path}: {e}")
+        return None
+    finally:
+        cap.release()
+
+
+class FrameSampler:
+    """
+    Frame sampling policy.
+
+    Modes:
+        stride: every Nth frame (frame_skip)
+        fps: N frames per second of footage (sample_fps)
+        keyframe: only keyframes, for fast triage
+    """
+
+    def __init__(self, mode: str = "stride", frame_skip: int = 5, sample_fps: float = 2.0):
+        if mode not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode '{mode}', expected one of {SAMPLING_MODES}")
+        self.mode = mode
+        self.frame_skip = max(1, frame_skip)
+        self.sample_fps = max(0.01, sample_fps)
+
+    @property
+    def tag(self) -> str:
+        """Identifier of the sampling policy, used to key stored face indexes."""
+        if self.mode == "stride":
+            return f"stride{self.frame_skip}"
+        if self.mode == "fps":
+            return f"fps{self.sample_fps:g}"
+        return "keyframe"
+
+    @property
+    def splittable(self) -> bool:
+        """Whether a video can be split into frame ranges sampled independently."""
+        return self.mode != "keyframe"
+
+    def is_sampled(self, frame_idx: int, fps: float) -> bool:
+        """Decide from the absolute frame index alone, so frame-range shards agree."""
+        if self.mode == "stride":
+            return frame_idx % self.frame_skip == 0
+        ratio = self.sample_fps / fps
+        return frame_idx == 0 or math.floor(frame_idx * ratio) != math.floor((frame_idx - 1) * ratio)
+
+    def sample_number(self, frame_idx: int, fps: float) -> int:
+        """1-based ordinal of a sampled frame within the video."""
+        if self.mode == "stride":
+            return frame_idx // self.frame_skip + 1
+        return math.floor(frame_idx * self.sample_fps / fps) + 1
+
+    def estimate_samples(self, total_frames: int, fps: float) -> int:
+        """Rough number of frames a pass will sample (for progress/ETA)."""
+        if self.mode == "stride":
+            return -(-total_frames // self.frame_skip)
+        if self.mode == "fps":
+            return min(total_frames, math.ceil(total_frames * self.sample_fps / fps))
+        # Typical CCTV encoders emit a keyframe every 1-2 seconds
+        return max(1, math.ceil(total_frames / (2 * fps)))
+
+    def iter_frames(
+        self,
+        cap: cv2.VideoCapture,
+        video_path: Path,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None
+    ) -> Iterator[Tuple[int, int, np.ndarray]]:
+        """
+        Yield (frame_index, sample_number, frame) for sampled frames in [start, end).
+
+        Only sampled frames are retrieved; others are grabbed and discarded.
+        """
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+
+        if self.mode == "keyframe":
+            yield from self._iter_keyframes(cap, video_path, fps, start_frame, end_frame)
+            return
+
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+        frame_idx = start_frame
+        while end_frame is None or frame_idx < end_frame:
+            if not self.is_sampled(frame_idx, fps):
+                if not cap.grab():
+                    break
+                frame_idx += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame_idx, self.sample_number(frame_idx, fps), frame
+            frame_idx += 1
+
+    def _iter_keyframes(
+        self,
+        cap: cv2.VideoCapture,
+        video_path: Path,
+        fps: float,
+        start_frame: int,
+        end_frame: Optional[int]
+    ) -> Iterator[Tuple[int, int, np.ndarray]]:
+        keyframes = find_keyframes(video_path)
+        if keyframes is None:
+            # Backend cannot report keyframes: fall back to one frame per second
+            logger.warning(f"Keyframe scan unavailable for {Path(video_path).name}, sampling 1 frame/s")
+            yield from FrameSampler("fps", sample_fps=1.0).iter_frames(cap, video_path, start_frame, end_frame)
+            return
+
+        position = None
+        for number, frame_idx in enumerate(keyframes, start=1):
+            if frame_idx < start_frame or (end_frame is not None and frame_idx >= end_frame):
+                continue
+
+            # Seeking to a keyframe only decodes that frame
+            if position != frame_idx:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            ret, frame = cap.read()
+            if not ret:
+                break
+            position = frame_idx + 1
+            yield frame_idx, number, frame
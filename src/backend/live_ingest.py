@@ -0,0 +1,381 @@
+"""
+Live Ingest - Continuous RTSP ingestion with always-on watchlist matching.
+
+One reader thread per configured camera samples frames from the shared stream
+pool, runs the camera's motion gate on them in capture order and queues the
+frames worth detecting on, with their region, into a bounded queue (the oldest
+frame is dropped when matching falls behind). Matcher threads detect and embed faces and score them against the
+watchlist of active lost-person embeddings; alerts are published as soon as a
+face clears the similarity threshold.
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from src.config.settings import Settings
+from src.backend.similarity import normalize, cosine_scores
+from src.backend.stream_pool import StreamPool, ManagedStream
+from src.backend.ring_recorder import RingRecorder
+from src.backend.motion_gate import MotionGate, Region
+from src.backend.metrics import LIVE_FRAMES, LIVE_FACES, LIVE_ALERTS
+
+logger = logging.getLogger(__name__)
+
+
+def load_camera_config(config_file: Path) -> List[Dict[str, Any]]:
+    """
+    Read cameras from cctv_config.json.
+
+    Accepts a list of cameras, {"cameras": [...]} or {camera_id: camera};
+    each camera needs an RTSP URL (rtspUrl / rtsp_url / url).
+    """
+    if not Path(config_file).exists():
+        return []
+
+    with open(config_file, "r") as f:
+        config = json.load(f)
+
+    if isinstance(config, dict):
+        config = config.get("cameras", [
+            dict(camera, id=camera.get("id", camera_id))
+            for camera_id, camera in config.items()
+            if isinstance(camera, dict)
+        ])
+
+    cameras = []
+    for i, camera in enumerate(config):
+        url = camera.get("rtspUrl") or camera.get("rtsp_url") or camera.get("url")
+        if not url:
+            continue
+        camera_id = str(camera.get("id") or f"camera_{i + 1}")
+        cameras.append({
+            "id": camera_id,
+            "name": camera.get("name") or camera_id,
+            "url": url
+        })
+    return cameras
+
+
+class Watchlist:
+    """Thread-safe registry of active lost-person embeddings."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._persons: Dict[str, Dict[str, Any]] = {}
+        self._ids: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def add(self, person_id: str, embedding: np.ndarray, label: Optional[str] = None) -> None:
+        with self._lock:
+            self._persons[person_id] = {
+                "embedding": normalize(embedding),
+                "label": label or person_id,
+                "added_at": datetime.now().isoformat()
+            }
+            self._rebuild()
+
+    def remove(self, person_id: str) -> bool:
+        with self._lock:
+            removed = self._persons.pop(person_id, None) is not None
+            self._rebuild()
+            return removed
+
+    def _rebuild(self) -> None:
+        self._ids = list(self._persons)
+        self._matrix = np.vstack([p["embedding"] for p in self._persons.values()]) if self._persons else None
+
+    def snapshot(self) -> Tuple[List[str], Optional[np.ndarray]]:
+        """Person ids and their (P, D) query matrix, consistent with each other."""
+        with self._lock:
+            return self._ids, self._matrix
+
+    def label(self, person_id: str) -> str:
+        with self._lock:
+            person = self._persons.get(person_id)
+            return person["label"] if person else person_id
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"person_id": person_id, "label": p["label"], "added_at": p["added_at"]}
+                for person_id, p in self._persons.items()
+            ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._persons)
+
+
+class CameraReader(threading.Thread):
+    """Samples frames from a pooled camera stream into the shared queue."""
+
+    def __init__(
+        self,
+        camera: Dict[str, Any],
+        stream_pool: StreamPool,
+        frames: queue.Queue,
+        sample_fps: float,
+        gate: Optional[MotionGate] = None
+    ):
+        """
+        Args:
+            gate: The camera's motion gate; it compares each sample with the
+                previous one, so only this thread feeds it
+        """
+        super().__init__(name=f"live-reader-{camera['id']}", daemon=True)
+        self.camera = camera
+        self.stream_pool = stream_pool
+        self.frames = frames
+        self.gate = gate if gate is not None and gate.active else None
+        self.sample_interval = 1.0 / max(0.01, sample_fps)
+        self.stop_event = threading.Event()
+        self.stream: Optional[ManagedStream] = None
+        self.frames_sampled = 0
+        self.frames_dropped = 0
+        self.last_frame_at: Optional[float] = None
+
+    def run(self) -> None:
+        # The pool owns the connection and reconnects it; this thread only samples
+        self.stream = self.stream_pool.acquire(self.camera["url"])
+        logger.info(f"Live: reading {self.camera['name']}")
+        try:
+            seq = 0
+            while not self.stop_event.is_set():
+                item = self.stream.read(seq, timeout=1.0)
+                if item is None:
+                    continue
+                seq, captured_at, frame = item
+                self.last_frame_at = captured_at
+                self.frames_sampled += 1
+                region = self.gate.region(frame) if self.gate is not None else None
+                if self.gate is None or region is not None:
+                    self._enqueue((self.camera, captured_at, frame, region))
+                self.stop_event.wait(self.sample_interval)
+        finally:
+            self.stream_pool.release(self.stream)
+
+    def _enqueue(self, item: Tuple[Dict[str, Any], float, np.ndarray, Optional[Region]]) -> None:
+        """Put a frame, dropping the oldest queued frame if matching is behind."""
+        while True:
+            try:
+                self.frames.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                    self.frames_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "camera": self.camera["id"],
+            "camera_name": self.camera["name"],
+            "connected": bool(self.stream and self.stream.connected),
+            "frames_sampled": self.frames_sampled,
+            "frames_dropped": self.frames_dropped,
+            "last_frame_age_seconds": round(time.time() - self.last_frame_at, 1) if self.last_frame_at else None
+        }
+
+
+class LiveIngestService:
+    """Runs camera readers and watchlist matchers; publishes alerts."""
+
+    def __init__(self, search_service, watchlist: Optional[Watchlist] = None):
+        self.search_service = search_service
+        self.watchlist = watchlist or Watchlist()
+        self.frames: queue.Queue = queue.Queue(maxsize=max(1, Settings.LIVE_QUEUE_SIZE))
+        self.readers: Dict[str, CameraReader] = {}
+        self.gates: Dict[str, MotionGate] = {}
+        self._matchers: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+        self.alerts: deque = deque(maxlen=Settings.LIVE_MAX_ALERTS)
+        self._next_alert_id = 1
+        self._last_alert: Dict[Tuple[str, str], float] = {}
+        self.frames_matched = 0
+        self.started_at: Optional[float] = None
+
+        # Pre-event recording, so alerts keep the footage leading up to them
+        self.recorder = RingRecorder(search_service.stream_pool)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._matchers)
+
+    def start(self, cameras: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Start readers for the given cameras (and matchers if not running)."""
+        with self._lock:
+            if not self._matchers:
+                self._stop_event.clear()
+                self.started_at = time.time()
+                for i in range(max(1, Settings.LIVE_WORKERS)):
+                    matcher = threading.Thread(target=self._match_loop, name=f"live-matcher-{i}", daemon=True)
+                    matcher.start()
+                    self._matchers.append(matcher)
+
+            started = []
+            for camera in cameras:
+                if camera["id"] in self.readers:
+                    continue
+                gate = self.gates[camera["id"]] = self.search_service.create_motion_gate(camera["id"], camera["name"])
+                reader = CameraReader(camera, self.search_service.stream_pool, self.frames, Settings.LIVE_SAMPLE_FPS, gate)
+                reader.start()
+                self.readers[camera["id"]] = reader
+                started.append(camera["id"])
+
+            if Settings.RING_BUFFER_ENABLED:
+                self.recorder.start(cameras)
+
+        logger.info(f"Live ingestion running for {len(self.readers)} camera(s)")
+        return {"started": started, "cameras": len(self.readers)}
+
+    def stop(self) -> None:
+        """Stop all readers and matchers."""
+        with self._lock:
+            for reader in self.readers.values():
+                reader.stop()
+            self._stop_event.set()
+            threads = list(self.readers.values()) + self._matchers
+            self.readers.clear()
+            self.gates.clear()
+            self._matchers.clear()
+            self.started_at = None
+        # Join without the lock: matchers take it to raise alerts
+        for thread in threads:
+            thread.join(timeout=5)
+        self.recorder.stop()
+        logger.info("Live ingestion stopped")
+
+    def _match_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                camera, captured_at, frame, region = self.frames.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._match_frame(camera, captured_at, frame, region)
+            except Exception as e:
+                logger.warning(f"Live: matching failed for {camera['name']}: {e}")
+
+    def _match_frame(
+        self,
+        camera: Dict[str, Any],
+        captured_at: float,
+        frame: np.ndarray,
+        region: Optional[Region] = None
+    ) -> None:
+        person_ids, query_matrix = self.watchlist.snapshot()
+        if query_matrix is None:
+            return
+
+        # The reader already ran the motion gate; region is None without one
+        gate = self.gates.get(camera["id"])
+        if gate is not None and region is not None:
+            faces = [
+                face_data for face_data in self.search_service.detect_faces_in_frame(frame, region=region)
+                if gate.contains(face_data['bbox'], frame.shape)
+            ]
+        else:
+            faces = self.search_service.detect_faces_in_frame(frame)
+        # No track to defer to on a live frame: low-quality crops are skipped
+        faces = [face_data for face_data in faces if not self.search_service.is_low_quality(face_data)]
+        self.frames_matched += 1
+        LIVE_FRAMES.inc(camera=camera["id"])
+        if not faces:
+            return
+        LIVE_FACES.inc(len(faces), camera=camera["id"])
+
+        embeddings = self.search_service.extract_face_embeddings([f['face'] for f in faces])
+        if embeddings.shape[1] != query_matrix.shape[1]:
+            return
+
+        scores = cosine_scores(query_matrix, embeddings)
+        threshold = self.search_service.similarity_threshold
+        for face_no, face_data in enumerate(faces):
+            column = int(np.argmax(scores[face_no]))
+            score = float(scores[face_no, column])
+            if score >= threshold:
+                self._raise_alert(person_ids[column], camera, captured_at, frame, face_data, score)
+
+    def _raise_alert(
+        self,
+        person_id: str,
+        camera: Dict[str, Any],
+        captured_at: float,
+        frame: np.ndarray,
+        face_data: Dict[str, Any],
+        score: float
+    ) -> None:
+        # One alert per person per camera within the cooldown window
+        key = (person_id, camera["id"])
+        with self._lock:
+            if captured_at - self._last_alert.get(key, 0.0) < Settings.LIVE_ALERT_COOLDOWN:
+                return
+            self._last_alert[key] = captured_at
+            alert_id = self._next_alert_id
+            self._next_alert_id += 1
+
+        snapshot_name = f"live_{camera['id']}_{person_id}_{alert_id}.jpg"
+        self.search_service._save_snapshot_async(frame, face_data, snapshot_name)
+
+        clip = None
+        if Settings.RING_CLIP_ON_ALERT and camera["id"] in self.recorder.buffers:
+            clip = self.recorder.request_clip(camera["id"], reason=person_id, event_time=captured_at).get("clip")
+
+        alert = {
+            "alert_id": alert_id,
+            "person_id": person_id,
+            "label": self.watchlist.label(person_id),
+            "camera": camera["id"],
+            "camera_name": camera["name"],
+            "confidence": round(score * 100, 2),
+            "quality": face_data.get("quality"),
+            "seen_at": datetime.fromtimestamp(captured_at).isoformat(),
+            "latency_seconds": round(time.time() - captured_at, 2),
+            "snapshot": snapshot_name,
+            "clip": clip
+        }
+        with self._lock:
+            self.alerts.append(alert)
+        LIVE_ALERTS.inc(camera=camera["id"])
+        logger.info(f"Live alert: {person_id} on {camera['name']} ({alert['confidence']}%)")
+
+    def alerts_since(self, alert_id: int) -> List[Dict[str, Any]]:
+        """Alerts with an id greater than alert_id, oldest first."""
+        with self._lock:
+            return [alert for alert in self.alerts if alert["alert_id"] > alert_id]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            readers = list(self.readers.values())
+            gates = dict(self.gates)
+            alerts = len(self.alerts)
+        return {
+            "running": self.running,
+            "uptime_seconds": round(time.time() - self.started_at, 1) if self.started_at else 0,
+            "queue_depth": self.frames.qsize(),
+            "queue_size": self.frames.maxsize,
+            "frames_matched": self.frames_matched,
+            "watchlist_size": len(self.watchlist),
+            "alerts": alerts,
+            "cameras": [
+                dict(reader.stats(), motion_gate=gates[reader.camera["id"]].stats())
+                if reader.camera["id"] in gates else reader.stats()
+                for reader in readers
+            ],
+            "recording": self.recorder.stats()
+        }
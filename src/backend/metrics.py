@@ -0,0 +1,267 @@
+"""
+Metrics - Prometheus-style instrumentation of the search pipeline.
+
+Counters, gauges and histograms live in a process-wide registry rendered in
+the Prometheus text exposition format (no prometheus_client dependency).
+Point-in-time values such as queue depths are read through collector
+callbacks at scrape time, so the hot path only pays for counter increments
+and histogram observations.
+"""
+
+import logging
+import threading
+from bisect import bisect_left
+from typing import Dict, Any, List, Tuple, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a sub-millisecond quality check up to a long search
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+LabelValues = Tuple[str, ...]
+# (sample name suffix, labels, value)
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.label_names, key))
+
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [("", self._labels(key), value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [("", self._labels(key), value) for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with sum and count per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+
+        samples = []
+        for key, counts, total, count in values:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", dict(labels, le=_format_value(bound)), cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, count))
+        return samples
+
+
+class GaugeCollector(_Metric):
+    """Gauge whose samples are produced by a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Iterable[Tuple[Dict[str, Any], float]]]
+    ):
+        super().__init__(name, documentation)
+        self.collect = collect
+
+    def samples(self) -> List[Sample]:
+        return [("", {k: str(v) for k, v in labels.items()}, value) for labels, value in self.collect()]
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not isinstance(metric, GaugeCollector):
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Iterable[str] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def gauge_callback(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Iterable[Tuple[Dict[str, Any], float]]]
+    ) -> GaugeCollector:
+        """Register (or replace) a gauge read from `collect` at scrape time."""
+        return self.register(GaugeCollector(name, documentation, collect))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                logger.warning(f"Could not collect metric {metric.name}: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in samples:
+                if value is None:
+                    continue
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "drishti_stage_duration_seconds", "Duration of one pipeline stage call", ["stage"]
+)
+STAGE_ITEMS = REGISTRY.counter(
+    "drishti_stage_items_total", "Items (frames, crops, faces, snapshots) handled per pipeline stage", ["stage"]
+)
+FRAMES_INDEXED = REGISTRY.counter(
+    "drishti_frames_indexed_total", "Sampled video frames decoded and run through detection", ["camera"]
+)
+FACES_INDEXED = REGISTRY.counter(
+    "drishti_face_samples_indexed_total", "Face crops embedded into face indexes", ["camera"]
+)
+FACES_SCORED = REGISTRY.counter(
+    "drishti_faces_scored_total", "Stored face samples scored against search queries", ["camera"]
+)
+MATCHES_FOUND = REGISTRY.counter(
+    "drishti_matches_total", "Search matches above the threshold", ["camera"]
+)
+SEARCHES = REGISTRY.counter(
+    "drishti_searches_total", "Finished search jobs", ["status"]
+)
+SEARCH_SECONDS = REGISTRY.histogram(
+    "drishti_search_duration_seconds", "Wall time of a search job from start to finish"
+)
+SEARCH_QUEUE_SECONDS = REGISTRY.histogram(
+    "drishti_search_queue_wait_seconds", "Time a search job waited in the queue before starting", ["priority"]
+)
+SEARCH_REJECTIONS = REGISTRY.counter(
+    "drishti_search_rejections_total", "Searches turned away by admission control", ["reason"]
+)
+LIVE_FRAMES = REGISTRY.counter(
+    "drishti_live_frames_matched_total", "Live camera frames run through watchlist matching", ["camera"]
+)
+LIVE_FACES = REGISTRY.counter(
+    "drishti_live_faces_total", "Faces detected on live camera frames", ["camera"]
+)
+LIVE_ALERTS = REGISTRY.counter(
+    "drishti_live_alerts_total", "Live watchlist alerts raised", ["camera"]
+)
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    "drishti_model_load_seconds", "Time taken to load a model at startup", ["model"]
+)
@@ -0,0 +1,179 @@
+"""
+Model Loader - Local-first loading of the ResNet18 face embedder.
+
+Sources are tried in order:
+
+1. A TorchScript export (FACE_MODEL_TORCHSCRIPT): a traced and frozen
+   graph that loads without importing torchvision or rebuilding the model.
+2. Local ResNet18 weights (FACE_MODEL_WEIGHTS), loaded into torchvision's
+   architecture.
+3. The torchvision ImageNet download, only if MODEL_DOWNLOAD is enabled.
+
+If none of these work, the caller falls back to histogram features. The
+loaded model is wrapped for the configured inference mode (EMBED_MODE);
+int8 and onnx modes load their own prebuilt files first.
+
+Run `python src/backend/model_loader.py` once (e.g. at build time) to write
+the weights and the TorchScript export into MODELS_DIR, so serving nodes
+never touch the network on startup.
+"""
+
+import argparse
+import logging
+import sys
+import warnings
+from pathlib import Path
+from typing import Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.config.settings import Settings
+from src.backend.face_embedders import FaceEmbedder, TorchFaceEmbedder, OnnxFaceEmbedder, create_face_embedder
+
+logger = logging.getLogger(__name__)
+
+# Where the embedder came from: int8 | onnx | torchscript | weights | download | histogram
+ModelSource = str
+
+
+def build_resnet18_embedder(weights_path: Optional[Path] = None, allow_download: bool = False):
+    """ResNet18 without its classifier, in eval mode (output: N x 512 x 1 x 1)."""
+    local = weights_path is not None and Path(weights_path).exists()
+    if not local and not allow_download:
+        raise FileNotFoundError(f"No local weights at {weights_path} and MODEL_DOWNLOAD is off")
+
+    import torch
+    import torch.nn as nn
+    import torchvision.models as models
+    from torchvision.models import ResNet18_Weights
+
+    if local:
+        model = models.resnet18(weights=None)
+        state_dict = torch.load(str(weights_path), map_location="cpu", weights_only=True)
+        # Accept both full-classifier and headless state dicts
+        state_dict = {key: value for key, value in state_dict.items() if not key.startswith("fc.")}
+        missing, unexpected = model.load_state_dict(state_dict, strict=False)
+        missing = [key for key in missing if not key.startswith("fc.")]
+        if missing or unexpected:
+            raise ValueError(f"{weights_path} is not a ResNet18 state dict (missing {missing[:3]}, unexpected {unexpected[:3]})")
+    else:
+        model = models.resnet18(weights=ResNet18_Weights.IMAGENET1K_V1)
+
+    model = nn.Sequential(*list(model.children())[:-1])
+    model.eval()
+    return model
+
+
+def load_face_embedder(
+    weights_path: Optional[Path] = None,
+    torchscript_path: Optional[Path] = None,
+    allow_download: bool = False,
+    mode: str = "fp32",
+    input_size: int = 224,
+    channels_last: bool = False,
+    int8_path: Optional[Path] = None,
+    onnx_path: Optional[Path] = None
+) -> Tuple[Optional[FaceEmbedder], ModelSource]:
+    """
+    Load the embedder for an inference mode (see face_embedders.EMBED_MODES).
+
+    int8 and onnx use their prebuilt files and fall back to the float model
+    if those are missing.
+
+    Returns:
+        (embedder or None, source). None means histogram features should be used.
+    """
+    if mode == "int8" and int8_path is not None and Path(int8_path).exists():
+        try:
+            import torch
+            model = torch.jit.load(str(int8_path), map_location="cpu")
+            logger.info(f"Int8 ResNet18 face model loaded from {int8_path}")
+            return TorchFaceEmbedder(model, input_size, name="int8"), "int8"
+        except Exception as e:
+            logger.warning(f"Could not load int8 model {int8_path}: {e}")
+    elif mode == "onnx" and onnx_path is not None and Path(onnx_path).exists():
+        try:
+            embedder = OnnxFaceEmbedder(onnx_path, input_size)
+            logger.info(f"ONNX ResNet18 face model loaded from {onnx_path} (OpenCV DNN)")
+            return embedder, "onnx"
+        except Exception as e:
+            logger.warning(f"Could not load ONNX model {onnx_path}: {e}")
+    elif mode in ("int8", "onnx"):
+        logger.warning(
+            f"EMBED_MODE={mode} but no model file at {int8_path if mode == 'int8' else onnx_path}; "
+            f"using float32 (build it with check_embedder.py --build)"
+        )
+
+    if torchscript_path is not None and Path(torchscript_path).exists():
+        try:
+            import torch
+            model = torch.jit.load(str(torchscript_path), map_location="cpu")
+            model.eval()
+            logger.info(f"ResNet18 face model loaded from TorchScript {torchscript_path}")
+            return create_face_embedder(model, mode, input_size, channels_last), "torchscript"
+        except Exception as e:
+            logger.warning(f"Could not load TorchScript model {torchscript_path}: {e}")
+
+    try:
+        local = weights_path is not None and Path(weights_path).exists()
+        model = build_resnet18_embedder(weights_path, allow_download)
+        source = "weights" if local else "download"
+        logger.info(f"ResNet18 face model loaded ({source})")
+        return create_face_embedder(model, mode, input_size, channels_last), source
+    except Exception as e:
+        logger.warning(f"Could not load ResNet: {e}. Using histogram fallback.")
+        return None, "histogram"
+
+
+def export_face_embedder(
+    weights_path: Path,
+    torchscript_path: Optional[Path] = None,
+    input_size: int = 224,
+    allow_download: bool = True
+) -> None:
+    """
+    Save ResNet18 weights locally and, optionally, a frozen TorchScript trace.
+
+    Existing weights are reused, so the export can be rebuilt offline.
+    """
+    import torch
+
+    weights_path = Path(weights_path)
+    model = build_resnet18_embedder(weights_path, allow_download)
+    if not weights_path.exists():
+        weights_path.parent.mkdir(parents=True, exist_ok=True)
+        # Saved headless: keys match the Sequential's indices, so map them back to resnet names
+        names = ["conv1", "bn1", "relu", "maxpool", "layer1", "layer2", "layer3", "layer4", "avgpool"]
+        state_dict = {
+            f"{names[int(key.split('.', 1)[0])]}.{key.split('.', 1)[1]}": value
+            for key, value in model.state_dict().items()
+        }
+        torch.save(state_dict, str(weights_path))
+        logger.info(f"Saved ResNet18 weights to {weights_path}")
+
+    if torchscript_path is not None:
+        torchscript_path = Path(torchscript_path)
+        torchscript_path.parent.mkdir(parents=True, exist_ok=True)
+        example = torch.zeros(1, 3, input_size, input_size)
+        # torch.jit is deprecated in favour of torch.export, but loads much faster today
+        with torch.no_grad(), warnings.catch_warnings():
+            warnings.simplefilter("ignore", FutureWarning)
+            traced = torch.jit.freeze(torch.jit.trace(model, example))
+        traced.save(str(torchscript_path))
+        logger.info(f"Saved TorchScript embedder to {torchscript_path}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Export the face embedder for offline, fast startup")
+    parser.add_argument("--weights", default=str(Settings.FACE_MODEL_WEIGHTS), help="ResNet18 state dict path")
+    parser.add_argument("--torchscript", default=str(Settings.FACE_MODEL_TORCHSCRIPT), help="TorchScript output path")
+    parser.add_argument("--no-torchscript", action="store_true", help="Only save the weights")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    export_face_embedder(Path(args.weights), None if args.no_torchscript else Path(args.torchscript))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
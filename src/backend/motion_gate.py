@@ -0,0 +1,221 @@
+"""
+Motion Gate - Regions of interest and motion gating for fixed cameras.
+
+Each camera may restrict detection to ROI polygons, stored in camera_roi.json
+next to cctv_config.json as {camera_id: [[[x, y], ...], ...]} with x/y
+normalized to [0, 1] of the frame size. Sampled frames are compared with the
+previous sample on a small blurred grayscale copy: frames with no motion
+inside the ROI skip detection entirely, and otherwise detection only runs on
+the part of the frame covered by changed tiles.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+Polygon = List[Tuple[float, float]]
+Region = Tuple[int, int, int, int]
+
+
+def _valid_polygon(polygon: Any) -> bool:
+    try:
+        return len(polygon) >= 3 and all(
+            len(point) == 2 and all(0.0 <= float(v) <= 1.0 for v in point) for point in polygon
+        )
+    except TypeError:
+        return False
+
+
+def parse_roi_config(config: Dict[str, Any]) -> Dict[str, List[Polygon]]:
+    """
+    Validate {camera_id: [polygon, ...]} (a single polygon is also accepted).
+
+    Raises:
+        ValueError: if a polygon has fewer than 3 points or points outside [0, 1]
+    """
+    rois = {}
+    for camera_id, polygons in config.items():
+        if polygons and _valid_polygon(polygons):
+            polygons = [polygons]
+        polygons = list(polygons or [])
+        for polygon in polygons:
+            if not _valid_polygon(polygon):
+                raise ValueError(f"Invalid ROI polygon for camera {camera_id}: expected >= 3 [x, y] points in [0, 1]")
+        if polygons:
+            rois[str(camera_id)] = [[(float(x), float(y)) for x, y in polygon] for polygon in polygons]
+    return rois
+
+
+def load_roi_config(path: Path) -> Dict[str, List[Polygon]]:
+    """Read ROI polygons per camera; an empty dict if the file is missing or invalid."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r") as f:
+            return parse_roi_config(json.load(f))
+    except Exception as e:
+        logger.warning(f"Ignoring ROI config {path}: {e}")
+        return {}
+
+
+def camera_polygons(rois: Dict[str, List[Polygon]], *names: str) -> Optional[List[Polygon]]:
+    """Polygons of the first of `names` (camera id, video name or stem) with an ROI."""
+    for name in names:
+        if name in rois:
+            return rois[name]
+    return None
+
+
+def roi_signature(polygons: Optional[List[Polygon]]) -> str:
+    """Short stable hash of an ROI, used to key face indexes built under it."""
+    if not polygons:
+        return ""
+    return hashlib.sha1(json.dumps(polygons).encode()).hexdigest()[:8]
+
+
+class MotionGate:
+    """
+    Per-camera detection gate.
+
+    region() returns the frame rectangle detection should run on, or None to
+    skip the frame. State (the previous sample) is per instance, so use one
+    gate per video or camera.
+    """
+
+    def __init__(
+        self,
+        polygons: Optional[List[Polygon]] = None,
+        enabled: bool = True,
+        width: int = 160,
+        threshold: int = 25,
+        min_area: float = 0.01,
+        tiles: int = 8,
+        refresh_every: int = 50
+    ):
+        self.polygons = polygons or []
+        self.enabled = enabled
+        self.width = width
+        self.threshold = threshold
+        self.min_area = min_area
+        self.tiles = max(1, tiles)
+        self.refresh_every = refresh_every
+        self._previous: Optional[np.ndarray] = None
+        self._shape: Optional[Tuple[int, int]] = None
+        self._small_mask: Optional[np.ndarray] = None
+        self._roi_rect: Optional[Region] = None
+        self._since_full = 0
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.skipped = 0
+        self.area_scanned = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.enabled or bool(self.polygons)
+
+    def _prepare(self, shape: Tuple[int, int]) -> None:
+        """Build the downscaled ROI mask and full-resolution ROI bounding box for a frame size."""
+        h, w = shape
+        small_w = min(self.width, w)
+        small_h = max(1, round(h * small_w / w))
+        self._shape = shape
+        self._previous = None
+
+        if not self.polygons:
+            self._small_mask = None
+            self._roi_rect = (0, 0, w, h)
+            return
+
+        mask = np.zeros((small_h, small_w), dtype=np.uint8)
+        points = [
+            np.round(np.array(polygon) * [small_w - 1, small_h - 1]).astype(np.int32)
+            for polygon in self.polygons
+        ]
+        cv2.fillPoly(mask, points, 255)
+        self._small_mask = mask
+
+        xs = [x for polygon in self.polygons for x, _ in polygon]
+        ys = [y for polygon in self.polygons for _, y in polygon]
+        self._roi_rect = (
+            int(min(xs) * w), int(min(ys) * h),
+            int(np.ceil(max(xs) * w)), int(np.ceil(max(ys) * h))
+        )
+
+    def region(self, frame: np.ndarray) -> Optional[Region]:
+        """Rectangle (x1, y1, x2, y2) of the frame to run detection on, or None to skip it."""
+        h, w = frame.shape[:2]
+        with self._lock:
+            if self._shape != (h, w):
+                self._prepare((h, w))
+            self.frames += 1
+            region = self._roi_rect if not self.enabled else self._motion_region(frame)
+            if region is None:
+                self.skipped += 1
+            else:
+                self.area_scanned += (region[2] - region[0]) * (region[3] - region[1]) / (w * h)
+            return region
+
+    def _motion_region(self, frame: np.ndarray) -> Optional[Region]:
+        h, w = frame.shape[:2]
+        small_h, small_w = self._small_mask.shape if self._small_mask is not None else (
+            max(1, round(h * min(self.width, w) / w)), min(self.width, w)
+        )
+        gray = cv2.cvtColor(cv2.resize(frame, (small_w, small_h), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        previous, self._previous = self._previous, gray
+
+        # First sample, and periodically after that, scan the whole ROI so
+        # faces that hold still are not missed forever
+        self._since_full += 1
+        if previous is None or (self.refresh_every and self._since_full >= self.refresh_every):
+            self._since_full = 0
+            return self._roi_rect
+
+        changed = cv2.absdiff(gray, previous) > self.threshold
+        if self._small_mask is not None:
+            changed &= self._small_mask > 0
+
+        # Fraction of changed pixels per tile; one tile of margin around moving tiles
+        tile_changes = cv2.resize(changed.astype(np.float32), (self.tiles, self.tiles), interpolation=cv2.INTER_AREA)
+        moving = (tile_changes >= self.min_area).astype(np.uint8)
+        if not moving.any():
+            return None
+        moving = cv2.dilate(moving, np.ones((3, 3), np.uint8))
+
+        rows = np.flatnonzero(moving.any(axis=1))
+        cols = np.flatnonzero(moving.any(axis=0))
+        x1, x2 = int(cols[0]) * w // self.tiles, (int(cols[-1]) + 1) * w // self.tiles
+        y1, y2 = int(rows[0]) * h // self.tiles, (int(rows[-1]) + 1) * h // self.tiles
+
+        rx1, ry1, rx2, ry2 = self._roi_rect
+        x1, y1, x2, y2 = max(x1, rx1), max(y1, ry1), min(x2, rx2), min(y2, ry2)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return x1, y1, x2, y2
+
+    def contains(self, bbox: Region, frame_shape: Tuple[int, ...]) -> bool:
+        """Whether a detection's center lies inside the ROI (always true without one)."""
+        if self._small_mask is None:
+            return True
+        h, w = frame_shape[:2]
+        small_h, small_w = self._small_mask.shape
+        cx = (bbox[0] + bbox[2]) / 2 * small_w / w
+        cy = (bbox[1] + bbox[3]) / 2 * small_h / h
+        return bool(self._small_mask[min(small_h - 1, int(cy)), min(small_w - 1, int(cx))])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "frames": self.frames,
+                "skipped": self.skipped,
+                "area_scanned": round(float(self.area_scanned) / self.frames, 3) if self.frames else 0.0
+            }
@@ -0,0 +1,152 @@
+"""
+Parallel Search - Process-pool video indexing.
+Shards work by video and by frame range within long videos so indexing
+scales with the number of cores instead of total footage length.
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+
+import cv2
+
+from src.backend.face_index import merge_index_entries
+from src.backend.frame_sampler import FrameSampler
+
+logger = logging.getLogger(__name__)
+
+# Per-process search service, created once by the pool initializer
+_worker_service = None
+
+
+def _init_worker(torch_threads: int) -> None:
+    """Load the detector and embedder once per worker process."""
+    global _worker_service
+    import torch
+    from src.backend.search_service import SearchService
+
+    torch.set_num_threads(torch_threads)
+    _worker_service = SearchService(enable_workers=False)
+
+
+def _index_shard(
+    video_path: str,
+    start_frame: int,
+    end_frame: Optional[int],
+    sampler: FrameSampler
+) -> Optional[Dict[str, Any]]:
+    """Index one frame range of a video inside a worker process."""
+    _worker_service.sampler = sampler
+    return _worker_service.index_video(Path(video_path), start_frame, end_frame)
+
+
+def plan_shards(video_path: Path, frames_per_shard: int, sampler: FrameSampler) -> List[Tuple[int, Optional[int]]]:
+    """
+    Split a video into [start, end) frame ranges.
+
+    The sampler decides from absolute frame indices, so every shard samples
+    exactly the frames a single sequential pass would. The last range is
+    open-ended because CAP_PROP_FRAME_COUNT is only an estimate for some
+    containers. Keyframe sampling is never split.
+    """
+    if not sampler.splittable:
+        return [(0, None)]
+
+    frame_skip = sampler.frame_skip
+    cap = cv2.VideoCapture(str(video_path))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+    cap.release()
+
+    shard_size = max(frame_skip, frames_per_shard - frames_per_shard % frame_skip)
+    if total_frames <= shard_size:
+        return [(0, None)]
+
+    starts = list(range(0, total_frames, shard_size))
+    return [(start, starts[i + 1] if i + 1 < len(starts) else None) for i, start in enumerate(starts)]
+
+
+class ParallelIndexer:
+    """Process pool that indexes videos in frame-range shards."""
+
+    def __init__(self, workers: int, torch_threads: int = 0, frames_per_shard: int = 1500):
+        self.workers = max(1, workers)
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.frames_per_shard = max(1, frames_per_shard)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start the pool on first use; workers stay warm between searches."""
+        if self._executor is None:
+            logger.info(
+                f"Starting {self.workers} search worker(s) with {self.torch_threads} torch thread(s) each"
+            )
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.torch_threads,)
+            )
+        return self._executor
+
+    def index_videos(
+        self,
+        video_paths: List[Path],
+        sampler: FrameSampler,
+        on_shard: Optional[Callable[[Path, int], None]] = None
+    ) -> Iterator[Tuple[Path, Optional[Dict[str, Any]]]]:
+        """
+        Index videos across the pool.
+
+        Args:
+            video_paths: Videos to index
+            sampler: Frame sampling policy used by the workers
+            on_shard: Optional hook called with (video_path, frames_processed)
+                as each shard finishes
+
+        Yields:
+            (video_path, merged index entry or None) as soon as all shards of a
+            video have finished, in completion order.
+        """
+        executor = self._get_executor()
+        pending: Dict[Path, List[Optional[Dict[str, Any]]]] = {}
+        futures = {}
+
+        for video_path in video_paths:
+            video_path = Path(video_path)
+            shards = plan_shards(video_path, self.frames_per_shard, sampler)
+            pending[video_path] = [None] * len(shards)
+            for shard_no, (start, end) in enumerate(shards):
+                future = executor.submit(_index_shard, str(video_path), start, end, sampler)
+                futures[future] = (video_path, shard_no)
+            logger.info(f"Queued {video_path.name} as {len(shards)} shard(s)")
+
+        remaining = {video_path: len(parts) for video_path, parts in pending.items()}
+        failed = set()
+
+        for future in as_completed(futures):
+            video_path, shard_no = futures[future]
+            try:
+                partial = future.result()
+            except Exception as e:
+                logger.error(f"Shard {shard_no} of {video_path.name} failed: {e}")
+                partial = None
+
+            if partial is None:
+                failed.add(video_path)
+            elif on_shard is not None:
+                on_shard(video_path, partial["frames_processed"])
+            pending[video_path][shard_no] = partial
+            remaining[video_path] -= 1
+
+            if remaining[video_path] == 0:
+                parts = pending.pop(video_path)
+                yield video_path, None if video_path in failed else merge_index_entries(parts)
+
+    def shutdown(self) -> None:
+        """Stop worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,83 @@
+"""
+Query Cache - Reuse of query photo uploads and their face embeddings.
+
+Uploads are stored under a content-hash name, so re-submitting the same photo
+reuses one file; the detected face box and embedding are cached per content
+hash and embedding pipeline, so a repeated query skips detection and
+embedding entirely.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, BinaryIO
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    with open(path, "rb") as f:
+        return content_digest(f.read())
+
+
+def save_upload(upload: BinaryIO, upload_dir: Path, prefix: str = "lost_person") -> Path:
+    """
+    Store an uploaded photo under its content hash.
+
+    Identical uploads map to the same file, which is only written once.
+    """
+    data = upload.read()
+    path = Path(upload_dir) / f"{prefix}_{content_digest(data)[:32]}.jpg"
+    if not path.exists():
+        tmp_path = path.with_suffix(".part")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+    return path
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU of query face detections keyed by (content hash, model tag)."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, embedding: np.ndarray, bbox, confidence: float) -> None:
+        with self._lock:
+            self._entries[key] = {
+                "embedding": embedding,
+                "bbox": tuple(int(v) for v in bbox),
+                "confidence": float(confidence)
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,188 @@
+"""
+Result Store - Bounded in-memory store of finished search results.
+
+Entries are evicted least-recently-used first when the entry count or memory
+budget is exceeded, and after a TTL. Evicted results stay available from
+RESULTS_DIR/{search_id}.json and are loaded back on demand.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore:
+    """LRU + TTL result cache with a byte budget that spills to JSON files."""
+
+    def __init__(
+        self,
+        results_dir: Path,
+        max_entries: int = 200,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: float = 3600
+    ):
+        self.results_dir = Path(results_dir)
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # search_id -> (results, size in bytes, last access time)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_loads = 0
+        self.evictions = 0
+
+    def _results_file(self, search_id: str) -> Path:
+        return self.results_dir / f"{Path(search_id).name}.json"
+
+    def put(self, search_id: str, results: Dict[str, Any]) -> None:
+        """Store results (most recently used)."""
+        # Serialized size is the memory estimate; compact JSON is also the spill format
+        size = len(json.dumps(results, separators=(",", ":")))
+        with self._lock:
+            self._remove(search_id)
+            self._entries[search_id] = (results, size, time.time())
+            self._bytes += size
+            self._evict()
+
+    def get(self, search_id: str) -> Optional[Dict[str, Any]]:
+        """Results from memory, or loaded back from disk; None if unknown."""
+        with self._lock:
+            self._evict()
+            entry = self._entries.get(search_id)
+            if entry is not None:
+                self._entries[search_id] = (entry[0], entry[1], time.time())
+                self._entries.move_to_end(search_id)
+                self.hits += 1
+                return entry[0]
+
+        results_file = self._results_file(search_id)
+        if not results_file.exists():
+            return None
+        try:
+            with open(results_file, "r") as f:
+                results = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to read results file {results_file}: {e}")
+            return None
+
+        self.disk_loads += 1
+        logger.info(f"Loaded results from disk for search_id: {search_id}")
+        self.put(search_id, results)
+        return results
+
+    def __contains__(self, search_id: str) -> bool:
+        with self._lock:
+            if search_id in self._entries:
+                return True
+        return self._results_file(search_id).exists()
+
+    def delete(self, search_id: str) -> List[str]:
+        """Forget a search: memory entry, results file and its snapshots. Returns deleted file names."""
+        with self._lock:
+            self._remove(search_id)
+
+        deleted = []
+        if self.results_dir.exists():
+            for f in self.results_dir.iterdir():
+                if f.is_file() and (f.name == f"{search_id}.json" or f.name.startswith(f"{search_id}_")):
+                    try:
+                        f.unlink()
+                        deleted.append(f.name)
+                    except Exception as e:
+                        logger.warning(f"Could not delete result file {f}: {e}")
+        return deleted
+
+    def clear(self) -> None:
+        """Drop all in-memory results (files on disk are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, search_id: str) -> None:
+        entry = self._entries.pop(search_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _evict(self) -> None:
+        now = time.time()
+        while self._entries:
+            search_id, (results, size, accessed) = next(iter(self._entries.items()))
+            expired = now - accessed > self.ttl_seconds
+            # Always keep the newest entry, even if it alone exceeds the budget
+            over_budget = len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            )
+            if not (expired or over_budget):
+                return
+            self._spill(search_id, results)
+            self._remove(search_id)
+            self.evictions += 1
+
+    def _spill(self, search_id: str, results: Dict[str, Any]) -> None:
+        """Make sure evicted results can be loaded back (normally already saved by the search)."""
+        results_file = self._results_file(search_id)
+        if results_file.exists():
+            return
+        try:
+            self.results_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = results_file.with_suffix(".spill")
+            with open(tmp_file, "w") as f:
+                json.dump(results, f, separators=(",", ":"))
+            tmp_file.replace(results_file)
+        except Exception as e:
+            logger.warning(f"Could not spill results for {search_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_loads": self.disk_loads,
+                "evictions": self.evictions
+            }
+
+
+def paginate_results(
+    results: Dict[str, Any],
+    offset: int = 0,
+    limit: Optional[int] = None,
+    person_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    A page of a search's matches.
+
+    Pages the flat "matches" list, or one person's matches of a multi-person
+    search. Per-person match lists are omitted from paged responses.
+    """
+    matches = results.get("matches", [])
+    page = {key: value for key, value in results.items() if key not in ("matches", "persons")}
+
+    if "persons" in results:
+        if person_id is not None:
+            matches = results["persons"].get(person_id, {}).get("matches", [])
+            page["person_id"] = person_id
+        page["persons"] = {
+            pid: {key: value for key, value in person.items() if key != "matches"}
+            for pid, person in results["persons"].items()
+        }
+
+    end = len(matches) if limit is None else offset + limit
+    page["matches"] = matches[offset:end]
+    page["pagination"] = {
+        "offset": offset,
+        "limit": limit,
+        "total": len(matches),
+        "has_more": end < len(matches)
+    }
+    return page
@@ -0,0 +1,248 @@
+"""
+Result Writer - Background disk I/O for match snapshots and result files.
+
+Callers hand over a small copy of what needs saving (the face crop with some
+context, not the whole frame) and return immediately; writer threads draw,
+resize, JPEG-encode and write. The queue is bounded so a burst of matches
+cannot hold unbounded frames in memory.
+
+Snapshots can also be kept in a cache directory (per face index entry), so a
+repeat search links the cached JPEG instead of decoding the frame again.
+
+Writes submitted with a WriteBatch can be waited for on their own, so a search
+waits for its snapshots and not for every other search's.
+"""
+
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.backend.stage_timer import StageTimer
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MODES = ("context", "full")
+
+
+def snapshot_region(
+    frame_shape: Tuple[int, ...],
+    bbox: Tuple[int, int, int, int],
+    context: float
+) -> Tuple[int, int, int, int]:
+    """Face box grown by `context` face-sizes on every side, clipped to the frame."""
+    h, w = frame_shape[:2]
+    x1, y1, x2, y2 = bbox
+    pad_x = int((x2 - x1) * context)
+    pad_y = int((y2 - y1) * context)
+    return max(0, x1 - pad_x), max(0, y1 - pad_y), min(w, x2 + pad_x), min(h, y2 + pad_y)
+
+
+def link_or_copy(source: Path, target: Path) -> None:
+    """Hard-link (or copy, across filesystems) a file into place atomically."""
+    tmp_file = target.with_name(f".{target.name}.{threading.get_ident()}.tmp")
+    tmp_file.unlink(missing_ok=True)
+    try:
+        os.link(source, tmp_file)
+    except OSError:
+        shutil.copyfile(source, tmp_file)
+    tmp_file.replace(target)
+
+
+class WriteBatch:
+    """Count of one caller's (e.g. one search's) writes still queued or running."""
+
+    def __init__(self):
+        self._pending = 0
+        self._done = threading.Condition()
+
+    def _add(self) -> None:
+        with self._done:
+            self._pending += 1
+
+    def _finish(self) -> None:
+        with self._done:
+            self._pending -= 1
+            if self._pending == 0:
+                self._done.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every write of the batch has finished. Returns False on timeout."""
+        with self._done:
+            return self._done.wait_for(lambda: self._pending == 0, timeout)
+
+
+class ResultWriter:
+    """Bounded queue of write jobs served by daemon writer threads (started on first use)."""
+
+    def __init__(
+        self,
+        results_dir: Path,
+        workers: int = 1,
+        max_queue: int = 64,
+        mode: str = "context",
+        context: float = 1.5,
+        max_width: int = 640,
+        jpeg_quality: int = 85,
+        put_timeout: float = 5.0,
+        stage_timer: Optional[StageTimer] = None
+    ):
+        if mode not in SNAPSHOT_MODES:
+            raise ValueError(f"Unknown snapshot mode '{mode}', expected one of {SNAPSHOT_MODES}")
+        self.results_dir = Path(results_dir)
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.context = context
+        self.max_width = max_width
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.put_timeout = put_timeout
+        self.stage_timer = stage_timer
+        self._jobs: queue.Queue = queue.Queue(maxsize=max(1, max_queue))
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _ensure_started(self) -> None:
+        if self._threads:
+            return
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f"result-writer-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _submit(self, job: Tuple, batch: Optional[WriteBatch] = None) -> bool:
+        self._ensure_started()
+        if batch is not None:
+            batch._add()
+        try:
+            self._jobs.put(job + (batch,), timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            if batch is not None:
+                batch._finish()
+            self.dropped += 1
+            logger.warning(f"Result writer queue full, dropped write of {job[1]}")
+            return False
+
+    @property
+    def snapshot_tag(self) -> str:
+        """Rendering settings of a snapshot, for cache file names."""
+        return f"{self.mode}{self.context:g}_w{self.max_width}_q{self.encode_params[1]}"
+
+    def reuse_snapshot(self, cache_path: Path, snapshot_name: str) -> bool:
+        """Place a cached snapshot under snapshot_name. Returns False if it is not cached."""
+        try:
+            link_or_copy(cache_path, self.results_dir / snapshot_name)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def submit_snapshot(
+        self,
+        frame: np.ndarray,
+        bbox: Tuple[int, int, int, int],
+        snapshot_name: str,
+        cache_path: Optional[Path] = None,
+        batch: Optional[WriteBatch] = None
+    ) -> bool:
+        """
+        Queue a snapshot of a match. Only the region that will be saved is
+        copied, so the caller may reuse the frame buffer right away.
+
+        Args:
+            cache_path: Also keep the written snapshot here (see reuse_snapshot)
+            batch: Count the write in this batch (see flush)
+        """
+        if self.mode == "context":
+            rx1, ry1, rx2, ry2 = snapshot_region(frame.shape, bbox, self.context)
+        else:
+            rx1, ry1, rx2, ry2 = 0, 0, frame.shape[1], frame.shape[0]
+        region = frame[ry1:ry2, rx1:rx2].copy()
+        x1, y1, x2, y2 = bbox
+        return self._submit((
+            "snapshot", snapshot_name, region, ((x1 - rx1, y1 - ry1, x2 - rx1, y2 - ry1), cache_path)
+        ), batch)
+
+    def submit_json(self, filename: str, data: Dict[str, Any]) -> bool:
+        """
+        Queue a compact JSON file write.
+
+        The data is serialized here, so the caller may keep changing it
+        (e.g. attach a trace) while the write is pending.
+        """
+        return self._submit(("json", filename, json.dumps(data, separators=(",", ":")), None))
+
+    def flush(self, batch: Optional[WriteBatch] = None) -> None:
+        """Block until the batch's writes (default: every queued write) have finished."""
+        if batch is not None:
+            batch.wait()
+        elif self._threads:
+            self._jobs.join()
+
+    def _run(self) -> None:
+        while True:
+            kind, name, payload, extra, batch = self._jobs.get()
+            start = time.perf_counter()
+            try:
+                if kind == "snapshot":
+                    self._write_snapshot(name, payload, *extra)
+                else:
+                    self._write_json(name, payload)
+                self.written += 1
+                if self.stage_timer is not None:
+                    self.stage_timer.record(f"write_{kind}", time.perf_counter() - start)
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Error writing {name}: {e}")
+            finally:
+                if batch is not None:
+                    batch._finish()
+                self._jobs.task_done()
+
+    def _write_snapshot(
+        self,
+        snapshot_name: str,
+        region: np.ndarray,
+        bbox: Tuple[int, int, int, int],
+        cache_path: Optional[Path] = None
+    ) -> None:
+        x1, y1, x2, y2 = bbox
+        cv2.rectangle(region, (x1, y1), (x2, y2), (0, 255, 0), 2)
+
+        h, w = region.shape[:2]
+        if self.max_width and w > self.max_width:
+            region = cv2.resize(region, (self.max_width, round(h * self.max_width / w)), interpolation=cv2.INTER_AREA)
+
+        snapshot_path = self.results_dir / snapshot_name
+        if not cv2.imwrite(str(snapshot_path), region, self.encode_params):
+            raise IOError(f"Failed to save snapshot: {snapshot_path}")
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            link_or_copy(snapshot_path, cache_path)
+
+    def _write_json(self, filename: str, text: str) -> None:
+        results_file = self.results_dir / filename
+        tmp_file = results_file.with_suffix(".tmp")
+        with open(tmp_file, "w") as f:
+            f.write(text)
+        tmp_file.replace(results_file)
+        logger.info(f"Saved results to {results_file}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._jobs.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
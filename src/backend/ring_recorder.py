@@ -0,0 +1,261 @@
+"""
+Ring Recorder - Pre-event recording for live cameras.
+
+Each camera keeps the last few seconds of downscaled, JPEG-compressed frames
+in a ring buffer bounded by both age and bytes. A clip request ("N seconds
+before + M seconds after") copies the "before" frames out of the buffer right
+away, so an alert keeps the footage leading up to it even if the buffer
+evicts it; a background writer adds the "after" frames and writes the clip
+once that window has elapsed.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.config.settings import Settings
+from src.backend.stream_pool import StreamPool, ManagedStream
+
+logger = logging.getLogger(__name__)
+
+
+class FrameRingBuffer:
+    """Recent frames as JPEG bytes, evicted by age and by total size."""
+
+    def __init__(self, seconds: float, max_bytes: int, max_width: int = 960, jpeg_quality: int = 80):
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.max_width = max_width
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self._frames: deque = deque()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.frames_evicted = 0
+
+    def push(self, timestamp: float, frame: np.ndarray) -> None:
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, round(h * self.max_width / w)), interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode(".jpg", frame, self.encode_params)
+        if not ok:
+            return
+
+        data = encoded.tobytes()
+        with self._lock:
+            self._frames.append((timestamp, data))
+            self._bytes += len(data)
+            while self._frames and (
+                self._bytes > self.max_bytes or timestamp - self._frames[0][0] > self.seconds
+            ):
+                _, old = self._frames.popleft()
+                self._bytes -= len(old)
+                self.frames_evicted += 1
+
+    def frames_between(self, start: float, end: float) -> List[Tuple[float, bytes]]:
+        with self._lock:
+            return [(t, data) for t, data in self._frames if start <= t <= end]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            span = self._frames[-1][0] - self._frames[0][0] if self._frames else 0.0
+            return {
+                "frames": len(self._frames),
+                "bytes": self._bytes,
+                "seconds": round(span, 1),
+                "frames_evicted": self.frames_evicted
+            }
+
+
+class CameraRecorder(threading.Thread):
+    """Feeds one camera's pooled stream into its ring buffer at a fixed rate."""
+
+    def __init__(self, camera: Dict[str, Any], stream_pool: StreamPool, buffer: FrameRingBuffer, fps: float):
+        super().__init__(name=f"ring-recorder-{camera['id']}", daemon=True)
+        self.camera = camera
+        self.stream_pool = stream_pool
+        self.buffer = buffer
+        self.interval = 1.0 / max(0.1, fps)
+        self.stop_event = threading.Event()
+
+    def run(self) -> None:
+        stream: ManagedStream = self.stream_pool.acquire(self.camera["url"])
+        try:
+            seq = 0
+            next_push = 0.0
+            while not self.stop_event.is_set():
+                item = stream.read(seq, timeout=1.0)
+                if item is None:
+                    continue
+                seq, captured_at, frame = item
+                if captured_at >= next_push:
+                    next_push = captured_at + self.interval
+                    self.buffer.push(captured_at, frame)
+        except Exception as e:
+            logger.warning(f"Ring recorder for {self.camera['name']} stopped: {e}")
+        finally:
+            self.stream_pool.release(stream)
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+
+class RingRecorder:
+    """Per-camera ring buffers plus a background clip writer."""
+
+    def __init__(self, stream_pool: StreamPool, clips_dir: Optional[Path] = None):
+        self.stream_pool = stream_pool
+        self.clips_dir = Path(clips_dir or Settings.CLIPS_DIR)
+        self.fps = Settings.RING_BUFFER_FPS
+        self.buffers: Dict[str, FrameRingBuffer] = {}
+        self.recorders: Dict[str, CameraRecorder] = {}
+        self.clips: deque = deque(maxlen=200)
+        # Pending clips ordered by the time their "after" window ends: (end, order, buffer, clip, frames)
+        self._pending: List[tuple] = []
+        self._pending_order = itertools.count()
+        self._pending_ready = threading.Condition()
+        self.max_pending = max(1, Settings.RING_CLIP_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self, cameras: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="ring-clip-writer", daemon=True)
+                self._writer.start()
+
+            for camera in cameras:
+                if camera["id"] in self.recorders:
+                    continue
+                buffer = FrameRingBuffer(
+                    Settings.RING_BUFFER_SECONDS,
+                    int(Settings.RING_BUFFER_MAX_MB * 1024 * 1024),
+                    Settings.RING_BUFFER_MAX_WIDTH,
+                    Settings.RING_BUFFER_JPEG_QUALITY
+                )
+                recorder = CameraRecorder(camera, self.stream_pool, buffer, self.fps)
+                recorder.start()
+                self.buffers[camera["id"]] = buffer
+                self.recorders[camera["id"]] = recorder
+
+    def stop(self) -> None:
+        with self._lock:
+            for recorder in self.recorders.values():
+                recorder.stop()
+            for recorder in self.recorders.values():
+                recorder.join(timeout=5)
+            self.recorders.clear()
+            self.buffers.clear()
+
+    def request_clip(
+        self,
+        camera_id: str,
+        seconds_before: Optional[float] = None,
+        seconds_after: Optional[float] = None,
+        reason: str = "manual",
+        event_time: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a clip around event_time (default: now).
+
+        The buffer only holds RING_BUFFER_SECONDS, so before + after is
+        clamped to it (the "after" window is shortened first).
+
+        Returns:
+            Clip record with status "queued", or status "error".
+        """
+        with self._lock:
+            buffer = self.buffers.get(camera_id)
+        if buffer is None:
+            return {"status": "error", "error": f"Camera {camera_id} is not being recorded"}
+
+        event_time = event_time or time.time()
+        before = min(Settings.RING_CLIP_BEFORE if seconds_before is None else seconds_before, buffer.seconds)
+        after = min(Settings.RING_CLIP_AFTER if seconds_after is None else seconds_after, buffer.seconds - before)
+
+        stamp = datetime.fromtimestamp(event_time).strftime("%Y%m%d_%H%M%S")
+        safe_reason = "".join(c for c in reason if c.isalnum() or c in ("-", "_"))
+        clip = {
+            "clip": f"clip_{camera_id}_{stamp}_{safe_reason}.mp4",
+            "camera": camera_id,
+            "reason": reason,
+            "start": event_time - before,
+            "end": event_time + after,
+            "seconds_before": before,
+            "seconds_after": after,
+            "status": "queued",
+            "frames": 0
+        }
+        with self._pending_ready:
+            if len(self._pending) >= self.max_pending:
+                logger.warning(f"Clip queue full, dropping clip request for {camera_id}")
+                return {"status": "error", "error": "Clip writer is busy"}
+            # Copy the pre-event footage now; it may be evicted before the clip is written
+            frames = buffer.frames_between(clip["start"], event_time)
+            heapq.heappush(self._pending, (clip["end"], next(self._pending_order), buffer, clip, frames))
+            self._pending_ready.notify()
+
+        with self._lock:
+            self.clips.append(clip)
+        return clip
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._pending_ready:
+                # Write whichever clip's "after" window ends first, once it has been buffered
+                while not self._pending or self._pending[0][0] > time.time():
+                    self._pending_ready.wait(self._pending[0][0] - time.time() if self._pending else None)
+                _, _, buffer, clip, frames = heapq.heappop(self._pending)
+            try:
+                self._write_clip(buffer, clip, frames)
+            except Exception as e:
+                clip["status"] = "error"
+                logger.warning(f"Could not write clip {clip['clip']}: {e}")
+
+    def _write_clip(self, buffer: FrameRingBuffer, clip: Dict[str, Any], frames: List[Tuple[float, bytes]]) -> None:
+        after_start = frames[-1][0] if frames else clip["start"]
+        frames = frames + [(t, data) for t, data in buffer.frames_between(after_start, clip["end"]) if t > after_start]
+        if not frames:
+            clip["status"] = "empty"
+            return
+
+        self.clips_dir.mkdir(parents=True, exist_ok=True)
+        output_file = self.clips_dir / clip["clip"]
+        first = cv2.imdecode(np.frombuffer(frames[0][1], np.uint8), cv2.IMREAD_COLOR)
+        height, width = first.shape[:2]
+        out = cv2.VideoWriter(str(output_file), cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (width, height))
+        try:
+            for _, data in frames:
+                frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                if frame is not None and frame.shape[:2] == (height, width):
+                    out.write(frame)
+        finally:
+            out.release()
+
+        clip["frames"] = len(frames)
+        clip["status"] = "saved"
+        logger.info(f"Saved clip {clip['clip']} ({len(frames)} frames)")
+
+    def list_clips(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                dict(clip, start=datetime.fromtimestamp(clip["start"]).isoformat(),
+                     end=datetime.fromtimestamp(clip["end"]).isoformat())
+                for clip in self.clips
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffers = dict(self.buffers)
+        return {
+            "clip_queue_depth": len(self._pending),
+            "buffers": {camera_id: buffer.stats() for camera_id, buffer in buffers.items()}
+        }
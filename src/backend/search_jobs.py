@@ -0,0 +1,340 @@
+"""
+Search Jobs - Background execution of searches on a bounded job queue.
+Tracks progress (videos, frames, ETA) and matches found so far per search.
+
+Admission control: a fixed number of worker threads bounds how many searches
+run at once; the rest wait in priority lanes (FIFO within a lane) and can see
+their queue position. A job's lane rises as it waits (aging), so a stream of
+urgent searches cannot starve the lower lanes. Submissions beyond the queue
+depth or a client's limit of active searches are rejected with a retry hint
+instead of slowing down every running search.
+"""
+
+import itertools
+import logging
+import math
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, List
+
+from src.backend.metrics import SEARCHES, SEARCH_SECONDS, SEARCH_QUEUE_SECONDS, SEARCH_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, most urgent first (e.g. a live incident before an archive sweep)
+PRIORITIES = ("high", "normal", "low")
+
+
+class AdmissionError(queue.Full):
+    """A search was not queued: the queue or the client's active-search limit is full."""
+
+    def __init__(self, reason: str, message: str, retry_after: int):
+        super().__init__(message)
+        self.reason = reason  # queue_full | client_limit
+        self.message = message
+        self.retry_after = retry_after
+
+
+class SearchJob:
+    """State of one background search: status, progress and partial matches."""
+
+    def __init__(self, search_id: str, priority: str = "normal", client: Optional[str] = None):
+        self.search_id = search_id
+        self.priority = priority
+        self.client = client
+        self.status = "queued"  # queued -> running -> completed | error
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.videos_total = 0
+        self.videos_done = 0
+        self.frames_total = 0
+        self.video_frames: Dict[str, int] = {}
+        self.matches: List[Dict[str, Any]] = []
+        self.results: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def handle_event(self, event: Dict[str, Any]) -> None:
+        """Progress callback passed to SearchService.search_in_videos."""
+        with self._lock:
+            if event["type"] == "start":
+                self.videos_total = event["videos"]
+                self.frames_total = event["frames"]
+            elif event["type"] == "frames":
+                video = event["video"]
+                self.video_frames[video] = self.video_frames.get(video, 0) + event["frames"]
+            elif event["type"] == "video":
+                # Final count replaces the running estimate for this video
+                self.video_frames[event["video"]] = event["frames"]
+                self.videos_done += 1
+                self.matches.extend(event["matches"])
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "error")
+
+    def progress(self) -> Dict[str, Any]:
+        """Current progress with a rough ETA based on frame throughput so far."""
+        with self._lock:
+            frames_processed = sum(self.video_frames.values())
+            eta_seconds = None
+            if self.status == "running" and frames_processed > 0 and self.started_at:
+                elapsed = time.time() - self.started_at
+                remaining = max(0, self.frames_total - frames_processed)
+                eta_seconds = round(elapsed * remaining / frames_processed, 1)
+            elif self.finished:
+                eta_seconds = 0
+
+            return {
+                "videos_total": self.videos_total,
+                "videos_done": self.videos_done,
+                "frames_total": self.frames_total,
+                "frames_processed": frames_processed,
+                "matches_found": len(self.matches),
+                "eta_seconds": eta_seconds
+            }
+
+    def matches_since(self, offset: int) -> List[Dict[str, Any]]:
+        """Matches appended after the given position (for streaming)."""
+        with self._lock:
+            return list(self.matches[offset:])
+
+    def to_dict(self, include_matches: bool = True) -> Dict[str, Any]:
+        """Serializable job status for polling endpoints."""
+        status = {
+            "search_id": self.search_id,
+            "status": self.status,
+            "priority": self.priority,
+            "progress": self.progress(),
+            "error": self.error
+        }
+        if include_matches:
+            with self._lock:
+                status["matches"] = sorted(self.matches, key=lambda m: m['confidence'], reverse=True)
+        return status
+
+
+class SearchJobManager:
+    """
+    Priority queue of search jobs executed by a fixed set of worker threads.
+
+    Args:
+        workers: Searches that run at once
+        max_queue: Jobs waiting across the normal and low lanes; the high lane
+            has its own allowance of the same size, so urgent searches are
+            never turned away because of background load
+        max_jobs: Finished jobs kept for status polling
+        client_limit: Queued plus running searches per client (0 = unlimited)
+        aging_seconds: Waiting this long moves a job up one lane (0 = no aging)
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        max_queue: int = 8,
+        max_jobs: int = 100,
+        client_limit: int = 0,
+        aging_seconds: float = 0.0
+    ):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.max_jobs = max_jobs
+        self.client_limit = max(0, client_limit)
+        self.aging_seconds = max(0.0, aging_seconds)
+        # (lane rank, submission order, job, run); order keeps each lane FIFO
+        self._queue: List[tuple] = []
+        self._order = itertools.count()
+        self._jobs: "OrderedDict[str, SearchJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._threads: List[threading.Thread] = []
+        # Moving average of search wall time, for queue wait estimates
+        self._average_seconds: Optional[float] = None
+
+    def start(self) -> None:
+        """Start worker threads (idempotent)."""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"search-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Search job queue started with {self.workers} worker(s)")
+
+    def submit(
+        self,
+        search_id: str,
+        run: Callable[[SearchJob], Dict[str, Any]],
+        priority: str = "normal",
+        client: Optional[str] = None
+    ) -> SearchJob:
+        """
+        Queue a search.
+
+        Args:
+            search_id: Unique search identifier
+            run: Callable executing the search for a job and returning its results
+            priority: Lane from PRIORITIES
+            client: Submitting client (e.g. IP address) for the per-client limit
+
+        Raises:
+            ValueError: If the priority is unknown
+            AdmissionError: If the lane's queue or the client's limit is full
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {PRIORITIES}")
+        self.start()
+        job = SearchJob(search_id, priority, client)
+
+        with self._lock:
+            self._admit(job)
+            self._queue.append((PRIORITIES.index(priority), next(self._order), job, run))
+            self._jobs[search_id] = job
+            self._prune()
+            position = self._position(job)
+            self._available.notify()
+
+        logger.info(f"Queued {priority} search {search_id} at position {position} (queue depth: {len(self._queue)})")
+        return job
+
+    def _admit(self, job: SearchJob) -> None:
+        """Raise AdmissionError if the job may not be queued (caller holds the lock)."""
+        if self.client_limit and job.client is not None:
+            active = sum(1 for other in self._jobs.values() if other.client == job.client and not other.finished)
+            if active >= self.client_limit:
+                SEARCH_REJECTIONS.inc(reason="client_limit")
+                raise AdmissionError(
+                    "client_limit",
+                    f"Too many active searches ({active}) from this client. Please wait for one to finish.",
+                    self._retry_after(1)
+                )
+
+        if job.priority == PRIORITIES[0]:
+            depth = sum(1 for entry in self._queue if entry[0] == 0)
+        else:
+            depth = sum(1 for entry in self._queue if entry[0] > 0)
+        if depth >= self.max_queue:
+            SEARCH_REJECTIONS.inc(reason="queue_full")
+            raise AdmissionError(
+                "queue_full",
+                "Search queue is full. Please try again shortly.",
+                self._retry_after(len(self._queue) + 1)
+            )
+
+    def _retry_after(self, jobs_ahead: int) -> int:
+        """Seconds until about `jobs_ahead` searches have finished (caller holds the lock)."""
+        average = self._average_seconds or 30.0
+        return max(1, math.ceil(average * jobs_ahead / self.workers))
+
+    def _ordered(self) -> List[tuple]:
+        """
+        Queued entries in run order (caller holds the lock).
+
+        A job's effective lane is its own minus one per aging_seconds waited,
+        so it eventually runs ahead of newer, higher-priority jobs.
+        """
+        now = time.time()
+
+        def rank(entry: tuple) -> tuple:
+            lane, order, job, _ = entry
+            if self.aging_seconds:
+                lane -= int((now - job.created_at) // self.aging_seconds)
+            return lane, order
+
+        return sorted(self._queue, key=rank)
+
+    def _position(self, job: SearchJob) -> Optional[int]:
+        """1-based position among queued jobs, or None if not queued (caller holds the lock)."""
+        for position, entry in enumerate(self._ordered(), start=1):
+            if entry[2] is job:
+                return position
+        return None
+
+    def queue_info(self, search_id: str) -> Optional[Dict[str, Any]]:
+        """Queue position and estimated wait of a queued job (None once it runs or if unknown)."""
+        with self._lock:
+            job = self._jobs.get(search_id)
+            position = self._position(job) if job is not None else None
+            if position is None:
+                return None
+            return {
+                "position": position,
+                "queue_depth": len(self._queue),
+                "estimated_wait_seconds": self._retry_after(position) if self._average_seconds else None
+            }
+
+    def get(self, search_id: str) -> Optional[SearchJob]:
+        with self._lock:
+            return self._jobs.get(search_id)
+
+    def clear_finished(self) -> None:
+        """Forget finished jobs (their results live in the results cache)."""
+        with self._lock:
+            for search_id in [sid for sid, job in self._jobs.items() if job.finished]:
+                del self._jobs[search_id]
+
+    def remove(self, search_id: str) -> bool:
+        """Forget one finished job. Returns False if it is unknown or still active."""
+        with self._lock:
+            job = self._jobs.get(search_id)
+            if job is None or not job.finished:
+                return False
+            del self._jobs[search_id]
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            lanes = [PRIORITIES[entry[0]] for entry in self._queue]
+            average = self._average_seconds
+        return {
+            "workers": self.workers,
+            "queue_depth": len(lanes),
+            "queue_size": self.max_queue,
+            "queued_by_priority": {priority: lanes.count(priority) for priority in PRIORITIES},
+            "client_limit": self.client_limit,
+            "running": statuses.count("running"),
+            "queued": statuses.count("queued"),
+            "average_search_seconds": round(average, 2) if average is not None else None
+        }
+
+    def _prune(self) -> None:
+        # Drop the oldest finished jobs beyond max_jobs; active jobs are never dropped
+        excess = len(self._jobs) - self.max_jobs
+        for search_id in [sid for sid, job in self._jobs.items() if job.finished][:max(0, excess)]:
+            del self._jobs[search_id]
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._queue:
+                    self._available.wait()
+                entry = self._ordered()[0]
+                self._queue.remove(entry)
+                _, _, job, run = entry
+                job.status = "running"
+                job.started_at = time.time()
+            SEARCH_QUEUE_SECONDS.observe(job.started_at - job.created_at, priority=job.priority)
+            try:
+                job.results = run(job)
+                if job.results.get("status") == "error":
+                    job.error = job.results.get("error")
+                    job.status = "error"
+                else:
+                    job.status = "completed"
+            except Exception as e:
+                logger.error(f"Search job {job.search_id} failed: {e}", exc_info=True)
+                job.error = str(e)
+                job.status = "error"
+            finally:
+                job.finished_at = time.time()
+                duration = job.finished_at - job.started_at
+                SEARCHES.inc(status=job.status)
+                SEARCH_SECONDS.observe(duration)
+                with self._lock:
+                    self._average_seconds = (
+                        duration if self._average_seconds is None else 0.8 * self._average_seconds + 0.2 * duration
+                    )
@@ -7,15 +7,13 @@ import cv2
 import numpy as np
 from pathlib import Path
 from datetime import datetime
-import json
 import logging
-from typing import List, Dict, Any
-import torch
-import torch.nn as nn
-import torchvision.transforms as transforms
-from PIL import Image
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+import shutil
 import sys
 from pathlib import Path as PathlibPath
+import threading
+import time
 import warnings
 
 # Suppress deprecation warnings from torch
@@ -25,45 +23,268 @@ warnings.filterwarnings('ignore', category=UserWarning)
 sys.path.insert(0, str(PathlibPath(__file__).parent.parent.parent))
 
 from src.config.settings import Settings
+from src.backend.face_index import FaceIndex
+from src.backend.parallel_search import ParallelIndexer
+from src.backend.frame_sampler import FrameSampler
+from src.backend.face_detectors import create_face_detector
+from src.backend.face_tracker import FaceTracker
+from src.backend.ann_index import IVFIndex
+from src.backend.similarity import normalize, cosine_scores, group_max, top_k
+from src.backend.columnar import decode_embeddings, file_lock
+from src.backend.stream_pool import StreamPool
+from src.backend.result_writer import ResultWriter, WriteBatch
+from src.backend.query_cache import QueryEmbeddingCache, file_digest
+from src.backend.candidates import CandidateStore, Candidates, concat_candidates
+from src.backend.face_quality import FaceQualityScorer, QUALITY_POLICIES
+from src.backend.stage_timer import StageTimer, current_trace
+from src.backend.metrics import FRAMES_INDEXED, FACES_INDEXED, FACES_SCORED, MATCHES_FOUND, MODEL_LOAD_SECONDS
+from src.backend.motion_gate import MotionGate, load_roi_config, camera_polygons, roi_signature
+from src.backend.model_loader import load_face_embedder
+from src.backend.face_embedders import EMBED_MODES
 
 logger = logging.getLogger(__name__)
 
+# Matched frames further apart than this are reached by seeking instead of grabbing
+SNAPSHOT_SEEK_GAP = 30
+
+# Sampled frames between progress events while indexing a video
+PROGRESS_EVERY = 25
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
 
 class SearchService:
     """Service for searching lost persons in video footage using face recognition."""
     
-    def __init__(self):
-        """Initialize face detection and recognition models."""
+    def __init__(self, enable_workers: bool = True, lazy_models: bool = False):
+        """
+        Initialize face detection and recognition models.
+        
+        Args:
+            enable_workers: Allow the process pool (disabled inside pool workers)
+            lazy_models: Load the models on a background thread instead of
+                blocking; anything that needs them waits until they are ready
+        """
         logger.info("Initializing SearchService...")
         
-        # Initialize OpenCV Face Detection (Haar Cascade - more reliable than MediaPipe on Render)
-        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        self.face_cascade = cv2.CascadeClassifier(cascade_path)
+        # Per-stage timings (decode, detect, embed, score, snapshot, ...)
+        self.stage_timer = StageTimer()
+        
+        # Detector and embedder, filled in by load_models()
+        self._face_detector = None
+        self._face_model = None
+        self.model_status = "loading"  # loading -> ready | failed
+        self.model_source: Optional[str] = None
+        self.model_error: Optional[str] = None
+        self.model_load_seconds: Optional[float] = None
+        self._models_ready = threading.Event()
+        self._models_lock = threading.Lock()
+        self._torch_threads = Settings.TORCH_THREADS if enable_workers and Settings.SEARCH_WORKERS <= 1 else 0
         
-        # Load face recognition model
-        self.face_model = self._load_face_model()
+        # Crop quality between detection and embedding
+        if Settings.QUALITY_POLICY not in QUALITY_POLICIES:
+            raise ValueError(f"Unknown quality policy '{Settings.QUALITY_POLICY}', expected one of {QUALITY_POLICIES}")
+        self.quality_policy = Settings.QUALITY_POLICY
+        self.quality_min_score = Settings.QUALITY_MIN_SCORE
+        self.quality_scorer = FaceQualityScorer(Settings.QUALITY_SHARPNESS_REF, Settings.QUALITY_FULL_SIZE)
         
         # Settings
-        self.similarity_threshold = 0.6  # Lower threshold for crowd detection
-        self.frame_skip = 5  # Process every 5th frame for speed
-        self.device = torch.device('cpu')  # Use CPU for Render compatibility
+        self.similarity_threshold = Settings.SIMILARITY_THRESHOLD
+        self.frame_skip = Settings.FRAME_SKIP
+        self.sampler = FrameSampler(Settings.SAMPLING_MODE, self.frame_skip, Settings.SAMPLE_FPS)
+        self.embed_batch_size = max(1, Settings.EMBED_BATCH_SIZE)
+        
+        # Embedder inference mode (fp32/jit/int8/onnx) and crop size
+        if Settings.EMBED_MODE not in EMBED_MODES:
+            raise ValueError(f"Unknown embed mode '{Settings.EMBED_MODE}', expected one of {EMBED_MODES}")
+        self.embed_mode = Settings.EMBED_MODE
+        self.embed_input_size = Settings.EMBED_INPUT_SIZE
+        
+        # Persistent face index so repeat searches skip decode/detect/embed
+        self.face_index = FaceIndex() if Settings.USE_FACE_INDEX else None
+        
+        # Background writer for snapshots and result files (threads start on first write)
+        self.result_writer = ResultWriter(
+            Settings.RESULTS_DIR,
+            workers=Settings.RESULT_WRITER_WORKERS,
+            max_queue=Settings.RESULT_WRITER_QUEUE_SIZE,
+            mode=Settings.SNAPSHOT_MODE,
+            context=Settings.SNAPSHOT_CONTEXT,
+            max_width=Settings.SNAPSHOT_MAX_WIDTH,
+            jpeg_quality=Settings.SNAPSHOT_JPEG_QUALITY,
+            stage_timer=self.stage_timer
+        )
+        
+        # Per-search candidate lists for re-thresholding without a rescan
+        self.candidate_store = CandidateStore(Settings.RESULTS_DIR, Settings.RESULT_STORE_MAX_ENTRIES)
+        
+        # Query photo detections/embeddings keyed by content hash
+        self.query_cache = QueryEmbeddingCache(Settings.QUERY_CACHE_SIZE)
+        
+        # Shared RTSP connections (threads start only when a stream is requested)
+        self.stream_pool = StreamPool()
+        
+        # Archive-wide ANN index over every indexed video (created on first use)
+        self._archive_index: Optional[IVFIndex] = None
+        
+        # Optional process pool that indexes videos in parallel shards
+        self.parallel_indexer = None
+        if enable_workers and Settings.SEARCH_WORKERS > 1:
+            self.parallel_indexer = ParallelIndexer(
+                Settings.SEARCH_WORKERS,
+                Settings.TORCH_THREADS,
+                Settings.SHARD_FRAMES
+            )
+        
+        if lazy_models:
+            threading.Thread(target=self.load_models, name="model-loader", daemon=True).start()
+        else:
+            self.load_models()
         
         logger.info("SearchService initialized successfully")
     
-    def _load_face_model(self):
-        """Load pre-trained ResNet18 for face recognition."""
-        try:
-            import torchvision.models as models
-            from torchvision.models import ResNet18_Weights
-            model = models.resnet18(weights=ResNet18_Weights.IMAGENET1K_V1)
-            model = nn.Sequential(*list(model.children())[:-1])
-            model = model.to(self.device)
-            model.eval()
-            logger.info("ResNet18 face model loaded")
-            return model
-        except Exception as e:
-            logger.warning(f"Could not load ResNet: {e}. Using histogram fallback.")
-            return None
+    def load_models(self) -> None:
+        """Load the detector and embedder once; sets readiness whether or not loading succeeds."""
+        with self._models_lock:
+            if self._models_ready.is_set():
+                return
+            started = time.perf_counter()
+            try:
+                # Face detection (Haar cascade by default, DNN backends if model files exist)
+                load_start = time.perf_counter()
+                self._face_detector = create_face_detector()
+                MODEL_LOAD_SECONDS.set(round(time.perf_counter() - load_start, 4), model=f"detector_{self._face_detector.name}")
+                
+                if self._torch_threads > 0:
+                    import torch
+                    torch.set_num_threads(self._torch_threads)
+                
+                # Face recognition model: TorchScript export, local weights, then download,
+                # wrapped for the inference mode (int8/onnx load their own prebuilt files)
+                load_start = time.perf_counter()
+                self._face_model, self.model_source = load_face_embedder(
+                    Settings.FACE_MODEL_WEIGHTS,
+                    Settings.FACE_MODEL_TORCHSCRIPT,
+                    Settings.MODEL_DOWNLOAD,
+                    mode=self.embed_mode,
+                    input_size=self.embed_input_size,
+                    channels_last=Settings.EMBED_CHANNELS_LAST,
+                    int8_path=Settings.FACE_MODEL_INT8,
+                    onnx_path=Settings.FACE_MODEL_ONNX
+                )
+                MODEL_LOAD_SECONDS.set(
+                    round(time.perf_counter() - load_start, 4),
+                    model="embedder_histogram" if self._face_model is None else "embedder_resnet18"
+                )
+                self.model_status = "ready"
+            except Exception as e:
+                logger.error(f"Model loading failed: {e}")
+                self.model_status = "failed"
+                self.model_error = str(e)
+            finally:
+                self.model_load_seconds = round(time.perf_counter() - started, 3)
+                self._models_ready.set()
+        logger.info(f"Models {self.model_status} in {self.model_load_seconds}s (embedder: {self.model_source})")
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the models are loaded.
+        
+        Returns:
+            False if the timeout expired first.
+        
+        Raises:
+            RuntimeError: If model loading failed
+        """
+        if not self._models_ready.wait(timeout):
+            return False
+        if self.model_status == "failed":
+            raise RuntimeError(f"Models failed to load: {self.model_error}")
+        return True
+    
+    @property
+    def ready(self) -> bool:
+        return self._models_ready.is_set() and self.model_status == "ready"
+    
+    @property
+    def face_detector(self):
+        self.wait_until_ready()
+        return self._face_detector
+    
+    @property
+    def face_model(self):
+        self.wait_until_ready()
+        return self._face_model
+    
+    @property
+    def detection_confidence(self) -> float:
+        """Footage detections below this are dropped (set per detector backend)."""
+        return self.face_detector.min_confidence
+    
+    def model_info(self) -> Dict[str, Any]:
+        """Readiness of the detector and embedder."""
+        ready = self.ready
+        return {
+            "status": self.model_status,
+            "detector": self._face_detector.name if self._face_detector is not None else None,
+            "embedder": ("histogram" if self._face_model is None else "resnet18") if ready else None,
+            # Configured mode vs. what runs (e.g. fp32 when the int8 file is missing) and the file it came from
+            "embed_mode": self.embed_mode,
+            "embed_backend": self._face_model.name if self._face_model is not None else None,
+            "embedder_source": self.model_source,
+            "load_seconds": self.model_load_seconds,
+            "error": self.model_error
+        }
+    
+    @property
+    def model_tag(self) -> str:
+        """Identifier of the active detector and embedder, used to key stored face indexes."""
+        detector = (
+            f"{self.face_detector.name}{self.face_detector.max_width}"
+            f"c{self.detection_confidence:g}"
+        )
+        if self.face_model is None:
+            return f"{detector}_histogram"
+        return f"{detector}_{self.face_model.tag}"
+    
+    @property
+    def index_tag(self) -> str:
+        """Full pipeline identifier (detector, embedder, sampling, tracking) keying face indexes."""
+        tracking = f"trk{Settings.TRACK_REEMBED_EVERY}" if Settings.FACE_TRACKING else "notrk"
+        motion = (
+            f"mg{Settings.MOTION_WIDTH}t{Settings.MOTION_THRESHOLD}a{Settings.MOTION_MIN_AREA:g}"
+            f"n{Settings.MOTION_TILES}r{Settings.MOTION_REFRESH_EVERY}"
+            if Settings.MOTION_GATE else "nomg"
+        )
+        quality = (
+            f"q{self.quality_policy}{self.quality_min_score:g}"
+            f"s{Settings.QUALITY_SHARPNESS_REF:g}f{Settings.QUALITY_FULL_SIZE}"
+            if self.quality_policy != "off" else "noq"
+        )
+        return f"{self.model_tag}_{self.sampler.tag}_{tracking}_{motion}_{quality}"
+    
+    def is_low_quality(self, face_data: Dict[str, Any]) -> bool:
+        """Whether the quality policy applies to this detection."""
+        return self.quality_policy != "off" and face_data.get('quality', 1.0) < self.quality_min_score
+    
+    def video_index_tag(self, video_path: Path) -> str:
+        """index_tag plus the video's ROI, so changing a camera's ROI rebuilds its index."""
+        polygons = camera_polygons(load_roi_config(Settings.CAMERA_ROI_FILE), Path(video_path).name, Path(video_path).stem)
+        signature = roi_signature(polygons)
+        return f"{self.index_tag}_roi{signature}" if signature else self.index_tag
+    
+    @staticmethod
+    def create_motion_gate(*camera_names: str) -> MotionGate:
+        """Detection gate for one camera or video, with its ROI polygons if configured."""
+        return MotionGate(
+            camera_polygons(load_roi_config(Settings.CAMERA_ROI_FILE), *camera_names),
+            enabled=Settings.MOTION_GATE,
+            width=Settings.MOTION_WIDTH,
+            threshold=Settings.MOTION_THRESHOLD,
+            min_area=Settings.MOTION_MIN_AREA,
+            tiles=Settings.MOTION_TILES,
+            refresh_every=Settings.MOTION_REFRESH_EVERY
+        )
     
     def extract_face_embedding(self, face_image: np.ndarray) -> np.ndarray:
         """
@@ -71,35 +292,28 @@ class SearchService:
         
         Uses ResNet18 if available, falls back to histogram-based features.
         """
+        return self.extract_face_embeddings([face_image])[0]
+    
+    def extract_face_embeddings(self, face_images: List[np.ndarray]) -> np.ndarray:
+        """
+        Extract embeddings for a batch of face crops in one forward pass.
+        
+        Returns:
+            (N, D) array of L2-normalized embeddings (D=512 for ResNet18).
+        """
+        if not face_images:
+            return np.zeros((0, 0), dtype=np.float32)
+        
         try:
-            if self.face_model is None:
-                return self._histogram_features(face_image)
-            
-            # Preprocess for ResNet18
-            transform = transforms.Compose([
-                transforms.Resize((224, 224)),
-                transforms.ToTensor(),
-                transforms.Normalize(
-                    mean=[0.485, 0.456, 0.406],
-                    std=[0.229, 0.224, 0.225]
-                )
-            ])
-            
-            pil_image = Image.fromarray(cv2.cvtColor(face_image, cv2.COLOR_BGR2RGB))
-            image_tensor = transform(pil_image).unsqueeze(0).to(self.device)
-            
-            with torch.no_grad():
-                embedding = self.face_model(image_tensor)
-            
-            embedding = embedding.squeeze().cpu().numpy()
-            if np.linalg.norm(embedding) > 0:
-                embedding = embedding / np.linalg.norm(embedding)
-            
-            return embedding
+            with self.stage_timer.stage("embed", len(face_images)):
+                if self.face_model is None:
+                    return np.vstack([self._histogram_features(face) for face in face_images])
+                
+                return self.face_model.embed(face_images)
             
         except Exception as e:
             logger.warning(f"Error in embedding extraction: {e}. Using fallback.")
-            return self._histogram_features(face_image)
+            return np.vstack([self._histogram_features(face) for face in face_images])
     
     @staticmethod
     def _histogram_features(face_image: np.ndarray) -> np.ndarray:
@@ -109,25 +323,45 @@ class SearchService:
         hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
         return cv2.normalize(hist, hist).flatten()
     
-    def detect_faces_in_frame(self, frame: np.ndarray) -> List[Dict[str, Any]]:
+    def detect_faces_in_frame(
+        self,
+        frame: np.ndarray,
+        min_confidence: Optional[float] = None,
+        region: Optional[Tuple[int, int, int, int]] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Detect all faces in a frame using OpenCV Haar Cascade.
+        Detect all faces in a frame using the configured detector backend.
+        
+        Args:
+            frame: BGR frame at full resolution
+            min_confidence: Drop detections scoring below this
+                (defaults to the detector's min_confidence)
+            region: Only search this (x1, y1, x2, y2) part of the frame
+                (e.g. from a MotionGate); boxes are still in frame coordinates
         
         Returns:
-            List of detected faces with bounding boxes and confidence scores.
-        """
-        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(
-            gray_frame,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(30, 30)
-        )
+            List of detected faces with bounding boxes and confidence scores
+            (plus a 0-1 crop quality score unless the quality policy is "off").
+        """
+        if min_confidence is None:
+            min_confidence = self.detection_confidence
         
         detected_faces = []
-        h, w, _ = frame.shape
+        h, w = frame.shape[:2]
+        rx, ry = 0, 0
+        search_area = frame
+        if region is not None:
+            rx, ry, rx2, ry2 = region
+            search_area = frame[ry:ry2, rx:rx2]
         
-        for (x, y, fw, fh) in faces:
+        with self.stage_timer.stage("detect"):
+            detections = self.face_detector.detect(search_area)
+        
+        for (x, y, fw, fh, confidence) in detections:
+            if confidence < min_confidence:
+                continue
+            x, y = x + rx, y + ry
+            
             # Add padding around face
             x1 = max(0, x - 15)
             y1 = max(0, y - 15)
@@ -138,11 +372,16 @@ class SearchService:
             face_roi = frame[y1:y2, x1:x2].copy()
             
             if face_roi.size > 0:
-                detected_faces.append({
+                face_data = {
                     'bbox': (x1, y1, x2, y2),
                     'face': face_roi,
-                    'confidence': 0.9  # Haar cascade doesn't return confidence
-                })
+                    'confidence': round(confidence, 3)
+                }
+                if self.quality_policy != "off":
+                    # Scored on the unpadded detector box
+                    with self.stage_timer.stage("quality"):
+                        face_data['quality'] = round(self.quality_scorer.score(frame[max(0, y):y + fh, max(0, x):x + fw]), 3)
+                detected_faces.append(face_data)
         
         return detected_faces
     
@@ -153,23 +392,16 @@ class SearchService:
         Returns:
             Similarity score between 0 and 1.
         """
-        # Normalize embeddings
-        e1 = embedding1 / (np.linalg.norm(embedding1) + 1e-8)
-        e2 = embedding2 / (np.linalg.norm(embedding2) + 1e-8)
-        
-        # Cosine similarity
-        similarity = float(np.dot(e1, e2))
-        
-        # Convert from [-1, 1] to [0, 1] range
-        similarity = (similarity + 1) / 2
-        
-        return similarity
+        # For scoring many faces use similarity.cosine_scores on pre-normalized blocks
+        return float(cosine_scores(normalize(embedding1), normalize(embedding2)[None])[0])
     
     def search_in_videos(
         self,
         lost_person_path: str,
         video_paths: List[Path],
-        search_id: str
+        search_id: str,
+        progress_callback: Optional[ProgressCallback] = None,
+        similarity_threshold: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Search for lost person in video files.
@@ -179,6 +411,9 @@ class SearchService:
             lost_person_path: Path to the lost person's photo
             video_paths: List of video file paths to search
             search_id: Unique search identifier
+            progress_callback: Optional hook receiving "start", "frames" and
+                "video" events (the latter with that video's matches)
+            similarity_threshold: Match threshold for this search (default: service threshold)
             
         Returns:
             Dictionary containing search results and matches (never depends on disk reads)
@@ -187,182 +422,942 @@ class SearchService:
         
         try:
             # Extract lost person's face embedding
-            lost_person_image = cv2.imread(lost_person_path)
-            if lost_person_image is None:
-                logger.error(f"Could not read lost person image: {lost_person_path}")
+            query, error = self._embed_query_photo(lost_person_path)
+            if query is None:
                 return {
                     "search_id": search_id,
                     "status": "error",
-                    "error": "Could not read uploaded image",
+                    "error": error,
                     "matches": [],
                     "stats": {"matches_found": 0}
                 }
+            logger.info("Lost person face embedding extracted")
+            
+            matches_by_person, search_stats = self._scan_videos(
+                query[np.newaxis, :],
+                ["lost_person"],
+                [0],
+                video_paths,
+                search_id,
+                progress_callback,
+                similarity_threshold
+            )
+            matches = matches_by_person["lost_person"]
+            
+            # Prepare final results - stored in memory
+            final_results = {
+                "search_id": search_id,
+                "timestamp": datetime.now().isoformat(),
+                "status": "completed",
+                "matches": matches,
+                "stats": search_stats,
+                "summary": self._summarize_matches(matches)
+            }
+            
+            # Try to save results to file (non-blocking, optional)
+            self._save_results_async(final_results)
             
-            # Detect face in lost person photo
-            lost_person_faces = self.detect_faces_in_frame(lost_person_image)
+            logger.info(f"Search {search_id} completed. Found {len(matches)} matches.")
+            
+            return final_results
             
-            if not lost_person_faces:
-                logger.warning("No face detected in lost person photo")
+        except Exception as e:
+            logger.error(f"Error during search: {str(e)}", exc_info=True)
+            return {
+                "search_id": search_id,
+                "status": "error",
+                "error": str(e),
+                "matches": [],
+                "stats": {"matches_found": 0}
+            }
+    
+    def search_gallery(
+        self,
+        queries: Dict[str, List[str]],
+        video_paths: List[Path],
+        search_id: str,
+        progress_callback: Optional[ProgressCallback] = None,
+        pooling: str = "mean",
+        similarity_threshold: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Search for several lost persons in one pass over the footage.
+        
+        Every stored face is scored against the whole query matrix in a single
+        matrix multiply, so cost grows with footage length, not with the
+        number of persons.
+        
+        Args:
+            queries: Person id -> list of photo paths of that person
+            video_paths: List of video file paths to search
+            search_id: Unique search identifier
+            progress_callback: Optional progress hook (see search_in_videos)
+            pooling: "mean" averages a person's photo embeddings into one query;
+                "max" scores each photo and keeps the best per person
+        
+        Returns:
+            Results grouped per person, plus a flat confidence-sorted match list.
+        """
+        logger.info(f"Starting gallery search {search_id}: {len(queries)} person(s), {len(video_paths)} videos")
+        
+        try:
+            if pooling not in ("mean", "max"):
+                raise ValueError(f"Unknown pooling '{pooling}', expected 'mean' or 'max'")
+            
+            rows, person_ids, person_starts = [], [], []
+            skipped_photos = []
+            photos_used = {}
+            person_errors = {}
+            
+            for person_id, photo_paths in queries.items():
+                embeddings = []
+                for photo_path in photo_paths:
+                    embedding, error = self._embed_query_photo(photo_path)
+                    if embedding is None:
+                        skipped_photos.append({"person_id": person_id, "photo": Path(photo_path).name, "error": error})
+                    else:
+                        embeddings.append(embedding)
+                
+                if not embeddings:
+                    person_errors[person_id] = "No usable face in any photo"
+                    continue
+                
+                person_ids.append(person_id)
+                person_starts.append(len(rows))
+                photos_used[person_id] = len(embeddings)
+                if pooling == "mean":
+                    pooled = np.mean(embeddings, axis=0)
+                    rows.append(normalize(pooled))
+                else:
+                    rows.extend(embeddings)
+            
+            if not rows:
                 return {
                     "search_id": search_id,
                     "status": "error",
-                    "error": "No face detected in the uploaded photo",
+                    "error": "No face detected in any uploaded photo",
+                    "persons": {},
+                    "skipped_photos": skipped_photos,
                     "matches": [],
                     "stats": {"matches_found": 0}
                 }
             
-            # Use the first (largest) face
-            lost_person_embedding = self.extract_face_embedding(lost_person_faces[0]['face'])
-            logger.info("Lost person face embedding extracted")
+            matches_by_person, search_stats = self._scan_videos(
+                np.vstack(rows),
+                person_ids,
+                person_starts,
+                video_paths,
+                search_id,
+                progress_callback,
+                similarity_threshold
+            )
             
-            # Search results - stored in memory
-            matches = []
-            search_stats = {
-                "total_videos": len(video_paths),
-                "videos_processed": 0,
-                "total_frames_processed": 0,
-                "matches_found": 0
+            persons = {
+                person_id: {
+                    "status": "completed",
+                    "photos_used": photos_used[person_id],
+                    "matches": matches_by_person[person_id],
+                    "summary": self._summarize_matches(matches_by_person[person_id])
+                }
+                for person_id in person_ids
             }
+            for person_id, error in person_errors.items():
+                persons[person_id] = {"status": "error", "error": error, "matches": [], "summary": self._summarize_matches([])}
             
-            # Process each video
-            for video_path in video_paths:
-                video_path = Path(video_path)
-                if not video_path.exists():
-                    logger.warning(f"Video file not found: {video_path}")
-                    continue
-                
-                logger.info(f"Processing video: {video_path.name}")
-                
-                # Open video
-                cap = cv2.VideoCapture(str(video_path))
-                if not cap.isOpened():
-                    logger.error(f"Cannot open video: {video_path}")
-                    continue
-                
-                frame_count = 0
-                fps = cap.get(cv2.CAP_PROP_FPS) or 30
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                frame_idx = 0
-                
-                while True:
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                    
-                    # Skip frames for faster processing
-                    if frame_idx % self.frame_skip != 0:
-                        frame_idx += 1
-                        continue
-                    
-                    frame_idx += 1
-                    frame_count += 1
-                    
-                    # Detect faces in frame
-                    detected_faces = self.detect_faces_in_frame(frame)
-                    
-                    for face_data in detected_faces:
-                        face_embedding = self.extract_face_embedding(face_data['face'])
-                        similarity = self.calculate_similarity(lost_person_embedding, face_embedding)
-                        
-                        # If match found (exceeds threshold)
-                        if similarity >= self.similarity_threshold:
-                            timestamp = (frame_idx / fps) if fps > 0 else 0
-                            
-                            # Create match record (in memory)
-                            snapshot_name = f"{search_id}_{video_path.stem}_{frame_count}.jpg"
-                            
-                            match = {
-                                "camera": video_path.stem,
-                                "camera_name": video_path.stem.replace("_", " ").title(),
-                                "confidence": round(similarity * 100, 2),
-                                "timestamp": round(timestamp, 2),
-                                "frame_number": frame_count,
-                                "snapshot": snapshot_name,
-                                "time_formatted": self._format_time(timestamp)
-                            }
-                            
-                            matches.append(match)
-                            search_stats["matches_found"] += 1
-                            
-                            logger.info(
-                                f"Match found: {match['camera']} at {match['time_formatted']} "
-                                f"(confidence: {match['confidence']}%)"
-                            )
-                            
-                            # Try to save snapshot (non-blocking, optional)
-                            self._save_snapshot_async(frame, face_data, snapshot_name)
-                
-                cap.release()
-                search_stats["videos_processed"] += 1
-                search_stats["total_frames_processed"] += frame_count
-                logger.info(f"Completed video: {video_path.name} ({frame_count} frames)")
-            
-            # Sort matches by confidence (descending)
-            matches.sort(key=lambda x: x['confidence'], reverse=True)
+            all_matches = sorted(
+                (m for person_matches in matches_by_person.values() for m in person_matches),
+                key=lambda m: m['confidence'],
+                reverse=True
+            )
             
-            # Prepare final results - stored in memory
             final_results = {
                 "search_id": search_id,
                 "timestamp": datetime.now().isoformat(),
                 "status": "completed",
-                "matches": matches,
+                "pooling": pooling,
+                "persons": persons,
+                "skipped_photos": skipped_photos,
+                "matches": all_matches,
                 "stats": search_stats,
-                "summary": {
-                    "total_matches": len(matches),
-                    "best_match_confidence": matches[0]['confidence'] if matches else 0,
-                    "cameras_with_matches": len(set(m['camera'] for m in matches)) if matches else 0
-                }
+                "summary": self._summarize_matches(all_matches)
             }
             
-            # Try to save results to file (non-blocking, optional)
             self._save_results_async(final_results)
             
-            logger.info(f"Search {search_id} completed. Found {len(matches)} matches.")
+            logger.info(f"Gallery search {search_id} completed. Found {len(all_matches)} matches.")
             
             return final_results
             
         except Exception as e:
-            logger.error(f"Error during search: {str(e)}", exc_info=True)
+            logger.error(f"Error during gallery search: {str(e)}", exc_info=True)
             return {
                 "search_id": search_id,
                 "status": "error",
                 "error": str(e),
+                "persons": {},
                 "matches": [],
                 "stats": {"matches_found": 0}
             }
+    
+    def _embed_query_photo(self, photo_path: str) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        """
+        Detect the face in a query photo and embed it.
+        
+        Detections are cached by photo content, so re-submitting the same
+        photo skips detection and embedding.
+        
+        Returns:
+            (L2-normalized embedding, None) or (None, error message)
+        """
+        try:
+            cache_key = f"{file_digest(photo_path)}:{self.model_tag}"
+        except OSError:
+            cache_key = None
+        
+        cached = self.query_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            logger.info(f"Using cached query embedding for {Path(photo_path).name}")
+            return cached["embedding"], None
+        
+        image = cv2.imread(str(photo_path))
+        if image is None:
+            logger.error(f"Could not read lost person image: {photo_path}")
+            return None, "Could not read uploaded image"
+        
+        # Detect face in lost person photo (any confidence: the operator chose this photo)
+        faces = self.detect_faces_in_frame(image, min_confidence=0.0)
+        if not faces:
+            logger.warning(f"No face detected in lost person photo: {Path(photo_path).name}")
+            return None, "No face detected in the uploaded photo"
+        
+        # Use the first (largest) face
+        embedding = normalize(self.extract_face_embedding(faces[0]['face']))
+        if cache_key:
+            self.query_cache.put(cache_key, embedding, faces[0]['bbox'], faces[0]['confidence'])
+        return embedding, None
+    
+    def _scan_videos(
+        self,
+        query_matrix: np.ndarray,
+        person_ids: List[str],
+        person_starts: List[int],
+        video_paths: List[Path],
+        search_id: str,
+        progress_callback: Optional[ProgressCallback] = None,
+        similarity_threshold: Optional[float] = None
+    ) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Any]]:
+        """
+        Score every video's stored faces against a query matrix.
+        
+        Args:
+            query_matrix: (R, D) normalized query rows, grouped contiguously per person
+            person_ids: Person id for each group of rows
+            person_starts: First row of each person's group
+            similarity_threshold: Match threshold (default: service threshold)
+        
+        Returns:
+            (confidence-sorted matches per person, search stats)
+        """
+        threshold = self.similarity_threshold if similarity_threshold is None else similarity_threshold
+        matches_by_person: Dict[str, List[Dict[str, Any]]] = {person_id: [] for person_id in person_ids}
+        candidates_by_person: Dict[str, List[Candidates]] = {person_id: [] for person_id in person_ids}
+        snapshot_prefix = {
+            person_id: search_id if len(person_ids) == 1 else f"{search_id}_{person_id}"
+            for person_id in person_ids
+        }
+        search_stats = {
+            "total_videos": len(video_paths),
+            "videos_processed": 0,
+            "total_frames_processed": 0,
+            "matches_found": 0,
+            "videos_from_index": 0,
+            "faces_scored": 0,
+            "similarity_threshold": threshold
+        }
+        snapshots_left = Settings.SNAPSHOT_MAX_PER_SEARCH or None
+        snapshot_batch = WriteBatch()
+        
+        existing_videos = []
+        for video_path in video_paths:
+            video_path = Path(video_path)
+            if not video_path.exists():
+                logger.warning(f"Video file not found: {video_path}")
+                continue
+            existing_videos.append(video_path)
+        
+        self._notify(progress_callback, {
+            "type": "start",
+            "videos": len(existing_videos),
+            "frames": sum(self._estimate_sampled_frames(v) for v in existing_videos)
+        })
+        
+        # Process each video as soon as its face index is available
+        for video_path, entry, from_index in self._iter_video_indexes(existing_videos, progress_callback):
+            if entry is None:
+                self._notify(progress_callback, {"type": "video", "video": video_path.name, "frames": 0, "matches": []})
+                continue
+            
+            embeddings = entry["embeddings"]
+            video_matches = []
+            snapshot_jobs = []
+            
+            if len(embeddings) and embeddings.shape[1] == query_matrix.shape[1]:
+                # Cosine similarity of every stored face against every query row in one matrix multiply,
+                # then the best row per person
+                with self.stage_timer.stage("score", len(embeddings)):
+                    person_scores = group_max(
+                        cosine_scores(query_matrix, embeddings, entry.get("embedding_scales")), person_starts
+                    )
+                search_stats["faces_scored"] += len(embeddings)
+                FACES_SCORED.inc(len(embeddings), camera=video_path.stem)
+                
+                for column, person_id in enumerate(person_ids):
+                    scores = person_scores[:, column]
+                    
+                    # One candidate per face track: its best-scoring sample above the candidate floor
+                    hits = top_k(scores, threshold=min(threshold, Settings.CANDIDATE_MIN_SIMILARITY))
+                    _, first_hit = np.unique(entry["track_ids"][hits], return_index=True)
+                    best_rows = hits[np.sort(first_hit)][:Settings.CANDIDATE_TOP_K]
+                    
+                    track_ids = entry["track_ids"][best_rows]
+                    candidates = {
+                        "score": scores[best_rows].astype(np.float32),
+                        "camera": np.full(len(best_rows), video_path.stem),
+                        "frame_index": entry["frame_indices"][best_rows],
+                        "frame_number": entry["frame_numbers"][best_rows],
+                        "timestamp": entry["timestamps"][best_rows],
+                        "track_id": track_ids,
+                        "first_seen": entry["track_first_times"][track_ids],
+                        "last_seen": entry["track_last_times"][track_ids],
+                        "bbox": entry["bboxes"][best_rows].astype(np.int32),
+                        "quality": entry["qualities"][best_rows].astype(np.float32),
+                        "snapshot": np.full(len(best_rows), "", dtype=object)
+                    }
+                    if Settings.CANDIDATE_KEEP_EMBEDDINGS:
+                        scales = entry.get("embedding_scales")
+                        candidates["embedding"] = decode_embeddings(
+                            embeddings[best_rows], None if scales is None else scales[best_rows]
+                        ).astype(np.float16)
+                    candidates_by_person[person_id].append(candidates)
+                    
+                    # Matches: the candidates above the search threshold
+                    for i in np.flatnonzero(candidates["score"] >= threshold):
+                        frame_count = int(candidates["frame_number"][i])
+                        track_id = int(candidates["track_id"][i])
+                        snapshot_name = f"{snapshot_prefix[person_id]}_{video_path.stem}_{frame_count}_t{track_id}.jpg"
+                        
+                        match = self._build_match(person_id, candidates, i, snapshot_name)
+                        
+                        matches_by_person[person_id].append(match)
+                        video_matches.append(match)
+                        search_stats["matches_found"] += 1
+                        
+                        logger.debug(
+                            f"Match found: {person_id} on {match['camera']} at {match['time_range_formatted']} "
+                            f"(confidence: {match['confidence']}%)"
+                        )
+                        
+                        snapshot_jobs.append(
+                            (int(candidates["frame_index"][i]), tuple(int(v) for v in candidates["bbox"][i]),
+                             snapshot_name, match, candidates, i)
+                        )
+            elif len(embeddings):
+                logger.warning(f"Index for {video_path.name} has mismatched embedding size, skipping")
+            
+            # Per-search snapshot cap: the most confident matches get images
+            if snapshots_left is not None:
+                snapshot_jobs.sort(key=lambda job: job[3]['confidence'], reverse=True)
+                for job in snapshot_jobs[snapshots_left:]:
+                    job[3]['snapshot'] = None
+                snapshot_jobs = snapshot_jobs[:snapshots_left]
+                snapshots_left -= len(snapshot_jobs)
+            
+            # Candidates remember which matches have a snapshot, for re-ranking later
+            for job in snapshot_jobs:
+                job[4]["snapshot"][job[5]] = job[2]
+            
+            # Try to save snapshots (optional) by re-reading only the matched frames
+            with self.stage_timer.stage("snapshot", len(snapshot_jobs)):
+                self._save_match_snapshots(
+                    video_path,
+                    [job[:3] for job in snapshot_jobs],
+                    self.face_index.snapshot_dir(video_path, self.video_index_tag(video_path))
+                    if self.face_index is not None and snapshot_jobs else None,
+                    snapshot_batch
+                )
+            
+            if video_matches:
+                MATCHES_FOUND.inc(len(video_matches), camera=video_path.stem)
+                logger.info(f"{len(video_matches)} match(es) in {video_path.name}")
+            if not from_index:
+                FRAMES_INDEXED.inc(entry["frames_processed"], camera=video_path.stem)
+                FACES_INDEXED.inc(len(embeddings), camera=video_path.stem)
+            
+            search_stats["videos_processed"] += 1
+            search_stats["total_frames_processed"] += entry["frames_processed"]
+            search_stats["videos_from_index"] += int(from_index)
+            logger.info(f"Completed video: {video_path.name} ({entry['frames_processed']} frames)")
             
-            return error_result
+            self._notify(progress_callback, {
+                "type": "video",
+                "video": video_path.name,
+                "frames": entry["frames_processed"],
+                "matches": video_matches
+            })
+        
+        # Snapshots are written in the background; make sure this search's exist before results are served
+        with self.stage_timer.stage("write_wait"):
+            self.result_writer.flush(snapshot_batch)
+        
+        # Keep every video's candidates so the search can be re-thresholded without a rescan
+        self.candidate_store.save(search_id, {
+            person_id: concat_candidates(parts)
+            for person_id, parts in candidates_by_person.items()
+        })
+        
+        # Sort matches by confidence (descending)
+        for person_matches in matches_by_person.values():
+            person_matches.sort(key=lambda x: x['confidence'], reverse=True)
+        
+        return matches_by_person, search_stats
+    
+    def _build_match(self, person_id: str, candidates: Candidates, i: int, snapshot: Optional[str]) -> Dict[str, Any]:
+        """Match record for row i of a candidate list."""
+        camera = str(candidates["camera"][i])
+        timestamp = float(candidates["timestamp"][i])
+        # NaN when crops were not quality-scored (policy "off" or an older search)
+        quality = float(candidates["quality"][i]) if "quality" in candidates else np.nan
+        first_seen = float(candidates["first_seen"][i])
+        last_seen = float(candidates["last_seen"][i])
+        return {
+            "person_id": person_id,
+            "camera": camera,
+            "camera_name": camera.replace("_", " ").title(),
+            "confidence": round(float(candidates["score"][i]) * 100, 2),
+            "timestamp": round(timestamp, 2),
+            "frame_number": int(candidates["frame_number"][i]),
+            "snapshot": snapshot,
+            "time_formatted": self._format_time(timestamp),
+            "track_id": int(candidates["track_id"][i]),
+            "quality": None if np.isnan(quality) else round(quality, 3),
+            "first_seen": round(first_seen, 2),
+            "last_seen": round(last_seen, 2),
+            "time_range_formatted": f"{self._format_time(first_seen)} - {self._format_time(last_seen)}"
+        }
     
-    def _save_snapshot_async(self, frame: np.ndarray, face_data: Dict[str, Any], snapshot_name: str) -> None:
+    def rerank_search(
+        self,
+        search_id: str,
+        similarity_threshold: Optional[float] = None,
+        cameras: Optional[List[str]] = None,
+        person_id: Optional[str] = None,
+        sort_by: str = "confidence",
+        group_by: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
-        Try to save snapshot asynchronously (non-blocking).
-        Failures are logged but do not affect search results.
+        Re-filter a finished search's candidates under a new threshold and/or
+        camera subset, then re-sort or re-group them. No footage is read.
+        
+        Candidates below the original search threshold have no snapshot.
+        
+        Args:
+            sort_by: "confidence" (highest first) or "time" (earliest first)
+            group_by: None, "camera" or "person"
         """
+        candidates_by_person = self.candidate_store.load(search_id)
+        if candidates_by_person is None:
+            return {"search_id": search_id, "status": "error", "error": "No candidates stored for this search"}
+        
+        if person_id is not None:
+            if person_id not in candidates_by_person:
+                return {"search_id": search_id, "status": "error", "error": f"Unknown person '{person_id}'"}
+            candidates_by_person = {person_id: candidates_by_person[person_id]}
+        
+        threshold = self.similarity_threshold if similarity_threshold is None else similarity_threshold
+        if threshold < Settings.CANDIDATE_MIN_SIMILARITY:
+            logger.info(f"Re-rank threshold {threshold} is below the candidate floor {Settings.CANDIDATE_MIN_SIMILARITY}")
+        
+        matches = []
+        for pid, candidates in candidates_by_person.items():
+            keep = candidates["score"] >= threshold
+            if cameras:
+                keep &= np.isin(candidates["camera"], cameras)
+            for i in np.flatnonzero(keep):
+                matches.append(self._build_match(pid, candidates, i, str(candidates["snapshot"][i]) or None))
+        
+        if sort_by == "time":
+            matches.sort(key=lambda m: (m["camera"], m["timestamp"]))
+        else:
+            matches.sort(key=lambda m: m["confidence"], reverse=True)
+        
+        total = len(matches)
+        if limit is not None:
+            matches = matches[:limit]
+        
+        results = {
+            "search_id": search_id,
+            "status": "completed",
+            "similarity_threshold": threshold,
+            "cameras": cameras,
+            "total_matches": total,
+            "matches": matches,
+            "summary": self._summarize_matches(sorted(matches, key=lambda m: m["confidence"], reverse=True))
+        }
+        
+        if group_by in ("camera", "person"):
+            key = "camera" if group_by == "camera" else "person_id"
+            groups: Dict[str, List[Dict[str, Any]]] = {}
+            for match in matches:
+                groups.setdefault(match[key], []).append(match)
+            results["groups"] = {
+                group: {"matches": group_matches, "summary": self._summarize_matches(
+                    sorted(group_matches, key=lambda m: m["confidence"], reverse=True))}
+                for group, group_matches in groups.items()
+            }
+        
+        return results
+    
+    @staticmethod
+    def _summarize_matches(matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Summary block for a confidence-sorted match list."""
+        return {
+            "total_matches": len(matches),
+            "best_match_confidence": matches[0]['confidence'] if matches else 0,
+            "cameras_with_matches": len(set(m['camera'] for m in matches)) if matches else 0
+        }
+    
+    def _iter_video_indexes(
+        self,
+        video_paths: List[Path],
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> Iterator[Tuple[Path, Optional[Dict[str, Any]], bool]]:
+        """
+        Get the face index for each video, building and storing it on a cache miss.
+        
+        Yields:
+            (video_path, index entry or None if unreadable, loaded-from-disk flag).
+            Cached videos come first; missing ones follow as they finish indexing,
+            across the process pool when one is configured.
+        """
+        missing = []
+        for video_path in video_paths:
+            entry = None
+            if self.face_index is not None:
+                with self.stage_timer.stage("index_load"):
+                    entry = self.face_index.load(video_path, self.video_index_tag(video_path))
+            if entry is not None:
+                self._add_to_archive(video_path, entry)
+                yield video_path, entry, True
+            else:
+                missing.append(video_path)
+        
+        if not missing:
+            return
+        
+        if self.parallel_indexer is not None:
+            built = self.parallel_indexer.index_videos(
+                missing,
+                self.sampler,
+                on_shard=lambda video_path, frames: self._notify(
+                    progress_callback, {"type": "frames", "video": video_path.name, "frames": frames}
+                )
+            )
+        else:
+            built = (
+                (video_path, self.index_video(video_path, progress_callback=progress_callback))
+                for video_path in missing
+            )
+        
+        for video_path, entry in built:
+            if entry is not None and self.face_index is not None:
+                # Score the stored (float16/int8) form so first and repeat searches agree
+                entry = self.face_index.encode(entry)
+                self.face_index.save(video_path, self.video_index_tag(video_path), entry)
+            if entry is not None:
+                self._add_to_archive(video_path, entry)
+            yield video_path, entry, False
+    
+    @property
+    def archive_index(self) -> IVFIndex:
+        """Archive ANN index for the active pipeline (one per embedder/detector)."""
+        if self._archive_index is None:
+            self._archive_index = IVFIndex(
+                Settings.ANN_INDEX_DIR / self.model_tag,
+                nlist=Settings.ANN_NLIST,
+                train_size=Settings.ANN_TRAIN_SIZE,
+                dtype=Settings.EMBEDDING_STORAGE,
+                compact_fraction=Settings.ANN_COMPACT_FRACTION
+            )
+        return self._archive_index
+    
+    def clear_archive(self) -> None:
+        """Delete the archive indexes of every pipeline (rebuilt as videos are indexed)."""
+        self.archive_index.clear()
+        if Settings.ANN_INDEX_DIR.exists():
+            # Also drops leftovers of an interrupted compaction; the lock keeps a running one intact
+            with file_lock(self.archive_index.lock_file):
+                for path in Settings.ANN_INDEX_DIR.iterdir():
+                    if path.is_dir() and path != self.archive_index.index_dir:
+                        shutil.rmtree(path, ignore_errors=True)
+    
+    def _add_to_archive(self, video_path: Path, entry: Dict[str, Any]) -> None:
+        """
+        Incrementally insert a video's face samples into the archive index.
+
+        Sources are keyed by resolved path; a new file version or new pipeline
+        settings replace the video's earlier samples instead of duplicating them.
+        """
+        if not Settings.USE_ANN_ARCHIVE:
+            return
+        try:
+            added = self.archive_index.add(
+                str(Path(video_path).resolve()),
+                Path(video_path).stem,
+                entry["embeddings"],
+                {
+                    "frame_index": entry["frame_indices"],
+                    "timestamp": entry["timestamps"],
+                    "track_id": entry["track_ids"]
+                },
+                scales=entry.get("embedding_scales"),
+                version=FaceIndex.video_key(video_path, self.video_index_tag(video_path))
+            )
+            if added:
+                logger.info(f"Added {added} face samples from {Path(video_path).name} to archive index")
+        except Exception as e:
+            logger.warning(f"Could not add {video_path} to archive index: {e}")
+    
+    def search_archive(
+        self,
+        photo_path: str,
+        top_k: int = 100,
+        threshold: Optional[float] = None,
+        nprobe: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Find the top-k most similar faces across all archived footage
+        without touching the video files.
+        
+        Returns:
+            Dictionary with confidence-sorted candidates (camera, time, frame, track).
+        """
+        query, error = self._embed_query_photo(photo_path)
+        if query is None:
+            return {"status": "error", "error": error, "candidates": []}
+        
+        hits = self.archive_index.search(
+            query,
+            top_k=top_k,
+            threshold=self.similarity_threshold if threshold is None else threshold,
+            nprobe=nprobe or Settings.ANN_NPROBE
+        )
+        
+        candidates = [
+            {
+                "camera": hit["source"],
+                "camera_name": hit["source"].replace("_", " ").title(),
+                "confidence": round(hit["similarity"] * 100, 2),
+                "timestamp": round(hit["timestamp"], 2),
+                "time_formatted": self._format_time(hit["timestamp"]),
+                "frame_index": hit["frame_index"],
+                "track_id": hit["track_id"]
+            }
+            for hit in hits
+        ]
+        
+        return {
+            "status": "completed",
+            "archive_size": self.archive_index.live_size,
+            "archive_dead": self.archive_index.dead_size,
+            "candidates": candidates
+        }
+    
+    def index_video(
+        self,
+        video_path: Path,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None,
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Decode a video once and embed every detected face on sampled frames.
+        
+        Args:
+            video_path: Video file to index
+            start_frame: First frame of the range to index (seeked to directly)
+            end_frame: End of the range (exclusive), or None for end of video
+            progress_callback: Optional hook receiving "frames" events
+        
+        Returns:
+            Index entry with L2-normalized embeddings, frame positions, timestamps,
+            bounding boxes, crop qualities and face track ids/spans, or None if the
+            video cannot be opened.
+        """
+        video_path = Path(video_path)
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            logger.error(f"Cannot open video: {video_path}")
+            return None
+        
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        embeddings, frame_indices, frame_numbers, timestamps, bboxes, track_ids, qualities = [], [], [], [], [], [], []
+        pending_faces = []
+        frame_count = 0
+        
+        # Tracks with an embedded sample, and the best low-quality crop of tracks
+        # without one ("defer" policy: embedded at the end only if nothing better came)
+        embedded_tracks = set()
+        deferred: Dict[int, Tuple[Dict[str, Any], int, int, float]] = {}
+        low_quality = 0
+        
+        # Skips static samples and limits detection to moving tiles inside the ROI
+        gate = self.create_motion_gate(video_path.name, video_path.stem)
+        
+        # Without tracking every detection becomes its own single-sample track
+        tracker = FaceTracker(
+            enabled=Settings.FACE_TRACKING,
+            iou_threshold=Settings.TRACK_IOU_THRESHOLD,
+            max_missed=Settings.TRACK_MAX_MISSED,
+            reembed_every=Settings.TRACK_REEMBED_EVERY
+        )
+        
+        def add_sample(face_data, track_id, frame_idx, sample_number, timestamp):
+            pending_faces.append(face_data['face'])
+            frame_indices.append(frame_idx)
+            frame_numbers.append(sample_number)
+            timestamps.append(timestamp)
+            bboxes.append(face_data['bbox'])
+            track_ids.append(track_id)
+            qualities.append(face_data.get('quality', np.nan))
+        
+        def flush_pending():
+            # Embed crops collected across sampled frames in one batch
+            if pending_faces:
+                embeddings.append(self.extract_face_embeddings(pending_faces))
+                pending_faces.clear()
+        
         try:
-            snapshot_path = Settings.RESULTS_DIR / snapshot_name
+            # Only sampled frames are decoded into images
+            sampled = self.sampler.iter_frames(cap, video_path, start_frame, end_frame)
+            for frame_idx, sample_number, frame in self.stage_timer.timed_iter(sampled, "decode"):
+                frame_count += 1
+                timestamp = (frame_idx + 1) / fps if fps > 0 else 0
+                
+                if frame_count % PROGRESS_EVERY == 0:
+                    self._notify(progress_callback, {"type": "frames", "video": video_path.name, "frames": PROGRESS_EVERY})
+                
+                if gate.active:
+                    with self.stage_timer.stage("motion"):
+                        region = gate.region(frame)
+                    if region is None:
+                        # Nothing moved: tracks simply carry over to the next sample
+                        continue
+                    detections = [
+                        face_data for face_data in self.detect_faces_in_frame(frame, region=region)
+                        if gate.contains(face_data['bbox'], frame.shape)
+                    ]
+                else:
+                    detections = self.detect_faces_in_frame(frame)
+                for face_data, track, needs_embedding in tracker.update(detections, frame_idx, timestamp):
+                    if self.is_low_quality(face_data):
+                        low_quality += 1
+                        if self.quality_policy == "defer" and track.track_id not in embedded_tracks:
+                            best = deferred.get(track.track_id)
+                            if best is None or face_data['quality'] > best[0]['quality']:
+                                deferred[track.track_id] = (face_data, frame_idx, sample_number, timestamp)
+                        continue
+                    # The first good crop of a track is always embedded
+                    if not needs_embedding and track.track_id in embedded_tracks:
+                        continue
+                    embedded_tracks.add(track.track_id)
+                    deferred.pop(track.track_id, None)
+                    add_sample(face_data, track.track_id, frame_idx, sample_number, timestamp)
+                
+                if len(pending_faces) >= self.embed_batch_size:
+                    flush_pending()
             
-            # Draw box on frame
-            frame_copy = frame.copy()
-            x1, y1, x2, y2 = face_data['bbox']
-            cv2.rectangle(frame_copy, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            # Tracks only ever seen in low quality still get their best crop embedded
+            for track_id, (face_data, frame_idx, sample_number, timestamp) in deferred.items():
+                add_sample(face_data, track_id, frame_idx, sample_number, timestamp)
+            flush_pending()
+            self._notify(progress_callback, {"type": "frames", "video": video_path.name, "frames": frame_count % PROGRESS_EVERY})
+        finally:
+            cap.release()
+        
+        if frame_indices:
+            matrix = normalize(np.vstack(embeddings))
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        
+        # Deferred samples were appended last; keep the index in frame order
+        order = np.argsort(np.asarray(frame_indices, dtype=np.int64), kind="stable")
+        
+        logger.info(
+            f"Indexed {video_path.name}: {len(frame_indices)} face samples, "
+            f"{len(tracker.tracks)} tracks in {frame_count} frames"
+        )
+        if self.quality_policy != "off":
+            logger.info(
+                f"Quality on {video_path.name}: {low_quality} low-quality crops held back, "
+                f"{len(deferred)} embedded as their track's best"
+            )
+        if gate.active:
+            gate_stats = gate.stats()
+            logger.info(
+                f"Motion gate on {video_path.name}: skipped {gate_stats['skipped']}/{gate_stats['frames']} frames, "
+                f"scanned {gate_stats['area_scanned']:.0%} of the frame area on average"
+            )
+        
+        return {
+            "embeddings": matrix[order] if len(order) else matrix,
+            "frame_indices": np.asarray(frame_indices, dtype=np.int64)[order],
+            "frame_numbers": np.asarray(frame_numbers, dtype=np.int64)[order],
+            "timestamps": np.asarray(timestamps, dtype=np.float64)[order],
+            "bboxes": np.asarray(bboxes, dtype=np.int32).reshape(-1, 4)[order],
+            "track_ids": np.asarray(track_ids, dtype=np.int64)[order],
+            "qualities": np.asarray(qualities, dtype=np.float32)[order],
+            **tracker.span_arrays(),
+            "fps": fps,
+            "frames_processed": frame_count
+        }
+    
+    def index_videos(self, video_paths: List[Path]) -> Dict[str, Any]:
+        """
+        Offline indexing stage: make sure every video has an up-to-date face index.
+        
+        Returns:
+            Summary of how many videos were indexed, already current, or failed.
+        """
+        stats = {"total_videos": len(video_paths), "indexed": 0, "up_to_date": 0, "failed": 0, "faces": 0}
+        
+        existing_videos = []
+        for video_path in video_paths:
+            video_path = Path(video_path)
+            if video_path.exists():
+                existing_videos.append(video_path)
+            else:
+                stats["failed"] += 1
+        
+        for video_path, entry, from_index in self._iter_video_indexes(existing_videos):
+            if entry is None:
+                stats["failed"] += 1
+                continue
             
-            # Save image
-            success = cv2.imwrite(str(snapshot_path), frame_copy)
-            if not success:
-                logger.warning(f"Failed to save snapshot: {snapshot_path}")
+            stats["up_to_date" if from_index else "indexed"] += 1
+            stats["faces"] += len(entry["embeddings"])
+        
+        logger.info(f"Indexing complete: {stats}")
+        return stats
+    
+    def _estimate_sampled_frames(self, video_path: Path) -> int:
+        """Estimate how many frames a search will sample from a video (for ETA)."""
+        cap = cv2.VideoCapture(str(video_path))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        cap.release()
+        return self.sampler.estimate_samples(total_frames, fps)
+    
+    @staticmethod
+    def _notify(progress_callback: Optional[ProgressCallback], event: Dict[str, Any]) -> None:
+        """Deliver a progress event; callback failures never affect the search."""
+        if progress_callback is None:
+            return
+        try:
+            progress_callback(event)
+        except Exception as e:
+            logger.warning(f"Progress callback failed: {e}")
+    
+    def _save_match_snapshots(
+        self,
+        video_path: Path,
+        jobs: List[Tuple[int, Tuple[int, int, int, int], str]],
+        cache_dir: Optional[Path] = None,
+        batch: Optional[WriteBatch] = None
+    ) -> None:
+        """
+        Re-read matched frames from a video and save their snapshots.
+        
+        Jobs are (frame_index, bbox, snapshot_name). Snapshots already in
+        cache_dir (keyed by frame, box and rendering settings) are linked
+        instead, so repeat searches do not reopen the video. Other frames are
+        visited in order: short gaps are skipped with grab(), long gaps with a seek.
+        Queued writes are counted in `batch`.
+        """
+        cache_paths = {}
+        if cache_dir is not None:
+            missing = []
+            for frame_index, bbox, snapshot_name in jobs:
+                cache_path = cache_dir / (
+                    f"{frame_index}_{'_'.join(map(str, bbox))}_{self.result_writer.snapshot_tag}.jpg"
+                )
+                if not self.result_writer.reuse_snapshot(cache_path, snapshot_name):
+                    missing.append((frame_index, bbox, snapshot_name))
+                    cache_paths[snapshot_name] = cache_path
+            jobs = missing
+        if not jobs:
+            return
+        
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            logger.warning(f"Cannot reopen video for snapshots: {video_path}")
+            return
+        
+        try:
+            position = 0
+            frame = None
+            frame_at = -1
+            
+            for frame_index, bbox, snapshot_name in sorted(jobs, key=lambda job: job[0]):
+                if frame_index != frame_at:
+                    if frame_index < position or frame_index - position > SNAPSHOT_SEEK_GAP:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+                        position = frame_index
+                    while position < frame_index and cap.grab():
+                        position += 1
+                    
+                    ret, frame = cap.read()
+                    position += 1
+                    if not ret:
+                        logger.warning(f"Could not read frame {frame_index} of {video_path.name}")
+                        frame_at = -1
+                        continue
+                    frame_at = frame_index
+                
+                self._save_snapshot_async(frame, {'bbox': bbox}, snapshot_name, cache_paths.get(snapshot_name), batch)
+        finally:
+            cap.release()
+    
+    def _save_snapshot_async(
+        self,
+        frame: np.ndarray,
+        face_data: Dict[str, Any],
+        snapshot_name: str,
+        cache_path: Optional[Path] = None,
+        batch: Optional[WriteBatch] = None
+    ) -> None:
+        """
+        Queue a snapshot on the background writer (non-blocking unless the queue is full).
+        Failures are logged but do not affect search results.
+        """
+        try:
+            self.result_writer.submit_snapshot(frame, face_data['bbox'], snapshot_name, cache_path, batch)
         except Exception as e:
             logger.warning(f"Error saving snapshot {snapshot_name}: {e}")
     
     def _save_results_async(self, results: Dict[str, Any]) -> None:
         """
-        Try to save results to JSON file asynchronously (non-blocking).
+        Queue the results JSON file on the background writer.
         Failures are logged but do not affect the API response.
+
+        A traced search (see stage_timer.trace_spans) gets its trace attached
+        first, so the stored file and the returned results both carry it.
         """
+        trace = current_trace()
+        if trace is not None:
+            results["trace"] = trace.to_dict()
         try:
-            results_file = Settings.RESULTS_DIR / f"{results.get('search_id', 'unknown')}.json"
-            with open(results_file, "w") as f:
-                json.dump(results, f, indent=2)
-            logger.info(f"Saved results to {results_file}")
+            self.result_writer.submit_json(f"{results.get('search_id', 'unknown')}.json", results)
         except Exception as e:
             logger.warning(f"Failed to save results to disk: {e}")
     
@@ -374,33 +1369,39 @@ class SearchService:
         return f"{minutes:02d}:{secs:02d}"
     
     def test_rtsp_connection(self, rtsp_url: str) -> Dict[str, Any]:
-        """Test if RTSP stream is accessible."""
+        """
+        Test if RTSP stream is accessible. Reuses a warm pooled connection if
+        there is one; otherwise probes with a temporary stream that is closed
+        afterwards, so a bad URL does not keep reconnecting in the background.
+        """
         try:
             logger.info(f"Testing RTSP connection: {rtsp_url[:50]}...")
             
-            cap = cv2.VideoCapture(rtsp_url)
-            
-            if not cap.isOpened():
-                logger.warning("Cannot connect to RTSP stream")
-                return {
-                    "connected": False,
-                    "error": "Cannot open RTSP stream"
-                }
-            
-            ret, frame = cap.read()
-            cap.release()
+            stream = self.stream_pool.find(rtsp_url)
+            probe = stream is None
+            if probe:
+                stream = self.stream_pool.probe_stream(rtsp_url)
+            try:
+                frame = stream.read(timeout=Settings.RTSP_CONNECT_TIMEOUT)
+                metrics = stream.metrics()
+            finally:
+                if probe:
+                    stream.close(wait=False)
             
-            if ret:
+            if frame is not None:
                 logger.info("RTSP connection successful")
                 return {
                     "connected": True,
-                    "message": "Stream is accessible"
-                }
-            else:
-                return {
-                    "connected": False,
-                    "error": "Cannot read frame from stream"
+                    "message": "Stream is accessible",
+                    "stream": metrics
                 }
+            
+            logger.warning("Cannot connect to RTSP stream")
+            return {
+                "connected": False,
+                "error": stream.last_error or "No frame received from stream",
+                "stream": metrics
+            }
                 
         except Exception as e:
             logger.error(f"RTSP test error: {e}")
@@ -419,6 +1420,9 @@ class SearchService:
         """
         Capture footage from live RTSP stream (max 15 seconds).
         
+        Frames come from the shared stream pool, so an already-open camera
+        starts recording immediately and a brief drop is bridged by reconnecting.
+        
         Args:
             rtsp_url: RTSP stream URL
             duration_seconds: How long to record (default/max 15 seconds)
@@ -428,28 +1432,25 @@ class SearchService:
         Returns:
             Path to saved video file or None if failed
         """
+        stream = None
+        out = None
         try:
             # Enforce 15-second maximum
             duration_seconds = min(duration_seconds, 15)
             
             logger.info(f"Starting RTSP capture from {camera_name} for {duration_seconds}s...")
             
-            # Open RTSP stream
-            cap = cv2.VideoCapture(rtsp_url)
+            stream = self.stream_pool.acquire(rtsp_url)
+            first = stream.read(timeout=Settings.RTSP_CONNECT_TIMEOUT)
             
-            if not cap.isOpened():
+            if first is None:
                 logger.error(f"Failed to connect to RTSP stream: {camera_name}")
                 return None
             
             # Get stream properties
-            fps = int(cap.get(cv2.CAP_PROP_FPS)) or 30
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            
-            if width == 0 or height == 0:
-                logger.error(f"Invalid stream resolution: {width}x{height}")
-                cap.release()
-                return None
+            seq, _, frame = first
+            fps = int(stream.stream_fps) or 30
+            height, width = frame.shape[:2]
             
             logger.info(f"Stream {camera_name}: {width}x{height} @ {fps} FPS")
             
@@ -473,7 +1474,6 @@ class SearchService:
             
             if not out.isOpened():
                 logger.error(f"Failed to open video writer for {output_file}")
-                cap.release()
                 return None
             
             # Capture frames
@@ -484,26 +1484,29 @@ class SearchService:
             logger.info(f"Capturing {max_frames} frames ({duration_seconds}s at {fps} FPS)")
             
             while frame_count < max_frames:
-                ret, frame = cap.read()
-                
-                if not ret:
-                    logger.warning(f"Lost connection to {camera_name} after {frame_count} frames")
-                    break
-                
-                out.write(frame)
-                frame_count += 1
+                if frame.shape[:2] == (height, width):
+                    out.write(frame)
+                    frame_count += 1
                 
                 # Log progress every 5 seconds
                 if frame_count % max(1, fps * 5) == 0:
                     elapsed = (datetime.now() - start_time).total_seconds()
                     logger.info(f"{camera_name}: {frame_count}/{max_frames} frames ({elapsed:.1f}s)")
-            
-            # Release resources
-            cap.release()
-            out.release()
+                
+                if frame_count >= max_frames:
+                    break
+                
+                # Waits through a reconnect for up to the read timeout
+                next_frame = stream.read(seq, timeout=Settings.RTSP_READ_TIMEOUT)
+                if next_frame is None:
+                    logger.warning(f"Lost connection to {camera_name} after {frame_count} frames")
+                    break
+                seq, _, frame = next_frame
             
             if frame_count == 0:
                 logger.error(f"No frames captured from {camera_name}")
+                out.release()
+                out = None
                 output_file.unlink(missing_ok=True)
                 return None
             
@@ -513,3 +1516,9 @@ class SearchService:
         except Exception as e:
             logger.error(f"Error capturing from RTSP {camera_name}: {e}", exc_info=True)
             return None
+        finally:
+            # Release resources (the stream stays warm in the pool)
+            if out is not None:
+                out.release()
+            if stream is not None:
+                self.stream_pool.release(stream)
@@ -0,0 +1,158 @@
+"""
+Stage Timer - Per-stage timings of the search pipeline.
+
+Each stage (decode, motion, detect, quality, embed, score, snapshot, write,
+...) keeps a call count, items processed, total time and a bounded window of
+recent durations for percentiles, and feeds the drishti_stage_* metrics.
+Timing is a couple of perf_counter() calls per stage, so it stays on in
+production; the benchmark harness reads it after a run.
+
+A search can also collect its own trace spans: inside trace_spans(), every
+stage recorded by the same thread (or asyncio task) is appended to the trace.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Iterable, Iterator, List, Optional, TypeVar
+
+import numpy as np
+
+from src.backend.metrics import STAGE_SECONDS, STAGE_ITEMS
+
+T = TypeVar("T")
+
+
+class Trace:
+    """Spans of one traced operation, relative to when tracing started."""
+
+    def __init__(self, max_spans: int = 2000):
+        self.max_spans = max_spans
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.totals: Dict[str, float] = {}
+        self.dropped = 0
+
+    def add(self, name: str, start: float, seconds: float, items: int) -> None:
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return
+        self.spans.append({
+            "stage": name,
+            "start_ms": round((start - self.started) * 1000, 3),
+            "duration_ms": round(seconds * 1000, 3),
+            "items": items
+        })
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "totals_ms": {name: round(seconds * 1000, 3) for name, seconds in self.totals.items()},
+            "spans": self.spans,
+            "dropped_spans": self.dropped
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("drishti_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    """The trace collecting this thread's stages (None outside trace_spans())."""
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_spans(enabled: bool = True, max_spans: int = 2000) -> Iterator[Optional[Trace]]:
+    """Collect the stages recorded by this thread into a Trace (yields None when disabled)."""
+    if not enabled:
+        yield None
+        return
+    trace = Trace(max_spans)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+class _Stage:
+    __slots__ = ("count", "items", "seconds", "recent")
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.items = 0
+        self.seconds = 0.0
+        self.recent: deque = deque(maxlen=window)
+
+
+class StageTimer:
+    """Thread-safe accumulator of per-stage durations."""
+
+    def __init__(self, window: int = 10000):
+        self.window = window
+        self._stages: Dict[str, _Stage] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, items: int = 1) -> None:
+        STAGE_SECONDS.observe(seconds, stage=name)
+        STAGE_ITEMS.inc(items, stage=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(name, time.perf_counter() - seconds, seconds, items)
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = _Stage(self.window)
+            stage.count += 1
+            stage.items += items
+            stage.seconds += seconds
+            stage.recent.append(seconds)
+
+    @contextmanager
+    def stage(self, name: str, items: int = 1) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, items)
+
+    def timed_iter(self, iterable: Iterable[T], name: str) -> Iterator[T]:
+        """Yield from iterable, timing each step (e.g. decoding the next sampled frame)."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.record(name, time.perf_counter() - start)
+            yield item
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per stage: count, items, total seconds, mean/p50/p95 ms per call and items per second."""
+        with self._lock:
+            stages = {
+                name: (stage.count, stage.items, stage.seconds, np.asarray(stage.recent))
+                for name, stage in self._stages.items()
+            }
+
+        report = {}
+        for name, (count, items, seconds, recent) in stages.items():
+            p50, p95 = np.percentile(recent, [50, 95]) if len(recent) else (0.0, 0.0)
+            report[name] = {
+                "count": count,
+                "items": items,
+                "total_seconds": round(seconds, 4),
+                "mean_ms": round(seconds / count * 1000, 3) if count else 0.0,
+                "p50_ms": round(float(p50) * 1000, 3),
+                "p95_ms": round(float(p95) * 1000, 3),
+                "items_per_second": round(items / seconds, 1) if seconds > 0 else None
+            }
+        return report
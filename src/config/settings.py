@@ -25,6 +25,7 @@ class Settings:
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", 8000))
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", 1))  # Forked server processes sharing one loaded model (run.py)
     
     # ========================================================================
     # DIRECTORIES
@@ -38,13 +39,177 @@ class Settings:
     RESULTS_DIR = DATA_DIR / "results"
     VIDEO_DIR = BASE_DIR / "CCTVS"  # CCTV videos
     LOG_DIR = BASE_DIR / "logs"
+    INDEX_DIR = DATA_DIR / "index"  # Per-video face embedding index
+    ANN_INDEX_DIR = DATA_DIR / "archive"  # Archive-wide approximate nearest-neighbour index
+    MODELS_DIR = DATA_DIR / "models"  # Local model files (detectors, weights)
+    CLIPS_DIR = DATA_DIR / "clips"  # Pre/post-event clips from live cameras
+    CCTV_CONFIG_FILE = BASE_DIR / "cctv_config.json"  # Saved RTSP camera configuration
+    CAMERA_ROI_FILE = BASE_DIR / "camera_roi.json"  # Per-camera detection regions (normalized polygons)
     
     # ========================================================================
     # FACE RECOGNITION SETTINGS
     # ========================================================================
-    SIMILARITY_THRESHOLD = 0.60  # Confidence threshold for matches
-    DETECTION_CONFIDENCE = 0.50  # MediaPipe detection confidence
-    FRAME_SKIP = 5  # Process every Nth frame
+    SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", 0.60))  # Confidence threshold for matches
+    DETECTION_CONFIDENCE = float(os.getenv("DETECTION_CONFIDENCE", 0.50))  # Drop weaker YuNet/SSD detections before embedding
+    HAAR_MIN_CONFIDENCE = float(os.getenv("HAAR_MIN_CONFIDENCE", 0.0))  # Same for Haar (0 keeps every cascade hit; its scores are weak evidence)
+    FRAME_SKIP = int(os.getenv("FRAME_SKIP", 5))  # Process every Nth frame in "stride" mode
+    SAMPLING_MODE = os.getenv("SAMPLING_MODE", "stride")  # stride | fps | keyframe
+    SAMPLE_FPS = float(os.getenv("SAMPLE_FPS", 2.0))  # Frames per second of footage in "fps" mode
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 32))  # Face crops per ResNet forward pass
+    
+    # ========================================================================
+    # FACE DETECTOR SETTINGS
+    # ========================================================================
+    FACE_DETECTOR = os.getenv("FACE_DETECTOR", "haar")  # haar | yunet | ssd
+    DETECTION_MAX_WIDTH = int(os.getenv("DETECTION_MAX_WIDTH", 640))  # Downscale frames to this width for YuNet/SSD detection (0 = off)
+    HAAR_MAX_WIDTH = int(os.getenv("HAAR_MAX_WIDTH", 0))  # Same for Haar; off by default since downscaling drops small faces
+    YUNET_MODEL_PATH = MODELS_DIR / "face_detection_yunet_2023mar.onnx"
+    SSD_PROTOTXT_PATH = MODELS_DIR / "deploy.prototxt"
+    SSD_MODEL_PATH = MODELS_DIR / "res10_300x300_ssd_iter_140000.caffemodel"
+    
+    # ========================================================================
+    # MODEL LOADING SETTINGS
+    # ========================================================================
+    MODEL_LOADING = os.getenv("MODEL_LOADING", "background")  # background (serve while loading) | eager
+    FACE_MODEL_WEIGHTS = Path(os.getenv("FACE_MODEL_WEIGHTS", MODELS_DIR / "resnet18.pth"))  # Local ResNet18 state dict
+    FACE_MODEL_TORCHSCRIPT = Path(os.getenv("FACE_MODEL_TORCHSCRIPT", MODELS_DIR / "resnet18_embedder.pt"))  # Frozen export, preferred when present
+    MODEL_DOWNLOAD = os.getenv("MODEL_DOWNLOAD", "True").lower() == "true"  # Download ImageNet weights if no local copy
+    
+    # ========================================================================
+    # EMBEDDER INFERENCE SETTINGS
+    # ========================================================================
+    EMBED_MODE = os.getenv("EMBED_MODE", "fp32")  # fp32 | jit | int8 | onnx (int8/onnx built by check_embedder.py --build)
+    EMBED_INPUT_SIZE = int(os.getenv("EMBED_INPUT_SIZE", 224))  # Crop side fed to ResNet18 (160/112 trade accuracy for speed)
+    EMBED_CHANNELS_LAST = os.getenv("EMBED_CHANNELS_LAST", "True").lower() == "true"  # NHWC weights/inputs for fp32 and jit
+    FACE_MODEL_INT8 = Path(os.getenv("FACE_MODEL_INT8", MODELS_DIR / "resnet18_embedder_int8.pt"))  # Quantized TorchScript
+    FACE_MODEL_ONNX = Path(os.getenv("FACE_MODEL_ONNX", MODELS_DIR / "resnet18_embedder.onnx"))  # ONNX export for OpenCV DNN
+    
+    # ========================================================================
+    # FACE TRACKING SETTINGS
+    # ========================================================================
+    FACE_TRACKING = os.getenv("FACE_TRACKING", "True").lower() == "true"  # One match per tracked person
+    TRACK_IOU_THRESHOLD = 0.3  # Min box overlap to continue a track between sampled frames
+    TRACK_MAX_MISSED = 2  # Sampled frames a track may go unseen before it ends
+    TRACK_REEMBED_EVERY = int(os.getenv("TRACK_REEMBED_EVERY", 10))  # Re-embed a track every N samples
+    
+    # ========================================================================
+    # FACE QUALITY SETTINGS
+    # ========================================================================
+    QUALITY_POLICY = os.getenv("QUALITY_POLICY", "defer")  # off | skip | defer (embed only if a track has nothing better)
+    QUALITY_MIN_SCORE = float(os.getenv("QUALITY_MIN_SCORE", 0.6))  # Crops scoring below this are low quality
+    QUALITY_SHARPNESS_REF = float(os.getenv("QUALITY_SHARPNESS_REF", 200))  # Laplacian variance counted as fully sharp
+    QUALITY_FULL_SIZE = int(os.getenv("QUALITY_FULL_SIZE", 80))  # Crop side (pixels) counted as full size
+    
+    # ========================================================================
+    # MOTION GATE SETTINGS
+    # ========================================================================
+    MOTION_GATE = os.getenv("MOTION_GATE", "True").lower() == "true"  # Skip detection on frames/tiles without motion
+    MOTION_WIDTH = int(os.getenv("MOTION_WIDTH", 160))  # Width of the grayscale copy frames are differenced at
+    MOTION_THRESHOLD = int(os.getenv("MOTION_THRESHOLD", 25))  # Min pixel change (0-255) that counts as motion
+    MOTION_MIN_AREA = float(os.getenv("MOTION_MIN_AREA", 0.01))  # Fraction of a tile that must change
+    MOTION_TILES = int(os.getenv("MOTION_TILES", 8))  # Tile grid (N x N) used to localize motion
+    MOTION_REFRESH_EVERY = int(os.getenv("MOTION_REFRESH_EVERY", 50))  # Full scan every N samples (0 = never)
+    
+    # ========================================================================
+    # FACE INDEX SETTINGS
+    # ========================================================================
+    USE_FACE_INDEX = os.getenv("USE_FACE_INDEX", "True").lower() == "true"  # Reuse stored embeddings across searches
+    EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float16")  # float32 | float16 | int8 vectors in face and archive indexes
+    
+    # ========================================================================
+    # ARCHIVE (ANN) INDEX SETTINGS
+    # ========================================================================
+    USE_ANN_ARCHIVE = os.getenv("USE_ANN_ARCHIVE", "True").lower() == "true"  # Add indexed footage to the archive index
+    ANN_NLIST = int(os.getenv("ANN_NLIST", 1024))  # Inverted lists (k-means centroids)
+    ANN_NPROBE = int(os.getenv("ANN_NPROBE", 16))  # Lists scanned per query
+    ANN_TRAIN_SIZE = int(os.getenv("ANN_TRAIN_SIZE", 50000))  # Faces collected before training centroids
+    ANN_COMPACT_FRACTION = float(os.getenv("ANN_COMPACT_FRACTION", 0.3))  # Rewrite the archive once this share of it belongs to replaced videos (0 = never)
+    
+    # ========================================================================
+    # SNAPSHOT / RESULT WRITER SETTINGS
+    # ========================================================================
+    SNAPSHOT_MODE = os.getenv("SNAPSHOT_MODE", "context")  # context (face + surroundings) | full (whole frame)
+    SNAPSHOT_CONTEXT = float(os.getenv("SNAPSHOT_CONTEXT", 1.5))  # Face-sizes of context on each side
+    SNAPSHOT_MAX_WIDTH = int(os.getenv("SNAPSHOT_MAX_WIDTH", 640))  # Downscale snapshots wider than this (0 = off)
+    SNAPSHOT_JPEG_QUALITY = int(os.getenv("SNAPSHOT_JPEG_QUALITY", 85))
+    SNAPSHOT_MAX_PER_SEARCH = int(os.getenv("SNAPSHOT_MAX_PER_SEARCH", 100))  # Highest-confidence matches saved (0 = all)
+    RESULT_WRITER_WORKERS = int(os.getenv("RESULT_WRITER_WORKERS", 2))  # Background writer threads
+    RESULT_WRITER_QUEUE_SIZE = int(os.getenv("RESULT_WRITER_QUEUE_SIZE", 64))  # Pending writes before callers wait
+    
+    # ========================================================================
+    # RESULT STORE SETTINGS
+    # ========================================================================
+    RESULT_STORE_MAX_ENTRIES = int(os.getenv("RESULT_STORE_MAX_ENTRIES", 200))  # Searches kept in memory
+    RESULT_STORE_MAX_MB = float(os.getenv("RESULT_STORE_MAX_MB", 256))  # Memory budget for kept results
+    RESULT_STORE_TTL = float(os.getenv("RESULT_STORE_TTL", 3600))  # Seconds since last access before spilling to disk
+    
+    # ========================================================================
+    # SEARCH CANDIDATE SETTINGS (re-thresholding without a rescan)
+    # ========================================================================
+    CANDIDATE_MIN_SIMILARITY = float(os.getenv("CANDIDATE_MIN_SIMILARITY", 0.50))  # Lowest score kept for re-ranking
+    CANDIDATE_TOP_K = int(os.getenv("CANDIDATE_TOP_K", 500))  # Face tracks kept per video and person
+    CANDIDATE_KEEP_EMBEDDINGS = os.getenv("CANDIDATE_KEEP_EMBEDDINGS", "False").lower() == "true"  # Store float16 embeddings too
+    
+    # ========================================================================
+    # QUERY CACHE SETTINGS
+    # ========================================================================
+    QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 256))  # Query photo embeddings kept (by content hash)
+    
+    # ========================================================================
+    # PARALLEL SEARCH SETTINGS
+    # ========================================================================
+    SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", 0))  # Indexing processes (0/1 = in-process)
+    TORCH_THREADS = int(os.getenv("TORCH_THREADS", 0))  # Intra-op threads per process (0 = auto)
+    SHARD_FRAMES = int(os.getenv("SHARD_FRAMES", 1500))  # Frames per shard within long videos
+    
+    # ========================================================================
+    # SEARCH JOB SETTINGS
+    # ========================================================================
+    SEARCH_JOB_WORKERS = int(os.getenv("SEARCH_JOB_WORKERS", 1))  # Searches run concurrently
+    SEARCH_QUEUE_SIZE = int(os.getenv("SEARCH_QUEUE_SIZE", 8))  # Queued searches before rejecting (the high lane gets as many again)
+    SEARCH_CLIENT_LIMIT = int(os.getenv("SEARCH_CLIENT_LIMIT", 2))  # Queued + running searches per client (0 = unlimited)
+    SEARCH_AGING_SECONDS = float(os.getenv("SEARCH_AGING_SECONDS", 120))  # Each wait of this long moves a queued search up one lane (0 = off)
+    SEARCH_PRIORITY_TOKEN = os.getenv("SEARCH_PRIORITY_TOKEN", "")  # X-Priority-Token needed for priority=high (empty = high lane disabled)
+    TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", 0))  # Reverse proxies appending X-Forwarded-For in front of the app (Render: 1)
+    
+    # ========================================================================
+    # RTSP STREAM POOL SETTINGS
+    # ========================================================================
+    RTSP_BACKOFF_INITIAL = float(os.getenv("RTSP_BACKOFF_INITIAL", 1.0))  # First reconnect delay (seconds)
+    RTSP_BACKOFF_MAX = float(os.getenv("RTSP_BACKOFF_MAX", 60.0))  # Reconnect delay cap (doubles per failure)
+    RTSP_IDLE_TIMEOUT = float(os.getenv("RTSP_IDLE_TIMEOUT", 300))  # Close unused streams after this many seconds
+    RTSP_CONNECT_TIMEOUT = float(os.getenv("RTSP_CONNECT_TIMEOUT", 10))  # Wait for a first frame
+    RTSP_READ_TIMEOUT = float(os.getenv("RTSP_READ_TIMEOUT", 5))  # Wait for the next frame before giving up
+    
+    # ========================================================================
+    # LIVE INGESTION SETTINGS
+    # ========================================================================
+    LIVE_INGEST_AUTOSTART = os.getenv("LIVE_INGEST_AUTOSTART", "False").lower() == "true"  # Start camera readers on startup
+    LIVE_SAMPLE_FPS = float(os.getenv("LIVE_SAMPLE_FPS", 2.0))  # Frames per second matched per camera
+    LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", 16))  # Sampled frames waiting for matching (oldest dropped)
+    LIVE_WORKERS = int(os.getenv("LIVE_WORKERS", 1))  # Matcher threads
+    LIVE_ALERT_COOLDOWN = float(os.getenv("LIVE_ALERT_COOLDOWN", 30))  # Seconds between alerts for a person on a camera
+    LIVE_MAX_ALERTS = 500  # Recent alerts kept in memory
+    
+    # ========================================================================
+    # RING BUFFER (PRE-EVENT RECORDING) SETTINGS
+    # ========================================================================
+    RING_BUFFER_ENABLED = os.getenv("RING_BUFFER_ENABLED", "True").lower() == "true"  # Buffer live cameras in memory
+    RING_BUFFER_SECONDS = float(os.getenv("RING_BUFFER_SECONDS", 30))  # Footage kept per camera
+    RING_BUFFER_MAX_MB = float(os.getenv("RING_BUFFER_MAX_MB", 64))  # Memory budget per camera (oldest evicted first)
+    RING_BUFFER_FPS = float(os.getenv("RING_BUFFER_FPS", 10))  # Frames per second buffered
+    RING_BUFFER_MAX_WIDTH = int(os.getenv("RING_BUFFER_MAX_WIDTH", 960))  # Downscale buffered frames to this width
+    RING_BUFFER_JPEG_QUALITY = int(os.getenv("RING_BUFFER_JPEG_QUALITY", 80))  # JPEG quality of buffered frames
+    RING_CLIP_BEFORE = float(os.getenv("RING_CLIP_BEFORE", 10))  # Default seconds before the event
+    RING_CLIP_AFTER = float(os.getenv("RING_CLIP_AFTER", 10))  # Default seconds after the event
+    RING_CLIP_ON_ALERT = os.getenv("RING_CLIP_ON_ALERT", "True").lower() == "true"  # Save a clip for each live alert
+    RING_CLIP_QUEUE_SIZE = 16  # Pending clip writes before requests are rejected
+    
+    # ========================================================================
+    # METRICS SETTINGS
+    # ========================================================================
+    TRACE_SEARCHES = os.getenv("TRACE_SEARCHES", "False").lower() == "true"  # Attach per-stage trace spans to every search
+    TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", 2000))  # Spans kept per traced search (totals stay exact)
     
     # ========================================================================
     # DATABASE SETTINGS (for future use)
@@ -66,6 +231,9 @@ class Settings:
             Settings.RESULTS_DIR,
             Settings.VIDEO_DIR,
             Settings.LOG_DIR,
+            Settings.INDEX_DIR,
+            Settings.MODELS_DIR,
+            Settings.CLIPS_DIR,
         ]
         for directory in dirs:
             directory.mkdir(parents=True, exist_ok=True)